@@ -12,8 +12,9 @@ from utils.database import (
     get_integral_2025, get_integral_2026,
     get_evasao_2025, get_evasao_2026,
     get_turmas_detalhadas_2026,
-    get_ultima_extracao,
+    get_ultima_extracao, get_status_auditoria, get_mudancas_ultima_extracao, versao_dados,
 )
+from utils.auditor import BANCOS_AUDITADOS, publicar
 from utils.constants import UNIDADES_MAP, ORDEM_UNIDADES, SEGMENTOS, CORES_UNIDADES, CORES_SEGMENTOS
 from utils.calculations import (
     calc_variacao, format_variacao, format_diferenca,
@@ -36,6 +37,20 @@ with st.sidebar:
     st.divider()
     ultima = get_ultima_extracao()
     st.caption(f"Última extração: {ultima}")
+    auditoria = get_status_auditoria()
+    if auditoria:
+        rotulo = {
+            "ok": "✅ aprovada", "aviso": "⚠️ com avisos",
+            "critico": "❌ reprovada", "pendente": "⏳ pendente",
+        }[auditoria["nivel"]]
+        st.caption(f"Auditoria (extração {auditoria['extracao_id']}): {rotulo}")
+        if auditoria["publicada"] != auditoria["extracao_id"]:
+            st.caption(f"Exibindo a extração {auditoria['publicada']} (última aprovada)")
+        if auditoria["nivel"] in ("aviso", "critico"):
+            with st.expander("Detalhes da auditoria"):
+                for nivel, msgs in auditoria["regras"].values():
+                    for msg in msgs if nivel != "ok" else []:
+                        st.caption(f"{'❌' if nivel == 'critico' else '⚠️'} {msg}")
     st.divider()
     st.markdown("#### Navegação")
     st.page_link("app.py", label="🏠 Home", icon="🏠")
@@ -78,9 +93,28 @@ with st.sidebar:
                 for e in erros:
                     st.error(e)
             else:
-                status.update(label="Dados atualizados!", state="complete")
-                st.cache_data.clear()
-                st.rerun()
+                # Gate: so extracoes aprovadas pela auditoria chegam ao dashboard
+                st.write("Auditando antes de publicar...")
+                reprovadas = []
+                for db_name in BANCOS_AUDITADOS:
+                    pub = publicar(db_name)
+                    if pub and not pub["promovida"]:
+                        reprovadas.append(
+                            f"{db_name}: extração {pub['candidata']} reprovada na auditoria; "
+                            f"mantida a extração {pub['publicada']}"
+                        )
+                # Dados em cache por versao (versao_dados): extracao igual a
+                # anterior nao invalida nada; so a versao e os metadados mudam
+                for cache in (versao_dados, get_ultima_extracao, get_status_auditoria,
+                              get_mudancas_ultima_extracao):
+                    cache.clear()
+                if reprovadas:
+                    status.update(label="Extração não publicada", state="error")
+                    for r in reprovadas:
+                        st.error(r)
+                else:
+                    status.update(label="Dados atualizados!", state="complete")
+                    st.rerun()
 
 # Header
 st.markdown("# 🎓 Dashboard Vagas - Colégio Elo")
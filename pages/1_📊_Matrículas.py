@@ -7,7 +7,7 @@ from utils.database import (
     get_matriculas_2025, get_matriculas_2026,
     get_integral_2025, get_integral_2026,
     get_matriculas_por_turma_2026, get_matriculas_por_turma_2025,
-    get_ultima_extracao,
+    get_ultima_extracao, get_mudancas_ultima_extracao,
 )
 from utils.constants import (
     UNIDADES_MAP, ORDEM_UNIDADES, SEGMENTOS,
@@ -15,7 +15,7 @@ from utils.constants import (
 )
 from utils.calculations import (
     calc_variacao, format_variacao, format_diferenca,
-    extrair_serie_ensalamento,
+    extrair_serie_ensalamento, tabela_mudancas,
 )
 
 st.set_page_config(
@@ -498,6 +498,32 @@ if not df_turmas_25.empty and not df_turmas_26.empty:
 
 st.divider()
 
+# ============================================================
+# MUDANÇAS DESDE A EXTRAÇÃO ANTERIOR
+# ============================================================
+st.markdown("### Mudanças desde a Extração Anterior")
+
+ext_anterior, ext_atual, df_diff = get_mudancas_ultima_extracao()
+if df_diff.empty:
+    st.info("Sem extração anterior para comparar.")
+else:
+    df_diff = df_diff.assign(unidade=df_diff["unidade_codigo"].map(UNIDADES_MAP))
+    cols_mud = st.columns(4)
+    for i, unidade in enumerate(ORDEM_UNIDADES):
+        df_u = df_diff[df_diff["unidade"] == unidade]
+        mudaram = int((df_u["situacao"] != "igual").sum())
+        with cols_mud[i]:
+            st.metric(unidade, _fmt_dif(int(df_u["delta_matriculados"].sum())),
+                      help=f"{mudaram} turmas mudaram")
+    df_mudancas = tabela_mudancas(df_diff)
+    with st.expander(f"Turmas que mudaram ({len(df_mudancas)}) - extração {ext_anterior} → {ext_atual}"):
+        if df_mudancas.empty:
+            st.caption("Nenhuma turma mudou.")
+        else:
+            st.dataframe(df_mudancas, width="stretch", hide_index=True)
+
+st.divider()
+
 # ============================================================
 # INTEGRAL / COMPLEMENTAR
 # ============================================================
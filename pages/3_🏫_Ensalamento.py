@@ -3,14 +3,14 @@
 import streamlit as st
 import pandas as pd
 from utils.theme import aplicar_tema
-from utils.database import get_turmas_detalhadas_2026, get_ultima_extracao
+from utils.database import get_turmas_detalhadas_2026, get_ultima_extracao, get_mudancas_ultima_extracao
 from utils.constants import (
     UNIDADES_MAP, ORDEM_UNIDADES, SEGMENTOS,
     ORDEM_SERIES, STATUS_OCUPACAO,
 )
 from utils.calculations import (
     extrair_serie_ensalamento, extrair_turno, extrair_letra_turma,
-    calcular_status_ocupacao,
+    calcular_status_ocupacao, format_diferenca, tabela_mudancas,
 )
 
 st.set_page_config(
@@ -197,3 +197,35 @@ for i, (key, label, cor) in enumerate(status_info):
     with cols_status[i]:
         count = int(status_count.get(key, 0))
         st.metric(label, count)
+
+# Mudanças desde a extração anterior (mesmos filtros de unidade e segmento)
+st.divider()
+st.markdown("### Mudanças desde a Extração Anterior")
+
+ext_anterior, ext_atual, df_diff = get_mudancas_ultima_extracao()
+if df_diff.empty:
+    st.info("Sem extração anterior para comparar.")
+else:
+    df_diff = df_diff.assign(unidade=df_diff["unidade_codigo"].map(UNIDADES_MAP))
+    if filtro_unidade != "Todas":
+        df_diff = df_diff[df_diff["unidade"] == filtro_unidade]
+    if filtro_segmento != "Todos":
+        df_diff = df_diff[df_diff["segmento"] == filtro_segmento]
+
+    situacoes = df_diff["situacao"].value_counts()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Turmas Novas", int(situacoes.get("nova", 0)))
+    with col2:
+        st.metric("Turmas Removidas", int(situacoes.get("removida", 0)))
+    with col3:
+        st.metric("Turmas Alteradas", int(situacoes.get("alterada", 0)))
+    with col4:
+        st.metric("Saldo de Matriculados", format_diferenca(int(df_diff["delta_matriculados"].sum())))
+
+    st.caption(f"Extração {ext_anterior} → {ext_atual}")
+    df_mudancas = tabela_mudancas(df_diff)
+    if df_mudancas.empty:
+        st.caption("Nenhuma turma mudou.")
+    else:
+        st.dataframe(df_mudancas, width="stretch", hide_index=True)
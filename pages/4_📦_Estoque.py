@@ -4,12 +4,18 @@ import streamlit as st
 import streamlit.components.v1 as components
 import pandas as pd
 import plotly.graph_objects as go
-import json
-import re
 import io
 from pathlib import Path
 from datetime import datetime
 from utils.theme import aplicar_tema
+from utils.impressao import tabela_html_inline, gerar_ata_html, gerar_ata_elotech_html
+from utils.balanco_fisico import tabela_balanco, tabela_historico
+from utils.previsao_estoque import JANELA_DIAS, PRAZO_REPOSICAO_DIAS, tabela_reposicao
+from utils.receita import TIPOS as TIPOS_RECEITA, formatar_reais
+from utils.estoque_engine import (
+    ORDEM_SERIES_COMPLETA, ORDEM_SERIES_SOCIO, ORDEM_SERIES_ELOTECH, UNIDADES_INV,
+    ingerir_tsvs, carregar_base, criar_tabela_completa, versao_base,
+)
 
 st.set_page_config(
     page_title="Estoque - Colégio Elo",
@@ -23,238 +29,26 @@ OUTPUT_DIR = Path(__file__).parent.parent / "output"
 
 # Importa dados_estoque
 from utils.dados_estoque import (
-    PEDIDO_SAE, ESTOQUE_ENVIADO, UNIDADES, ORDEM_SEGMENTOS,
-    BALANCO_FISICO, AJUSTE_ANO_PASSADO, ELOTECH_EM_ABERTO,
-    ELOTECH_SERIE_PDF,
+    PEDIDO_SAE, UNIDADES, ORDEM_SEGMENTOS,
+    AJUSTE_ANO_PASSADO, ELOTECH_EM_ABERTO,
 )
 
-CODIGOS_SERVICOS = {
-    "901", "902", "903", "904",
-    "913", "914", "915", "920", "921",
-    "916", "917", "918", "919",
-    "912", "991", "992",
-    "933", "934", "941", "942", "943", "944", "945", "946",
-    "995",
-}
-
-# Cordeiro NÃO tem Elo Tech
-CODIGOS_EXCLUIR_POR_UNIDADE = {
-    "CDR": {"995"},
-}
-
-SERVICOS_MAP = {
-    "901": ("Infantil", "Infantil II", "SAE"),
-    "902": ("Infantil", "Infantil III", "SAE"),
-    "903": ("Infantil", "Infantil IV", "SAE"),
-    "904": ("Infantil", "Infantil V", "SAE"),
-    "913": ("Fund1", "3º Ano", "SAE"),
-    "914": ("Fund1", "4º Ano", "SAE"),
-    "915": ("Fund1", "5º Ano", "SAE"),
-    "920": ("Fund1", "2º Ano", "SAE"),
-    "921": ("Fund1", "1º Ano", "SAE"),
-    "916": ("Fund2", "6º Ano", "SAE"),
-    "917": ("Fund2", "7º Ano", "SAE"),
-    "918": ("Fund2", "8º Ano", "SAE"),
-    "919": ("Fund2", "9º Ano", "SAE"),
-    "912": ("Médio", "1º Ano", "SAE"),
-    "991": ("Médio", "2º Ano", "SAE"),
-    "992": ("Médio", "3º Ano", "SAE"),
-    "933": ("Infantil", "Infantil IV", "Socioemocional"),
-    "934": ("Infantil", "Infantil V", "Socioemocional"),
-    "941": ("Fund1", "1º Ano", "Socioemocional"),
-    "942": ("Fund1", "2º Ano", "Socioemocional"),
-    "943": ("Fund1", "3º Ano", "Socioemocional"),
-    "944": ("Fund1", "4º Ano", "Socioemocional"),
-    "945": ("Fund1", "5º Ano", "Socioemocional"),
-    "946": ("Fund2", "6º Ano", "Socioemocional"),
-    "995": ("Geral", "Todas", "Elo Tech"),
-}
-
-RE_SERVICO = re.compile(r'^(\d{3})\s*-\s*(.+?)(?:\s*\(|$)')
-RE_TURMA = re.compile(r'Turma\s+(\w+)')
-
-ORDEM_SERIES_COMPLETA = [
-    ('Infantil', 'Infantil II'), ('Infantil', 'Infantil III'),
-    ('Infantil', 'Infantil IV'), ('Infantil', 'Infantil V'),
-    ('Fund1', '1º Ano'), ('Fund1', '2º Ano'), ('Fund1', '3º Ano'),
-    ('Fund1', '4º Ano'), ('Fund1', '5º Ano'),
-    ('Fund2', '6º Ano'), ('Fund2', '7º Ano'),
-    ('Fund2', '8º Ano'), ('Fund2', '9º Ano'),
-    ('Médio', '1º Ano'), ('Médio', '2º Ano'), ('Médio', '3º Ano'),
-]
-
-ORDEM_SERIES_SOCIO = [
-    ('Infantil', 'Infantil IV'), ('Infantil', 'Infantil V'),
-    ('Fund1', '1º Ano'), ('Fund1', '2º Ano'), ('Fund1', '3º Ano'),
-    ('Fund1', '4º Ano'), ('Fund1', '5º Ano'),
-    ('Fund2', '6º Ano'),
-]
-
-ORDEM_SERIES_ELOTECH = [
-    ('Fund1', '2º Ano'), ('Fund1', '3º Ano'),
-    ('Fund1', '4º Ano'), ('Fund1', '5º Ano'),
-]
-
-UNIDADES_INV = {v: k for k, v in UNIDADES.items()}
-
 
 # =====================================================
 # FUNCOES
 # =====================================================
 
-def parse_tsv(tsv_content, unidade_codigo):
-    registros = []
-    servico_codigo = ""
-    turma_atual = ""
-    excluir = CODIGOS_EXCLUIR_POR_UNIDADE.get(unidade_codigo, set())
-    for linha in tsv_content.split('\n'):
-        linha = linha.strip()
-        if not linha or linha.startswith('Subtotal') or linha.startswith('Matrícula'):
-            continue
-        if ' - ' in linha and '(' in linha:
-            match = RE_SERVICO.match(linha)
-            if match:
-                servico_codigo = match.group(1)
-                if servico_codigo not in CODIGOS_SERVICOS or servico_codigo in excluir:
-                    servico_codigo = ""
-                    continue
-                turma_match = RE_TURMA.search(linha)
-                turma_atual = turma_match.group(1) if turma_match else ""
-            continue
-        if not servico_codigo:
-            continue
-        campos = linha.split('\t')
-        if len(campos) >= 6:
-            matricula = campos[0].strip()
-            if matricula and (matricula[0].isdigit() or '-' in matricula):
-                info = SERVICOS_MAP.get(servico_codigo, ("", "", ""))
-                registros.append({
-                    "unidade": unidade_codigo, "servico_codigo": servico_codigo,
-                    "turma": turma_atual, "matricula": matricula,
-                    "nome": campos[1].strip(), "titulo": campos[2].strip(),
-                    "parcela": campos[3].strip(), "dt_baixa": campos[4].strip(),
-                    "valor": campos[5].strip(),
-                    "recebido": campos[-1].strip() if len(campos) > 6 else "",
-                    "segmento": info[0], "serie": info[1], "tipo": info[2],
-                })
-    return registros
-
-
 def atualizar_dados():
-    todos_registros = []
     agora = datetime.now()
-    for arquivo in sorted(OUTPUT_DIR.glob("dados_*.tsv")):
-        codigo = arquivo.stem.replace("dados_", "").upper()
-        with open(arquivo, 'r', encoding='utf-8') as f:
-            registros = parse_tsv(f.read(), codigo)
-            todos_registros.extend(registros)
-    json_path = OUTPUT_DIR / "recebimento_final.json"
-    if json_path.exists():
-        with open(json_path, 'r', encoding='utf-8') as f:
-            dados_atuais = json.load(f)
-        registros_atuais = len(dados_atuais.get('registros', []))
-        if len(todos_registros) < registros_atuais * 0.8:
-            return -1, agora
-    dados_finais = {
+    metadados = {
         "data_extracao": agora.isoformat(),
         "ultima_atualizacao": agora.strftime("%d/%m/%Y %H:%M:%S"),
         "periodo": {"data_inicial": "01/08/2025", "data_final": agora.strftime("%d/%m/%Y")},
-        "total_registros": len(todos_registros),
-        "registros": todos_registros,
     }
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(dados_finais, f, ensure_ascii=False, indent=2)
-    return len(todos_registros), agora
-
-
-@st.cache_data(ttl=300)
-def carregar_vendas():
-    json_path = OUTPUT_DIR / "recebimento_final.json"
-    if not json_path.exists():
-        return None, None
-    with open(json_path, 'r', encoding='utf-8') as f:
-        dados = json.load(f)
-    return pd.DataFrame(dados.get('registros', [])), dados.get('ultima_atualizacao', 'N/A')
-
-
-def calcular_vendas(df, tipo="SAE"):
-    df_f = df[df['tipo'] == tipo].copy()
-    vendas = df_f.groupby(['segmento', 'serie', 'unidade'])['matricula'].nunique().reset_index()
-    vendas.columns = ['segmento', 'serie', 'unidade', 'vendido']
-    return vendas
-
-
-def calcular_vendas_elotech_por_serie(df):
-    """Cruza matriculas Elo Tech com SAE/Socioemocional para descobrir a serie."""
-    df_tech = df[df['tipo'] == 'Elo Tech'].copy()
-    df_ref = df[df['tipo'].isin(['SAE', 'Socioemocional'])].copy()
-    if df_tech.empty:
-        return pd.DataFrame(columns=['segmento', 'serie', 'unidade', 'vendido'])
-    mat_serie = df_ref.drop_duplicates(subset=['matricula', 'unidade'])\
-        .set_index(['matricula', 'unidade'])['serie'].to_dict()
-    df_tech['serie_real'] = df_tech.apply(
-        lambda r: ELOTECH_SERIE_PDF.get((r['matricula'], r['unidade']),
-                  mat_serie.get((r['matricula'], r['unidade']),
-                                r['serie'] if r['serie'] != 'Todas' else 'Sem serie')), axis=1
-    )
-    df_tech['segmento_real'] = df_tech['serie_real'].apply(
-        lambda s: 'Fund1' if s in ['1º Ano', '2º Ano', '3º Ano', '4º Ano', '5º Ano']
-        else 'Fund2' if s in ['6º Ano', '7º Ano', '8º Ano', '9º Ano']
-        else 'Outros'
-    )
-    vendas = df_tech.groupby(['segmento_real', 'serie_real', 'unidade'])['matricula']\
-        .nunique().reset_index()
-    vendas.columns = ['segmento', 'serie', 'unidade', 'vendido']
-    return vendas
-
-
-def criar_tabela_estoque(df_vendas):
-    registros = []
-    for cod, (serie, segmento, ped_ini, ped_comp) in PEDIDO_SAE.items():
-        ped_total = ped_ini + ped_comp
-        env = ESTOQUE_ENVIADO.get(cod, {})
-        ajuste_ap = AJUSTE_ANO_PASSADO.get(cod, {})
-        for u_cod, u_nome in UNIDADES.items():
-            enviado = env.get(u_cod, 0)
-            ajuste = ajuste_ap.get(u_cod, 0)
-            vendido = 0
-            if df_vendas is not None:
-                f = (df_vendas['segmento'] == segmento) & (df_vendas['serie'] == serie) & (df_vendas['unidade'] == u_cod)
-                if f.any():
-                    vendido = df_vendas.loc[f, 'vendido'].values[0]
-            registros.append({
-                'codigo': cod, 'segmento': segmento, 'serie': serie,
-                'unidade_cod': u_cod, 'unidade': u_nome,
-                'pedido_inicial': ped_ini, 'pedido_compl': ped_comp,
-                'pedido_total': ped_total, 'enviado': enviado,
-                'ajuste': ajuste,
-                'vendido': vendido, 'estoque': enviado - vendido + ajuste,
-            })
-    df = pd.DataFrame(registros)
-    df['_ord'] = df['segmento'].map({s: i for i, s in enumerate(ORDEM_SEGMENTOS)})
-    df = df.sort_values(['_ord', 'serie', 'unidade_cod']).drop(columns=['_ord'])
-    return df
-
-
-def criar_tabela_completa(df_dados, coluna_valor, unidade_sel=None):
-    unidades_m = [unidade_sel] if unidade_sel and unidade_sel != "Todas" else list(UNIDADES.values())
-    registros = []
-    for seg, serie in ORDEM_SERIES_COMPLETA:
-        reg = {'segmento': seg, 'serie': serie, 'Descrição': f"{seg} - {serie}"}
-        for u in unidades_m:
-            f = (df_dados['segmento'] == seg) & (df_dados['serie'] == serie) & (df_dados['unidade'] == u)
-            reg[u] = int(df_dados.loc[f, coluna_valor].sum()) if f.any() else 0
-        registros.append(reg)
-    df_r = pd.DataFrame(registros)
-    cols_v = [c for c in df_r.columns if c not in ['segmento', 'serie', 'Descrição']]
-    df_r['TOTAL'] = df_r[cols_v].sum(axis=1)
-    totais = {'segmento': '', 'serie': '', 'Descrição': 'TOTAL'}
-    for c in cols_v:
-        totais[c] = df_r[c].sum()
-    totais['TOTAL'] = df_r['TOTAL'].sum()
-    df_r = pd.concat([df_r, pd.DataFrame([totais])], ignore_index=True)
-    df_r = df_r.drop(columns=['segmento', 'serie'])
-    return df_r[['Descrição'] + cols_v + ['TOTAL']]
+    resultado = ingerir_tsvs(OUTPUT_DIR, metadados)
+    if resultado is None:
+        return -1, agora
+    return resultado[0], agora
 
 
 def colorir_estoque(val):
@@ -292,44 +86,6 @@ def gerar_csv(df):
     return df.to_csv(index=False, sep=';', encoding='utf-8-sig').encode('utf-8-sig')
 
 
-def cor_celula_print(val):
-    """Retorna o estilo inline para células na versão de impressão."""
-    if isinstance(val, str):
-        return ''
-    try:
-        v = float(val)
-    except (ValueError, TypeError):
-        return ''
-    if v < 0:
-        return 'background-color: #fecaca; color: #991b1b; font-weight: bold;'
-    elif v <= 5:
-        return 'background-color: #fef3c7; color: #92400e; font-weight: bold;'
-    return 'background-color: #dcfce7; color: #166534;'
-
-
-def df_to_html_colorido(df, titulo, colunas_colorir=None):
-    """Converte DataFrame para HTML com células coloridas para impressão."""
-    html = f'<h3 style="color:#1e293b; margin-top:25px; border-bottom:2px solid #667eea; padding-bottom:6px;">{titulo}</h3>\n'
-    html += '<table style="width:100%; border-collapse:collapse; font-size:12px; margin-bottom:15px;">\n'
-    html += '<thead><tr style="background:#f0f2f6;">'
-    for col in df.columns:
-        html += f'<th style="padding:8px 10px; text-align:left; border:1px solid #d1d5db; font-weight:600; color:#374151;">{col}</th>'
-    html += '</tr></thead>\n<tbody>\n'
-    for idx, row in df.iterrows():
-        is_total = str(row.iloc[0]).strip().upper() == 'TOTAL'
-        row_style = 'background:#e0e7ff; font-weight:700;' if is_total else ''
-        html += f'<tr style="{row_style}">'
-        for col in df.columns:
-            val = row[col]
-            cell_style = 'padding:6px 10px; border:1px solid #e5e7eb;'
-            if colunas_colorir and col in colunas_colorir:
-                cell_style += ' ' + cor_celula_print(val)
-            html += f'<td style="{cell_style}">{val}</td>'
-        html += '</tr>\n'
-    html += '</tbody></table>\n'
-    return html
-
-
 def gerar_html_impressao_secao(titulo, kpis, tabelas_html, data_str, filtro_unidade="Todas"):
     """Gera HTML de impressao para uma secao individual, respeitando filtro de unidade."""
     unidade_label = f" - {filtro_unidade}" if filtro_unidade != "Todas" else ""
@@ -425,107 +181,6 @@ def gerar_html_impressao_secao(titulo, kpis, tabelas_html, data_str, filtro_unid
     return html
 
 
-def gerar_ata_html(df_ata_src, titulo, col_serie='serie'):
-    """Gera HTML de ata de entrega agrupada por unidade e turma."""
-    data_atual = datetime.now().strftime("%d/%m/%Y")
-    unidades_ata = sorted(df_ata_src['unidade'].unique())
-    total_alunos = len(df_ata_src)
-    df_ata_src = df_ata_src.copy()
-    df_ata_src['_turma_label'] = df_ata_src.apply(
-        lambda r: f"{r[col_serie]} {r['turma']}".strip() if r['turma'].strip() else str(r[col_serie]),
-        axis=1
-    )
-    html = f"""<!DOCTYPE html><html lang="pt-BR"><head><meta charset="UTF-8">
-<title>Ata de Entrega - {titulo}</title><style>
-* {{ margin:0; padding:0; box-sizing:border-box; }}
-body {{ font-family:'Segoe UI',Tahoma,sans-serif; font-size:11px; color:#1e293b; padding:20px;
-  -webkit-print-color-adjust:exact !important; print-color-adjust:exact !important; }}
-.header {{ text-align:center; border-bottom:3px solid #667eea; padding-bottom:10px; margin-bottom:15px; }}
-.header h1 {{ font-size:16px; color:#0f172a; }} .header p {{ font-size:11px; color:#64748b; margin-top:4px; }}
-h2 {{ font-size:14px; color:#0f172a; margin:20px 0 4px; background:#e0e7ff; padding:6px 10px; }}
-h3 {{ font-size:12px; color:#334155; margin:12px 0 4px; border-bottom:1px solid #e2e8f0; padding-bottom:3px; }}
-table {{ width:100%; border-collapse:collapse; margin-bottom:8px; page-break-inside:auto; }}
-th {{ background:#667eea !important; color:#fff !important; font-weight:600; padding:5px 8px;
-  text-align:center; font-size:10px; border:1px solid #94a3b8;
-  -webkit-print-color-adjust:exact !important; print-color-adjust:exact !important; }}
-td {{ padding:4px 8px; text-align:center; border:1px solid #cbd5e1; font-size:10px; }}
-td:nth-child(2) {{ text-align:left; }} td:last-child {{ min-width:120px; }}
-tr:nth-child(even) {{ background:#f8fafc !important; }}
-.assinatura {{ margin-top:30px; text-align:center; page-break-inside:avoid; margin-bottom:20px; }}
-.assinatura .linha {{ border-top:1px solid #1e293b; width:300px; margin:30px auto 4px; }}
-.assinatura p {{ font-size:10px; color:#64748b; }}
-.no-print {{ margin-bottom:12px; }}
-@media print {{ .no-print {{ display:none !important; }} tr {{ page-break-inside:avoid; }} h2 {{ page-break-before:auto; }} }}
-</style></head><body>
-<div class="header"><h1>Colegio Elo - Ata de Entrega: {titulo}</h1>
-<p>Data: {data_atual} | Total: {total_alunos} alunos</p></div>
-<button class="no-print" onclick="window.print()" style="padding:8px 20px;background:#667eea;color:#fff;border:none;border-radius:6px;cursor:pointer;font-size:12px;">Imprimir</button>
-"""
-    for u_cod in unidades_ata:
-        u_nome = UNIDADES.get(u_cod, u_cod)
-        df_u = df_ata_src[df_ata_src['unidade'] == u_cod]
-        html += f'<h2>{u_nome} ({len(df_u)} alunos)</h2>\n'
-        for turma_label in sorted(df_u['_turma_label'].unique()):
-            df_t = df_u[df_u['_turma_label'] == turma_label].sort_values('nome')
-            html += f'<h3>{turma_label} ({len(df_t)} alunos)</h3>\n'
-            html += '<table><thead><tr><th>N</th><th>Nome do Aluno</th><th>Matricula</th><th>Assinatura</th></tr></thead><tbody>\n'
-            for i, (_, row) in enumerate(df_t.iterrows(), 1):
-                html += f'<tr><td>{i}</td><td style="text-align:left">{row["nome"]}</td><td>{row["matricula"]}</td><td></td></tr>\n'
-            html += '</tbody></table>\n'
-        html += '<div class="assinatura"><div class="linha"></div><p>Responsavel pela Entrega - ' + u_nome + '</p></div>\n'
-    html += '</body></html>'
-    return html
-
-
-def gerar_ata_elotech_html(df_ata_src):
-    """Gera HTML de ata Elo Tech por unidade e serie, com colunas turno e turma."""
-    data_atual = datetime.now().strftime("%d/%m/%Y")
-    unidades_ata = sorted(df_ata_src['unidade'].unique())
-    total_alunos = len(df_ata_src)
-    html = f"""<!DOCTYPE html><html lang="pt-BR"><head><meta charset="UTF-8">
-<title>Ata de Entrega - Elo Tech</title><style>
-* {{ margin:0; padding:0; box-sizing:border-box; }}
-body {{ font-family:'Segoe UI',Tahoma,sans-serif; font-size:11px; color:#1e293b; padding:20px;
-  -webkit-print-color-adjust:exact !important; print-color-adjust:exact !important; }}
-.header {{ text-align:center; border-bottom:3px solid #667eea; padding-bottom:10px; margin-bottom:15px; }}
-.header h1 {{ font-size:16px; color:#0f172a; }} .header p {{ font-size:11px; color:#64748b; margin-top:4px; }}
-h2 {{ font-size:14px; color:#0f172a; margin:20px 0 4px; background:#e0e7ff; padding:6px 10px; }}
-h3 {{ font-size:12px; color:#334155; margin:12px 0 4px; border-bottom:1px solid #e2e8f0; padding-bottom:3px; }}
-table {{ width:100%; border-collapse:collapse; margin-bottom:8px; page-break-inside:auto; }}
-th {{ background:#667eea !important; color:#fff !important; font-weight:600; padding:5px 8px;
-  text-align:center; font-size:10px; border:1px solid #94a3b8;
-  -webkit-print-color-adjust:exact !important; print-color-adjust:exact !important; }}
-td {{ padding:4px 8px; text-align:center; border:1px solid #cbd5e1; font-size:10px; }}
-td:nth-child(2) {{ text-align:left; }} td:last-child {{ min-width:120px; }}
-tr:nth-child(even) {{ background:#f8fafc !important; }}
-.assinatura {{ margin-top:30px; text-align:center; page-break-inside:avoid; margin-bottom:20px; }}
-.assinatura .linha {{ border-top:1px solid #1e293b; width:300px; margin:30px auto 4px; }}
-.assinatura p {{ font-size:10px; color:#64748b; }}
-.no-print {{ margin-bottom:12px; }}
-@media print {{ .no-print {{ display:none !important; }} tr {{ page-break-inside:avoid; }} h2 {{ page-break-before:auto; }} }}
-</style></head><body>
-<div class="header"><h1>Colegio Elo - Ata de Entrega: Livros Elo Tech</h1>
-<p>Data: {data_atual} | Total: {total_alunos} alunos</p></div>
-<button class="no-print" onclick="window.print()" style="padding:8px 20px;background:#667eea;color:#fff;border:none;border-radius:6px;cursor:pointer;font-size:12px;">Imprimir</button>
-"""
-    for u_cod in unidades_ata:
-        u_nome = UNIDADES.get(u_cod, u_cod)
-        df_u = df_ata_src[df_ata_src['unidade'] == u_cod]
-        html += f'<h2>{u_nome} ({len(df_u)} alunos)</h2>\n'
-        for serie in sorted(df_u['serie_real'].unique()):
-            df_s = df_u[df_u['serie_real'] == serie].sort_values('nome')
-            html += f'<h3>{serie} ({len(df_s)} alunos)</h3>\n'
-            html += '<table><thead><tr><th>N</th><th>Nome do Aluno</th><th>Matricula</th><th>Turno</th><th>Turma</th><th>Assinatura</th></tr></thead><tbody>\n'
-            for i, (_, row) in enumerate(df_s.iterrows(), 1):
-                turno = row.get('turno', '')
-                turma = row.get('turma_real', '')
-                html += f'<tr><td>{i}</td><td style="text-align:left">{row["nome"]}</td><td>{row["matricula"]}</td><td>{turno}</td><td>{turma}</td><td></td></tr>\n'
-            html += '</tbody></table>\n'
-        html += '<div class="assinatura"><div class="linha"></div><p>Responsavel pela Entrega - ' + u_nome + '</p></div>\n'
-    html += '</body></html>'
-    return html
-
-
 def _filtrar_unidade_ata(df_src, filtro_un):
     """Filtra DataFrame de ata por unidade."""
     if filtro_un != "Todas":
@@ -537,22 +192,9 @@ def _filtrar_unidade_ata(df_src, filtro_un):
 # =====================================================
 # CARREGAR DADOS
 # =====================================================
-df_raw, ultima_att = carregar_vendas()
-
-# Injetar alunos Elo Tech com pagamento "Em aberto" (faturados, não pagos)
-if df_raw is not None and ELOTECH_EM_ABERTO and 'tipo' in df_raw.columns:
-    _mats_existentes = set(df_raw[df_raw['tipo'] == 'Elo Tech']['matricula'].unique())
-    _novos = []
-    for mat, nome, un, serie_pdf in ELOTECH_EM_ABERTO:
-        if mat not in _mats_existentes:
-            _novos.append({
-                'unidade': un, 'servico_codigo': '995', 'turma': '',
-                'matricula': mat, 'nome': nome, 'titulo': '', 'parcela': 'TAXA',
-                'dt_baixa': '', 'valor': '299,00', 'recebido': '0,00',
-                'segmento': 'Geral', 'serie': serie_pdf, 'tipo': 'Elo Tech',
-            })
-    if _novos:
-        df_raw = pd.concat([df_raw, pd.DataFrame(_novos)], ignore_index=True)
+_versao = versao_base()
+base = carregar_base(_versao)
+df_raw, ultima_att = (base.df_raw, base.ultima_atualizacao) if base is not None else (None, None)
 
 # Header + Atualizar
 col_t, col_b = st.columns([4, 1])
@@ -564,9 +206,9 @@ with col_b:
         with st.spinner("Atualizando..."):
             total_r, dt = atualizar_dados()
         if total_r == -1:
-            st.warning("TSVs corrompidos (menos de 80% dos registros atuais). JSON nao foi sobrescrito. Re-execute a extracao completa.")
+            st.warning("TSVs corrompidos (menos de 80% dos registros atuais). Dados nao foram sobrescritos. Re-execute a extracao completa.")
         else:
-            st.cache_data.clear()
+            # carregar_base e chaveado por versao_base(): dados novos = chave nova
             st.success(f"{total_r} registros atualizados")
             st.rerun()
 
@@ -585,32 +227,13 @@ if df_raw is None or df_raw.empty or 'tipo' not in df_raw.columns:
 # =====================================================
 # COMPUTACAO BASE (antes dos filtros)
 # =====================================================
-df_vendas_sae = calcular_vendas(df_raw, "SAE")
-df_vendas_socio = calcular_vendas(df_raw, "Socioemocional")
-df_estoque_completo = criar_tabela_estoque(df_vendas_sae)
-df_vendas_elotech = calcular_vendas_elotech_por_serie(df_raw)
+df_vendas_socio = base.vendas_socio
+df_estoque_completo = base.estoque
+df_vendas_elotech = base.vendas_elotech
+df_previsao = base.previsao
 
 # Elo Tech detail (para atas e expanders)
-df_tech_detail = df_raw[df_raw['tipo'] == 'Elo Tech'].copy()
-df_ref_detail = df_raw[df_raw['tipo'].isin(['SAE', 'Socioemocional'])].copy()
-_mat_serie = df_ref_detail.drop_duplicates(subset=['matricula', 'unidade'])\
-    .set_index(['matricula', 'unidade'])['serie'].to_dict()
-df_tech_detail['serie_real'] = df_tech_detail.apply(
-    lambda r: ELOTECH_SERIE_PDF.get((r['matricula'], r['unidade']),
-              _mat_serie.get((r['matricula'], r['unidade']),
-                             r['serie'] if r['serie'] != 'Todas' else 'Sem serie')), axis=1
-)
-_mat_turma = df_ref_detail[df_ref_detail['turma'].str.strip() != '']\
-    .drop_duplicates(subset=['matricula', 'unidade'])\
-    .set_index(['matricula', 'unidade'])['turma'].to_dict()
-df_tech_detail['turma_real'] = df_tech_detail.apply(
-    lambda r: _mat_turma.get((r['matricula'], r['unidade']),
-                             r['turma'].strip() if r['turma'].strip() else ''), axis=1
-)
-_TURNO_MAP = {'A': 'Manha', 'B': 'Tarde', 'C': 'Integral'}
-df_tech_detail['turno'] = df_tech_detail['turma_real'].map(
-    lambda t: _TURNO_MAP.get(t.strip().upper(), '') if t.strip() else ''
-)
+df_tech_detail = base.elotech_detail
 
 st.divider()
 
@@ -736,30 +359,13 @@ df_ata_tech = _filtrar_unidade_ata(
     df_tech_detail.drop_duplicates(subset=['matricula', 'unidade']).sort_values(['unidade', 'serie_real', 'nome']),
     filtro_unidade)
 
-# Balanço Físico data
-registros_bal = []
-for cod, (serie, segmento, _, _) in PEDIDO_SAE.items():
-    bal = BALANCO_FISICO.get(cod, {})
-    env = ESTOQUE_ENVIADO.get(cod, {})
-    for u_cod, u_nome in UNIDADES.items():
-        fisico_d = bal.get(u_cod, {})
-        fisico = list(fisico_d.values())[-1] if fisico_d else None
-        enviado = env.get(u_cod, 0)
-        vendido = 0
-        f = (df_vendas_sae['segmento'] == segmento) & (df_vendas_sae['serie'] == serie) & (df_vendas_sae['unidade'] == u_cod)
-        if f.any():
-            vendido = int(df_vendas_sae.loc[f, 'vendido'].values[0])
-        teorico = enviado - vendido
-        dif = (fisico - teorico) if fisico is not None else None
-        registros_bal.append({
-            'Descrição': f"{segmento} - {serie}", 'Unidade': u_nome,
-            'Enviado': enviado, 'Vendido': vendido, 'Teórico': teorico,
-            'Físico': fisico if fisico is not None else "-",
-            'Diferença': dif if dif is not None else "-",
-        })
-df_bal = pd.DataFrame(registros_bal)
+# Balanço Físico data (ultima contagem x vendido ate a data dela)
+df_bal = tabela_balanco(base.balanco, base.cubo.sae)
 if filtro_unidade != "Todas":
     df_bal = df_bal[df_bal['Unidade'] == filtro_unidade]
+df_bal_hist = tabela_historico(base.balanco)
+if filtro_unidade != "Todas":
+    df_bal_hist = df_bal_hist[df_bal_hist['Unidade'] == filtro_unidade]
 
 # SAE Detail (Visao Completa) - pre-compute para uso em tab e impressao
 registros_det = []
@@ -824,13 +430,19 @@ with tab4:
 
 # Balanço Físico (dentro da secao SAE)
 st.markdown("#### Balanço Físico vs Estoque Teórico")
-st.caption("Contagem física (29/01) vs estoque calculado (enviado - vendido)")
+st.caption("Última contagem física vs estoque calculado na data dela (enviado - vendido até a contagem)")
 df_bal_v = df_bal[df_bal['Físico'] != "-"].copy()
 if not df_bal_v.empty:
     styled_bal = df_bal_v.style.map(colorir_dif, subset=['Diferença'])
     st.dataframe(styled_bal, width="stretch", hide_index=True)
 else:
     st.info("Nenhum balanço físico registrado.")
+if not df_bal_hist.empty:
+    with st.expander(f"Histórico de contagens e quebra por intervalo ({len(df_bal_hist)})"):
+        st.caption("Quebra = (contagem anterior ou enviado - vendas no intervalo) - contagem atual. "
+                   "Positivo = faltam livros.")
+        st.dataframe(df_bal_hist.style.map(colorir_dif, subset=['Diferença']),
+                     width="stretch", hide_index=True)
 
 # Alertas (dentro da secao SAE)
 st.markdown("#### Alertas de Estoque")
@@ -849,6 +461,14 @@ with col_a2:
         st.dataframe(df_bx.rename(columns={'segmento': 'Seg.', 'serie': 'Série', 'unidade': 'Unidade', 'enviado': 'Env.', 'vendido': 'Vend.', 'estoque': 'Rest.'}), width="stretch", hide_index=True)
     else:
         st.success("Nenhum estoque baixo!")
+st.markdown(f"**Reposição Prevista (ruptura em até {PRAZO_REPOSICAO_DIAS} dias)**")
+st.caption(f"Vendas/dia dos últimos {JANELA_DIAS} dias até a última baixa "
+           f"({df_previsao.attrs['referencia']:%d/%m/%Y}); só itens ainda acima do estoque baixo")
+df_repor = tabela_reposicao(df_previsao.loc[df_estoque.index])
+if not df_repor.empty:
+    st.dataframe(df_repor, width="stretch", hide_index=True)
+else:
+    st.success("Nenhuma ruptura prevista no prazo de reposição!")
 
 # Acoes SAE
 st.markdown("---")
@@ -886,17 +506,17 @@ if st.session_state.get('print_secao') == 'sae':
     _tabelas_sae = []
     _df_est_p = criar_tabela_completa(df_estoque, 'estoque', filtro_unidade)
     _cols_num = [c for c in _df_est_p.columns if c != 'Descrição']
-    _tabelas_sae.append(df_to_html_colorido(_df_est_p, "Estoque SAE por Serie e Unidade", _cols_num))
+    _tabelas_sae.append(tabela_html_inline(_df_est_p, "Estoque SAE por Serie e Unidade", _cols_num))
     if not df_det.empty:
-        _tabelas_sae.append(df_to_html_colorido(df_det, "Detalhado (Pedido / Enviado / Vendido / Estoque)", _det_cols_estoque))
+        _tabelas_sae.append(tabela_html_inline(df_det, "Detalhado (Pedido / Enviado / Vendido / Estoque)", _det_cols_estoque))
     _df_neg_p = df_estoque[df_estoque['estoque'] < 0][['segmento', 'serie', 'unidade', 'enviado', 'vendido', 'estoque']].rename(
         columns={'segmento': 'Segmento', 'serie': 'Serie', 'unidade': 'Unidade', 'enviado': 'Enviado', 'vendido': 'Vendido', 'estoque': 'Falta'})
     if not _df_neg_p.empty:
-        _tabelas_sae.append(df_to_html_colorido(_df_neg_p, "Alerta: Estoque Negativo", ['Falta']))
+        _tabelas_sae.append(tabela_html_inline(_df_neg_p, "Alerta: Estoque Negativo", ['Falta']))
     _df_bx_p = df_estoque[(df_estoque['estoque'] > 0) & (df_estoque['estoque'] <= 5)][['segmento', 'serie', 'unidade', 'enviado', 'vendido', 'estoque']].rename(
         columns={'segmento': 'Segmento', 'serie': 'Serie', 'unidade': 'Unidade', 'enviado': 'Enviado', 'vendido': 'Vendido', 'estoque': 'Restante'})
     if not _df_bx_p.empty:
-        _tabelas_sae.append(df_to_html_colorido(_df_bx_p, "Alerta: Estoque Baixo (<=5)", ['Restante']))
+        _tabelas_sae.append(tabela_html_inline(_df_bx_p, "Alerta: Estoque Baixo (<=5)", ['Restante']))
     components.html(gerar_html_impressao_secao("Estoque SAE", _kpis_sae, _tabelas_sae, _data_imp, filtro_unidade), height=800, scrolling=True)
 
 
@@ -936,7 +556,7 @@ if st.session_state.get('ata_tipo') == 'socio':
 if st.session_state.get('print_secao') == 'socio':
     _data_imp = datetime.now().strftime("%d/%m/%Y %H:%M")
     _kpis_socio = [("Total Vendido", f"{total_socio}")]
-    _tabelas_socio = [df_to_html_colorido(df_socio, "Vendas Socioemocional (Alunos Unicos)", None)]
+    _tabelas_socio = [tabela_html_inline(df_socio, "Vendas Socioemocional (Alunos Unicos)", None)]
     components.html(gerar_html_impressao_secao("Socioemocional", _kpis_socio, _tabelas_socio, _data_imp, filtro_unidade), height=800, scrolling=True)
 
 
@@ -1030,7 +650,7 @@ if st.session_state.get('print_secao') == 'elotech':
     _kpis_tech = [("Total Vendido", f"{total_rob}")]
     _tabelas_tech = []
     if not df_rob.empty:
-        _tabelas_tech.append(df_to_html_colorido(df_rob, "Vendas Elo Tech por Serie (Alunos Unicos) - CDR excluido", None))
+        _tabelas_tech.append(tabela_html_inline(df_rob, "Vendas Elo Tech por Serie (Alunos Unicos) - CDR excluido", None))
     components.html(gerar_html_impressao_secao("Elo Tech", _kpis_tech, _tabelas_tech, _data_imp, filtro_unidade), height=800, scrolling=True)
 
 
@@ -1060,6 +680,33 @@ fig.update_xaxes(gridcolor='#e2e8f0')
 fig.update_yaxes(gridcolor='#e2e8f0')
 st.plotly_chart(fig, width="stretch")
 
+st.markdown("### Receita (Recebimentos)")
+receita = base.receita
+_u_receita = UNIDADES_INV.get(filtro_unidade) if filtro_unidade != "Todas" else None
+df_ticket = receita.ticket_medio(_u_receita)
+col_r1, col_r2, col_r3, col_r4 = st.columns(4)
+with col_r1:
+    st.metric("Receita Total", formatar_reais(receita.total(_u_receita)))
+for _col_r, _tipo_r in zip([col_r2, col_r3, col_r4], TIPOS_RECEITA):
+    with _col_r:
+        st.metric(f"Ticket Médio {_tipo_r}", formatar_reais(df_ticket.loc[_tipo_r, 'ticket_medio']))
+
+df_acum = receita.acumulado(_u_receita)
+fig_r = go.Figure()
+for _serie_r in df_acum.columns:
+    fig_r.add_trace(go.Scatter(x=df_acum.index, y=df_acum[_serie_r], name=_serie_r, mode='lines'))
+fig_r.update_layout(
+    template='plotly_white',
+    paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+    font=dict(color='#334155'),
+    legend=dict(orientation='h', y=1.1),
+    margin=dict(t=60, b=20), height=400,
+    yaxis_title='R$ acumulado',
+)
+fig_r.update_xaxes(gridcolor='#e2e8f0')
+fig_r.update_yaxes(gridcolor='#e2e8f0')
+st.plotly_chart(fig_r, width="stretch")
+
 # Acoes Gerais
 st.markdown("---")
 col_dl_all, col_print_all = st.columns(2)
@@ -1092,18 +739,18 @@ if st.session_state.get('print_secao') == 'all':
     _tabelas_all = []
     _df_est_p = criar_tabela_completa(df_estoque, 'estoque', filtro_unidade)
     _cols_num = [c for c in _df_est_p.columns if c != 'Descrição']
-    _tabelas_all.append(df_to_html_colorido(_df_est_p, "Estoque SAE por Serie e Unidade", _cols_num))
+    _tabelas_all.append(tabela_html_inline(_df_est_p, "Estoque SAE por Serie e Unidade", _cols_num))
     if not df_det.empty:
-        _tabelas_all.append(df_to_html_colorido(df_det, "Detalhado (Pedido / Enviado / Vendido / Estoque)", _det_cols_estoque))
-    _tabelas_all.append(df_to_html_colorido(df_socio, "Vendas Socioemocional (Alunos Unicos)", None))
+        _tabelas_all.append(tabela_html_inline(df_det, "Detalhado (Pedido / Enviado / Vendido / Estoque)", _det_cols_estoque))
+    _tabelas_all.append(tabela_html_inline(df_socio, "Vendas Socioemocional (Alunos Unicos)", None))
     if not df_rob.empty:
-        _tabelas_all.append(df_to_html_colorido(df_rob, "Vendas Elo Tech por Serie (Alunos Unicos) - CDR excluido", None))
+        _tabelas_all.append(tabela_html_inline(df_rob, "Vendas Elo Tech por Serie (Alunos Unicos) - CDR excluido", None))
     _df_neg_p = df_estoque[df_estoque['estoque'] < 0][['segmento', 'serie', 'unidade', 'enviado', 'vendido', 'estoque']].rename(
         columns={'segmento': 'Segmento', 'serie': 'Serie', 'unidade': 'Unidade', 'enviado': 'Enviado', 'vendido': 'Vendido', 'estoque': 'Falta'})
     if not _df_neg_p.empty:
-        _tabelas_all.append(df_to_html_colorido(_df_neg_p, "Alerta: Estoque Negativo", ['Falta']))
+        _tabelas_all.append(tabela_html_inline(_df_neg_p, "Alerta: Estoque Negativo", ['Falta']))
     _df_bx_p = df_estoque[(df_estoque['estoque'] > 0) & (df_estoque['estoque'] <= 5)][['segmento', 'serie', 'unidade', 'enviado', 'vendido', 'estoque']].rename(
         columns={'segmento': 'Segmento', 'serie': 'Serie', 'unidade': 'Unidade', 'enviado': 'Enviado', 'vendido': 'Vendido', 'estoque': 'Restante'})
     if not _df_bx_p.empty:
-        _tabelas_all.append(df_to_html_colorido(_df_bx_p, "Alerta: Estoque Baixo (<=5)", ['Restante']))
+        _tabelas_all.append(tabela_html_inline(_df_bx_p, "Alerta: Estoque Baixo (<=5)", ['Restante']))
     components.html(gerar_html_impressao_secao("Controle de Estoque", _kpis_all, _tabelas_all, _data_imp, filtro_unidade), height=800, scrolling=True)
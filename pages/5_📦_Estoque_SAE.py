@@ -11,18 +11,22 @@ import streamlit.components.v1 as components
 import pandas as pd
 import plotly.graph_objects as go
 import json
-import re
-import io
 from pathlib import Path
 from datetime import datetime
-import sys
-sys.path.insert(0, str(Path(__file__).parent.parent / "utils"))
-from dados_estoque import (
-    PEDIDO_SAE, ESTOQUE_ENVIADO, UNIDADES, ORDEM_SEGMENTOS,
-    BALANCO_FISICO, AJUSTE_ANO_PASSADO, ELOTECH_EM_ABERTO,
-    ELOTECH_SERIE_PDF, AJUSTE_SOCIO_2025,
+from utils.dados_estoque import (
+    PEDIDO_SAE, UNIDADES, ORDEM_SEGMENTOS,
+    AJUSTE_ANO_PASSADO, ELOTECH_EM_ABERTO, AJUSTE_SOCIO_2025,
+)
+from utils.scheduler import executar_extracao, carregar_credenciais, ultima_execucao
+from utils import vendas_store, excel_export
+from utils.impressao import tabela_html, gerar_ata_html, gerar_ata_elotech_html
+from utils.balanco_fisico import tabela_balanco
+from utils.previsao_estoque import JANELA_DIAS, PRAZO_REPOSICAO_DIAS, tabela_reposicao
+from utils.receita import TIPOS as TIPOS_RECEITA, formatar_reais
+from utils.estoque_engine import (
+    ORDEM_SERIES_COMPLETA, ORDEM_SERIES_SOCIO, ORDEM_SERIES_ELOTECH, UNIDADES_INV,
+    carregar_base, criar_tabela_completa, versao_base,
 )
-from siga_api import atualizar_via_api
 
 # CSS
 st.markdown("""
@@ -50,300 +54,40 @@ st.markdown("""
 BASE_DIR = Path(__file__).parent.parent
 OUTPUT_DIR = BASE_DIR / "output"
 
-CODIGOS_SERVICOS = {
-    "901", "902", "903", "904",
-    "913", "914", "915", "920", "921",
-    "916", "917", "918", "919",
-    "912", "991", "992",
-    "933", "934", "941", "942", "943", "944", "945", "946",
-    "995",
-}
-
-# Cordeiro NAO tem Elo Tech
-CODIGOS_EXCLUIR_POR_UNIDADE = {
-    "CDR": {"995"},
-}
-
-SERVICOS_MAP = {
-    "901": ("Infantil", "Infantil II", "SAE"),
-    "902": ("Infantil", "Infantil III", "SAE"),
-    "903": ("Infantil", "Infantil IV", "SAE"),
-    "904": ("Infantil", "Infantil V", "SAE"),
-    "913": ("Fund1", "3º Ano", "SAE"),
-    "914": ("Fund1", "4º Ano", "SAE"),
-    "915": ("Fund1", "5º Ano", "SAE"),
-    "920": ("Fund1", "2º Ano", "SAE"),
-    "921": ("Fund1", "1º Ano", "SAE"),
-    "916": ("Fund2", "6º Ano", "SAE"),
-    "917": ("Fund2", "7º Ano", "SAE"),
-    "918": ("Fund2", "8º Ano", "SAE"),
-    "919": ("Fund2", "9º Ano", "SAE"),
-    "912": ("Médio", "1º Ano", "SAE"),
-    "991": ("Médio", "2º Ano", "SAE"),
-    "992": ("Médio", "3º Ano", "SAE"),
-    "933": ("Infantil", "Infantil IV", "Socioemocional"),
-    "934": ("Infantil", "Infantil V", "Socioemocional"),
-    "941": ("Fund1", "1º Ano", "Socioemocional"),
-    "942": ("Fund1", "2º Ano", "Socioemocional"),
-    "943": ("Fund1", "3º Ano", "Socioemocional"),
-    "944": ("Fund1", "4º Ano", "Socioemocional"),
-    "945": ("Fund1", "5º Ano", "Socioemocional"),
-    "946": ("Fund2", "6º Ano", "Socioemocional"),
-    "995": ("Geral", "Todas", "Elo Tech"),
-}
-
-RE_SERVICO = re.compile(r'^(\d{3})\s*-\s*(.+?)(?:\s*\(|$)')
-RE_TURMA = re.compile(r'Turma\s+(\w+)')
-
-ORDEM_SERIES_COMPLETA = [
-    ('Infantil', 'Infantil II'), ('Infantil', 'Infantil III'),
-    ('Infantil', 'Infantil IV'), ('Infantil', 'Infantil V'),
-    ('Fund1', '1º Ano'), ('Fund1', '2º Ano'), ('Fund1', '3º Ano'),
-    ('Fund1', '4º Ano'), ('Fund1', '5º Ano'),
-    ('Fund2', '6º Ano'), ('Fund2', '7º Ano'),
-    ('Fund2', '8º Ano'), ('Fund2', '9º Ano'),
-    ('Médio', '1º Ano'), ('Médio', '2º Ano'), ('Médio', '3º Ano'),
-]
-
-ORDEM_SERIES_SOCIO = [
-    ('Infantil', 'Infantil IV'), ('Infantil', 'Infantil V'),
-    ('Fund1', '1º Ano'), ('Fund1', '2º Ano'), ('Fund1', '3º Ano'),
-    ('Fund1', '4º Ano'), ('Fund1', '5º Ano'),
-    ('Fund2', '6º Ano'),
-]
-
-ORDEM_SERIES_ELOTECH = [
-    ('Fund1', '2º Ano'), ('Fund1', '3º Ano'),
-    ('Fund1', '4º Ano'), ('Fund1', '5º Ano'),
-]
-
-# Mapa inverso para converter nome -> codigo
-UNIDADES_INV = {v: k for k, v in UNIDADES.items()}
-
 
 # ===========================================
 # FUNCOES DE ATUALIZACAO
 # ===========================================
 
-def parse_tsv(tsv_content, unidade_codigo):
-    """Parser de TSV dos dados do SIGA"""
-    registros = []
-    servico_codigo = ""
-    turma_atual = ""
-    excluir = CODIGOS_EXCLUIR_POR_UNIDADE.get(unidade_codigo, set())
-
-    for linha in tsv_content.split('\n'):
-        linha = linha.strip()
-        if not linha or linha.startswith('Subtotal') or linha.startswith('Matrícula'):
-            continue
-
-        if ' - ' in linha and '(' in linha:
-            match = RE_SERVICO.match(linha)
-            if match:
-                servico_codigo = match.group(1)
-                if servico_codigo not in CODIGOS_SERVICOS or servico_codigo in excluir:
-                    servico_codigo = ""
-                    continue
-                turma_match = RE_TURMA.search(linha)
-                turma_atual = turma_match.group(1) if turma_match else ""
-            continue
-
-        if not servico_codigo:
-            continue
-
-        campos = linha.split('\t')
-        if len(campos) >= 6:
-            matricula = campos[0].strip()
-            if matricula and (matricula[0].isdigit() or '-' in matricula):
-                info = SERVICOS_MAP.get(servico_codigo, ("", "", ""))
-                registros.append({
-                    "unidade": unidade_codigo,
-                    "servico_codigo": servico_codigo,
-                    "turma": turma_atual,
-                    "matricula": matricula,
-                    "nome": campos[1].strip(),
-                    "titulo": campos[2].strip(),
-                    "parcela": campos[3].strip(),
-                    "dt_baixa": campos[4].strip(),
-                    "valor": campos[5].strip(),
-                    "recebido": campos[-1].strip() if len(campos) > 6 else "",
-                    "segmento": info[0],
-                    "serie": info[1],
-                    "tipo": info[2],
-                })
-
-    return registros
-
-
 def atualizar_dados():
     """Atualiza dados via API SIGA (requests, sem Playwright).
 
+    A gravacao e o registro da execucao ficam em utils.scheduler, o mesmo
+    caminho usado pelo agendador (python -m utils.scheduler).
+
     Returns:
         -2 se credenciais nao configuradas
         -1 se erro na API
         (total_registros, datetime) se sucesso
     """
     try:
-        creds = st.secrets["siga"]
+        creds = dict(st.secrets["siga"])
     except Exception:
+        creds = carregar_credenciais()
+    if not creds:
         return -2
 
-    registros, erro = atualizar_via_api(
-        creds["instituicao"], creds["login"], creds["senha"]
-    )
-    if erro:
+    execucao = executar_extracao(creds, origem="manual")
+    if execucao["status"] != "ok":
         return -1
 
-    agora = datetime.now()
-    json_path = OUTPUT_DIR / "recebimento_final.json"
-    dados = {
-        "data_extracao": agora.isoformat(),
-        "ultima_atualizacao": agora.strftime("%d/%m/%Y %H:%M:%S"),
-        "periodo": {
-            "data_inicial": "01/08/2025",
-            "data_final": agora.strftime("%d/%m/%Y"),
-        },
-        "total_registros": len(registros),
-        "registros": registros,
-    }
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(dados, f, ensure_ascii=False, indent=2)
-
-    return len(registros), agora
+    return execucao["total_registros"], datetime.fromisoformat(execucao["fim"])
 
 
 # ===========================================
-# CARREGAR DADOS
+# ESTILOS
 # ===========================================
 
-@st.cache_data(ttl=300)
-def carregar_vendas():
-    """Carrega dados de vendas do JSON"""
-    json_path = OUTPUT_DIR / "recebimento_final.json"
-    if not json_path.exists():
-        return None, None
-
-    with open(json_path, 'r', encoding='utf-8') as f:
-        dados = json.load(f)
-
-    df = pd.DataFrame(dados.get('registros', []))
-    ultima_att = dados.get('ultima_atualizacao', 'N/A')
-    return df, ultima_att
-
-
-def calcular_vendas_por_serie_unidade(df, tipo="SAE"):
-    """Calcula vendas (alunos unicos) por serie e unidade"""
-    df_filtrado = df[df['tipo'] == tipo].copy()
-    vendas = df_filtrado.groupby(['segmento', 'serie', 'unidade'])['matricula'].nunique().reset_index()
-    vendas.columns = ['segmento', 'serie', 'unidade', 'vendido']
-    return vendas
-
-
-def calcular_vendas_elotech_por_serie(df):
-    """Cruza matriculas Elo Tech com SAE/Socioemocional para descobrir a serie."""
-    df_tech = df[df['tipo'] == 'Elo Tech'].copy()
-    df_ref = df[df['tipo'].isin(['SAE', 'Socioemocional'])].copy()
-    if df_tech.empty:
-        return pd.DataFrame(columns=['segmento', 'serie', 'unidade', 'vendido'])
-    mat_serie = df_ref.drop_duplicates(subset=['matricula', 'unidade'])\
-        .set_index(['matricula', 'unidade'])['serie'].to_dict()
-    df_tech['serie_real'] = df_tech.apply(
-        lambda r: ELOTECH_SERIE_PDF.get((r['matricula'], r['unidade']),
-                  mat_serie.get((r['matricula'], r['unidade']),
-                                r['serie'] if r['serie'] != 'Todas' else 'Sem serie')), axis=1
-    )
-    df_tech['segmento_real'] = df_tech['serie_real'].apply(
-        lambda s: 'Fund1' if s in ['1º Ano', '2º Ano', '3º Ano', '4º Ano', '5º Ano']
-        else 'Fund2' if s in ['6º Ano', '7º Ano', '8º Ano', '9º Ano']
-        else 'Outros'
-    )
-    vendas = df_tech.groupby(['segmento_real', 'serie_real', 'unidade'])['matricula']\
-        .nunique().reset_index()
-    vendas.columns = ['segmento', 'serie', 'unidade', 'vendido']
-    return vendas
-
-
-def criar_tabela_estoque(df_vendas):
-    """Cria tabela completa de controle de estoque"""
-    registros = []
-
-    for cod, (serie, segmento, pedido_inicial, pedido_compl) in PEDIDO_SAE.items():
-        pedido_total = pedido_inicial + pedido_compl
-        estoque_enviado = ESTOQUE_ENVIADO.get(cod, {})
-        ajuste_ap = AJUSTE_ANO_PASSADO.get(cod, {})
-
-        for unidade_cod, unidade_nome in UNIDADES.items():
-            enviado = estoque_enviado.get(unidade_cod, 0)
-            ajuste = ajuste_ap.get(unidade_cod, 0)
-
-            vendido = 0
-            if df_vendas is not None:
-                filtro = (
-                    (df_vendas['segmento'] == segmento) &
-                    (df_vendas['serie'] == serie) &
-                    (df_vendas['unidade'] == unidade_cod)
-                )
-                if filtro.any():
-                    vendido = df_vendas.loc[filtro, 'vendido'].values[0]
-
-            estoque_restante = enviado - vendido + ajuste
-
-            registros.append({
-                'codigo': cod,
-                'segmento': segmento,
-                'serie': serie,
-                'unidade_cod': unidade_cod,
-                'unidade': unidade_nome,
-                'pedido_inicial': pedido_inicial,
-                'pedido_compl': pedido_compl,
-                'pedido_total': pedido_total,
-                'enviado': enviado,
-                'ajuste': ajuste,
-                'vendido': vendido,
-                'estoque': estoque_restante
-            })
-
-    df = pd.DataFrame(registros)
-    df['segmento_ordem'] = df['segmento'].map({s: i for i, s in enumerate(ORDEM_SEGMENTOS)})
-    df = df.sort_values(['segmento_ordem', 'serie', 'unidade_cod'])
-    df = df.drop(columns=['segmento_ordem'])
-    return df
-
-
-def criar_tabela_completa(df_dados, coluna_valor, unidade_selecionada=None):
-    """Cria tabela com TODAS as series"""
-    if unidade_selecionada and unidade_selecionada != "Todas":
-        unidades_mostrar = [unidade_selecionada]
-    else:
-        unidades_mostrar = list(UNIDADES.values())
-
-    registros = []
-    for segmento, serie in ORDEM_SERIES_COMPLETA:
-        registro = {'segmento': segmento, 'serie': serie, 'Descrição': f"{segmento} - {serie}"}
-        for unidade_nome in unidades_mostrar:
-            filtro = (
-                (df_dados['segmento'] == segmento) &
-                (df_dados['serie'] == serie) &
-                (df_dados['unidade'] == unidade_nome)
-            )
-            registro[unidade_nome] = int(df_dados.loc[filtro, coluna_valor].sum()) if filtro.any() else 0
-        registros.append(registro)
-
-    df_resultado = pd.DataFrame(registros)
-    colunas_valores = [c for c in df_resultado.columns if c not in ['segmento', 'serie', 'Descrição']]
-    df_resultado['TOTAL'] = df_resultado[colunas_valores].sum(axis=1)
-
-    totais = {'segmento': '', 'serie': '', 'Descrição': 'TOTAL'}
-    for col in colunas_valores:
-        totais[col] = df_resultado[col].sum()
-    totais['TOTAL'] = df_resultado['TOTAL'].sum()
-    df_resultado = pd.concat([df_resultado, pd.DataFrame([totais])], ignore_index=True)
-
-    df_resultado = df_resultado.drop(columns=['segmento', 'serie'])
-    cols = ['Descrição'] + colunas_valores + ['TOTAL']
-    return df_resultado[cols]
-
-
 def colorir_estoque(val):
     if isinstance(val, str):
         return ''
@@ -369,69 +113,33 @@ def colorir_diferenca(val):
 # HELPER: GERAR EXCEL EM MEMORIA
 # ===========================================
 
-def _to_excel_bytes(df, sheet_name="Dados"):
-    """Converte um DataFrame em bytes Excel (openpyxl)."""
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-    return buf.getvalue()
-
+def _botao_excel(label, prefixo_arquivo, key, chave, abas):
+    """Botao de download Excel gerado so quando pedido (utils.excel_export).
 
-def _to_excel_multi_sheets(sheets_dict):
-    """Converte multiplos DataFrames em um unico Excel com varias abas.
-    sheets_dict: {nome_aba: dataframe}
+    chave: (versao dos dados, filtros) - o export fica em cache por chave + key.
+    abas: dict {nome_aba: DataFrame} ou callable que retorna esse dict.
     """
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-        for sheet_name, df in sheets_dict.items():
-            df.to_excel(writer, index=False, sheet_name=sheet_name)
-    return buf.getvalue()
+    chave = tuple(chave) + (key,)
+    dados = excel_export.obter(chave)
+    if dados is None:
+        if not st.button(label.replace("Baixar", "Gerar"), key=f"gerar_{key}", use_container_width=True):
+            return
+        with st.spinner("Gerando Excel..."):
+            dados = excel_export.gerar(chave, abas)
+    st.download_button(
+        label=label,
+        data=dados,
+        file_name=f"{prefixo_arquivo}_{datetime.now().strftime('%Y%m%d')}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        key=key,
+        use_container_width=True,
+    )
 
 
 # ===========================================
 # HELPER: HTML DE IMPRESSAO POR SECAO
 # ===========================================
 
-def df_to_html_colorido(df, titulo, colunas_colorir=None):
-    """Converte DataFrame para HTML com celulas coloridas para impressao."""
-    html = f"<h3>{titulo}</h3>\n" if titulo else ""
-    html += "<table>\n<thead><tr>"
-    for col in df.columns:
-        html += f"<th>{col}</th>"
-    html += "</tr></thead>\n<tbody>\n"
-    for _, row in df.iterrows():
-        html += "<tr>"
-        for col in df.columns:
-            val = row[col]
-            style = ""
-            if colunas_colorir and col in colunas_colorir and not isinstance(val, str):
-                try:
-                    v = float(val)
-                    if v < 0:
-                        style = ' class="cell-neg"'
-                    elif v <= 5:
-                        style = ' class="cell-warn"'
-                    else:
-                        style = ' class="cell-ok"'
-                except (ValueError, TypeError):
-                    pass
-            elif colunas_colorir is None and col not in ("Descricao", "Descrição", "Unidade") and not isinstance(val, str):
-                try:
-                    v = float(val)
-                    if v < 0:
-                        style = ' class="cell-neg"'
-                    elif v <= 5:
-                        style = ' class="cell-warn"'
-                    else:
-                        style = ' class="cell-ok"'
-                except (ValueError, TypeError):
-                    pass
-            html += f"<td{style}>{val}</td>"
-        html += "</tr>\n"
-    html += "</tbody></table>\n"
-    return html
-
-
 def gerar_html_impressao_secao(titulo, kpis, tabelas_html, data_str, filtro_unidade="Todas"):
     """Gera HTML de impressao para uma secao individual."""
     unidade_label = f" - {filtro_unidade}" if filtro_unidade != "Todas" else ""
@@ -556,108 +264,6 @@ def gerar_html_impressao_completo(kpis, tabelas_html, data_str, filtro_unidade="
 # ATAS DE ENTREGA (FUNCOES)
 # ===========================================
 
-def gerar_ata_html(df_ata_src, titulo, col_serie='serie'):
-    """Gera HTML de ata de entrega agrupada por unidade e turma (serie+turma)."""
-    data_atual = datetime.now().strftime("%d/%m/%Y")
-    unidades_ata = sorted(df_ata_src['unidade'].unique())
-    total_alunos = len(df_ata_src)
-    # Montar label de turma: "2o Ano A" ou "2o Ano" se turma vazia
-    df_ata_src = df_ata_src.copy()
-    df_ata_src['_turma_label'] = df_ata_src.apply(
-        lambda r: f"{r[col_serie]} {r['turma']}".strip() if r['turma'].strip() else str(r[col_serie]),
-        axis=1
-    )
-    html = f"""<!DOCTYPE html><html lang="pt-BR"><head><meta charset="UTF-8">
-<title>Ata de Entrega - {titulo}</title><style>
-* {{ margin:0; padding:0; box-sizing:border-box; }}
-body {{ font-family:'Segoe UI',Tahoma,sans-serif; font-size:11px; color:#1e293b; padding:20px;
-  -webkit-print-color-adjust:exact !important; print-color-adjust:exact !important; }}
-.header {{ text-align:center; border-bottom:3px solid #667eea; padding-bottom:10px; margin-bottom:15px; }}
-.header h1 {{ font-size:16px; color:#0f172a; }} .header p {{ font-size:11px; color:#64748b; margin-top:4px; }}
-h2 {{ font-size:14px; color:#0f172a; margin:20px 0 4px; background:#e0e7ff; padding:6px 10px; }}
-h3 {{ font-size:12px; color:#334155; margin:12px 0 4px; border-bottom:1px solid #e2e8f0; padding-bottom:3px; }}
-table {{ width:100%; border-collapse:collapse; margin-bottom:8px; page-break-inside:auto; }}
-th {{ background:#667eea !important; color:#fff !important; font-weight:600; padding:5px 8px;
-  text-align:center; font-size:10px; border:1px solid #94a3b8;
-  -webkit-print-color-adjust:exact !important; print-color-adjust:exact !important; }}
-td {{ padding:4px 8px; text-align:center; border:1px solid #cbd5e1; font-size:10px; }}
-td:nth-child(2) {{ text-align:left; }} td:last-child {{ min-width:120px; }}
-tr:nth-child(even) {{ background:#f8fafc !important; }}
-.assinatura {{ margin-top:30px; text-align:center; page-break-inside:avoid; margin-bottom:20px; }}
-.assinatura .linha {{ border-top:1px solid #1e293b; width:300px; margin:30px auto 4px; }}
-.assinatura p {{ font-size:10px; color:#64748b; }}
-.no-print {{ margin-bottom:12px; }}
-@media print {{ .no-print {{ display:none !important; }} tr {{ page-break-inside:avoid; }} h2 {{ page-break-before:auto; }} }}
-</style></head><body>
-<div class="header"><h1>Colegio Elo - Ata de Entrega: {titulo}</h1>
-<p>Data: {data_atual} | Total: {total_alunos} alunos</p></div>
-<button class="no-print" onclick="window.print()" style="padding:8px 20px;background:#667eea;color:#fff;border:none;border-radius:6px;cursor:pointer;font-size:12px;">Imprimir</button>
-"""
-    for u_cod in unidades_ata:
-        u_nome = UNIDADES.get(u_cod, u_cod)
-        df_u = df_ata_src[df_ata_src['unidade'] == u_cod]
-        html += f'<h2>{u_nome} ({len(df_u)} alunos)</h2>\n'
-        for turma_label in sorted(df_u['_turma_label'].unique()):
-            df_t = df_u[df_u['_turma_label'] == turma_label].sort_values('nome')
-            html += f'<h3>{turma_label} ({len(df_t)} alunos)</h3>\n'
-            html += '<table><thead><tr><th>N</th><th>Nome do Aluno</th><th>Matricula</th><th>Assinatura</th></tr></thead><tbody>\n'
-            for i, (_, row) in enumerate(df_t.iterrows(), 1):
-                html += f'<tr><td>{i}</td><td style="text-align:left">{row["nome"]}</td><td>{row["matricula"]}</td><td></td></tr>\n'
-            html += '</tbody></table>\n'
-        html += '<div class="assinatura"><div class="linha"></div><p>Responsavel pela Entrega - ' + u_nome + '</p></div>\n'
-    html += '</body></html>'
-    return html
-
-
-def gerar_ata_elotech_html(df_ata_src):
-    """Gera HTML de ata Elo Tech por unidade e serie, com colunas turno e turma."""
-    data_atual = datetime.now().strftime("%d/%m/%Y")
-    unidades_ata = sorted(df_ata_src['unidade'].unique())
-    total_alunos = len(df_ata_src)
-    html = f"""<!DOCTYPE html><html lang="pt-BR"><head><meta charset="UTF-8">
-<title>Ata de Entrega - Elo Tech</title><style>
-* {{ margin:0; padding:0; box-sizing:border-box; }}
-body {{ font-family:'Segoe UI',Tahoma,sans-serif; font-size:11px; color:#1e293b; padding:20px;
-  -webkit-print-color-adjust:exact !important; print-color-adjust:exact !important; }}
-.header {{ text-align:center; border-bottom:3px solid #667eea; padding-bottom:10px; margin-bottom:15px; }}
-.header h1 {{ font-size:16px; color:#0f172a; }} .header p {{ font-size:11px; color:#64748b; margin-top:4px; }}
-h2 {{ font-size:14px; color:#0f172a; margin:20px 0 4px; background:#e0e7ff; padding:6px 10px; }}
-h3 {{ font-size:12px; color:#334155; margin:12px 0 4px; border-bottom:1px solid #e2e8f0; padding-bottom:3px; }}
-table {{ width:100%; border-collapse:collapse; margin-bottom:8px; page-break-inside:auto; }}
-th {{ background:#667eea !important; color:#fff !important; font-weight:600; padding:5px 8px;
-  text-align:center; font-size:10px; border:1px solid #94a3b8;
-  -webkit-print-color-adjust:exact !important; print-color-adjust:exact !important; }}
-td {{ padding:4px 8px; text-align:center; border:1px solid #cbd5e1; font-size:10px; }}
-td:nth-child(2) {{ text-align:left; }} td:last-child {{ min-width:120px; }}
-tr:nth-child(even) {{ background:#f8fafc !important; }}
-.assinatura {{ margin-top:30px; text-align:center; page-break-inside:avoid; margin-bottom:20px; }}
-.assinatura .linha {{ border-top:1px solid #1e293b; width:300px; margin:30px auto 4px; }}
-.assinatura p {{ font-size:10px; color:#64748b; }}
-.no-print {{ margin-bottom:12px; }}
-@media print {{ .no-print {{ display:none !important; }} tr {{ page-break-inside:avoid; }} h2 {{ page-break-before:auto; }} }}
-</style></head><body>
-<div class="header"><h1>Colegio Elo - Ata de Entrega: Livros Elo Tech</h1>
-<p>Data: {data_atual} | Total: {total_alunos} alunos</p></div>
-<button class="no-print" onclick="window.print()" style="padding:8px 20px;background:#667eea;color:#fff;border:none;border-radius:6px;cursor:pointer;font-size:12px;">Imprimir</button>
-"""
-    for u_cod in unidades_ata:
-        u_nome = UNIDADES.get(u_cod, u_cod)
-        df_u = df_ata_src[df_ata_src['unidade'] == u_cod]
-        html += f'<h2>{u_nome} ({len(df_u)} alunos)</h2>\n'
-        for serie in sorted(df_u['serie_real'].unique()):
-            df_s = df_u[df_u['serie_real'] == serie].sort_values('nome')
-            html += f'<h3>{serie} ({len(df_s)} alunos)</h3>\n'
-            html += '<table><thead><tr><th>N</th><th>Nome do Aluno</th><th>Matricula</th><th>Turno</th><th>Turma</th><th>Assinatura</th></tr></thead><tbody>\n'
-            for i, (_, row) in enumerate(df_s.iterrows(), 1):
-                turno = row.get('turno', '')
-                turma = row.get('turma_real', '')
-                html += f'<tr><td>{i}</td><td style="text-align:left">{row["nome"]}</td><td>{row["matricula"]}</td><td>{turno}</td><td>{turma}</td><td></td></tr>\n'
-            html += '</tbody></table>\n'
-        html += '<div class="assinatura"><div class="linha"></div><p>Responsavel pela Entrega - ' + u_nome + '</p></div>\n'
-    html += '</body></html>'
-    return html
-
-
 def _filtrar_unidade_ata(df_src, filtro_un):
     """Filtra DataFrame de ata pela unidade selecionada."""
     if filtro_un and filtro_un != "Todas":
@@ -681,63 +287,13 @@ def _abrir_impressao(html_content):
     )
 
 
-# ===========================================
-# AUTO-ATUALIZACAO PROGRAMADA
-# ===========================================
-
-HORARIOS_ATUALIZACAO = [7, 9, 12, 14, 17, 19]
-
-
-def _precisa_atualizar():
-    """Verifica se dados estao defasados em relacao ao horario programado."""
-    json_path = OUTPUT_DIR / "recebimento_final.json"
-    if not json_path.exists():
-        return True
-
-    agora = datetime.now()
-    horarios_passados = [h for h in HORARIOS_ATUALIZACAO if h <= agora.hour]
-    if not horarios_passados:
-        return False
-
-    ultimo_horario = max(horarios_passados)
-    limite = agora.replace(hour=ultimo_horario, minute=0, second=0, microsecond=0)
-    mtime = datetime.fromtimestamp(json_path.stat().st_mtime)
-    return mtime < limite
-
-
-if '_auto_att_feita' not in st.session_state:
-    st.session_state['_auto_att_feita'] = False
-
-if not st.session_state['_auto_att_feita'] and _precisa_atualizar():
-    _resultado_auto = atualizar_dados()
-    st.session_state['_auto_att_feita'] = True
-    if isinstance(_resultado_auto, tuple):
-        _n_auto, _ = _resultado_auto
-        st.cache_data.clear()
-        st.toast(f"Dados atualizados automaticamente: {_n_auto} registros ({datetime.now().strftime('%H:%M')})")
-        st.rerun()
-
-
 # ===========================================
 # HEADER + BOTAO ATUALIZAR
 # ===========================================
 
-df_vendas_raw, ultima_atualizacao = carregar_vendas()
-
-# Injetar alunos Elo Tech com pagamento "Em aberto" (faturados, nao pagos)
-if df_vendas_raw is not None and ELOTECH_EM_ABERTO:
-    _mats_existentes = set(df_vendas_raw[df_vendas_raw['tipo'] == 'Elo Tech']['matricula'].unique())
-    _novos = []
-    for mat, nome, un, serie_pdf in ELOTECH_EM_ABERTO:
-        if mat not in _mats_existentes:
-            _novos.append({
-                'unidade': un, 'servico_codigo': '995', 'turma': '',
-                'matricula': mat, 'nome': nome, 'titulo': '', 'parcela': 'TAXA',
-                'dt_baixa': '', 'valor': '299,00', 'recebido': '0,00',
-                'segmento': 'Geral', 'serie': serie_pdf, 'tipo': 'Elo Tech',
-            })
-    if _novos:
-        df_vendas_raw = pd.concat([df_vendas_raw, pd.DataFrame(_novos)], ignore_index=True)
+_versao = versao_base()
+base = carregar_base(_versao)
+df_vendas_raw, ultima_atualizacao = (base.df_raw, base.ultima_atualizacao) if base is not None else (None, None)
 
 col_title, col_btn = st.columns([4, 1])
 with col_title:
@@ -749,14 +305,7 @@ with col_btn:
     st.markdown("<br>", unsafe_allow_html=True)
     if st.button("Atualizar Dados", type="primary", use_container_width=True):
         # Capturar contagem anterior para comparacao
-        _json_antes = OUTPUT_DIR / "recebimento_final.json"
-        _regs_antes = 0
-        if _json_antes.exists():
-            try:
-                with open(_json_antes, 'r', encoding='utf-8') as _f:
-                    _regs_antes = len(json.load(_f).get('registros', []))
-            except Exception:
-                pass
+        _regs_antes = vendas_store.contar_registros()
 
         with st.spinner("Conectando ao SIGA (4 unidades em paralelo)..."):
             resultado = atualizar_dados()
@@ -769,7 +318,7 @@ with col_btn:
             total_reg, dt_att = resultado
             _diff = total_reg - _regs_antes
             _diff_txt = f" ({_diff:+d} vs anterior)" if _regs_antes > 0 else ""
-            st.cache_data.clear()
+            # carregar_base e chaveado por versao_base(): dados novos = chave nova
             st.success(f"Atualizado! {total_reg} registros{_diff_txt} em {dt_att.strftime('%H:%M:%S')}")
             if _diff < 0 and _regs_antes > 0:
                 st.warning(f"Atencao: {abs(_diff)} registros a menos que a extracao anterior ({_regs_antes}). Verifique se ha titulos removidos no SIGA.")
@@ -778,6 +327,11 @@ with col_btn:
 if ultima_atualizacao:
     st.caption(f"Dados atualizados em: {ultima_atualizacao}")
 
+# Extracao programada roda fora da pagina (python -m utils.scheduler)
+_ultima_exec = ultima_execucao(origem="scheduler")
+if _ultima_exec and _ultima_exec["status"] != "ok":
+    st.warning(f"Ultima extracao automatica falhou ({_ultima_exec['inicio']}): {_ultima_exec['erro']}")
+
 if df_vendas_raw is None:
     st.error("Dados de vendas nao encontrados. Clique em 'Atualizar Dados' ou execute a extracao.")
     st.stop()
@@ -787,35 +341,16 @@ if df_vendas_raw is None:
 # COMPUTACAO GLOBAL (antes de qualquer render)
 # ===========================================
 
-# --- Vendas e estoque SAE ---
-df_vendas_sae = calcular_vendas_por_serie_unidade(df_vendas_raw, "SAE")
-df_vendas_socio = calcular_vendas_por_serie_unidade(df_vendas_raw, "Socioemocional")
-df_estoque_completo = criar_tabela_estoque(df_vendas_sae)
-
-# --- Vendas Elo Tech (computado antes de render) ---
-df_vendas_elotech = calcular_vendas_elotech_por_serie(df_vendas_raw)
+# --- Vendas, estoque SAE, Elo Tech e cubo (utils.estoque_engine) ---
+df_vendas_sae = base.vendas_sae
+df_vendas_socio = base.vendas_socio
+df_estoque_completo = base.estoque
+df_vendas_elotech = base.vendas_elotech
+cubo = base.cubo
+df_previsao = base.previsao
 
 # --- Detail Elo Tech (para expanders e ata) ---
-df_vendas_elotech_detail = df_vendas_raw[df_vendas_raw['tipo'] == 'Elo Tech'].copy()
-df_ref_detail = df_vendas_raw[df_vendas_raw['tipo'].isin(['SAE', 'Socioemocional'])].copy()
-_mat_serie = df_ref_detail.drop_duplicates(subset=['matricula', 'unidade'])\
-    .set_index(['matricula', 'unidade'])['serie'].to_dict()
-_mat_turma = df_ref_detail[df_ref_detail['turma'].str.strip() != '']\
-    .drop_duplicates(subset=['matricula', 'unidade'])\
-    .set_index(['matricula', 'unidade'])['turma'].to_dict()
-df_vendas_elotech_detail['serie_real'] = df_vendas_elotech_detail.apply(
-    lambda r: ELOTECH_SERIE_PDF.get((r['matricula'], r['unidade']),
-              _mat_serie.get((r['matricula'], r['unidade']),
-                             r['serie'] if r['serie'] != 'Todas' else 'Sem serie')), axis=1
-)
-df_vendas_elotech_detail['turma_real'] = df_vendas_elotech_detail.apply(
-    lambda r: _mat_turma.get((r['matricula'], r['unidade']),
-                             r['turma'].strip() if r['turma'].strip() else ''), axis=1
-)
-_TURNO_MAP = {'A': 'Manha', 'B': 'Tarde', 'C': 'Integral'}
-df_vendas_elotech_detail['turno'] = df_vendas_elotech_detail['turma_real'].map(
-    lambda t: _TURNO_MAP.get(t.strip().upper(), '') if t.strip() else ''
-)
+df_vendas_elotech_detail = base.elotech_detail
 
 # --- Excel export data (SAE) ---
 df_estoque_export = df_estoque_completo[['segmento', 'serie', 'unidade', 'pedido_total', 'enviado', 'vendido', 'ajuste', 'estoque']].rename(
@@ -908,13 +443,9 @@ for _u_cod, _u_nome in [("BV", "Boa Viagem"), ("CD", "Candeias"), ("JG", "Janga"
     _totais_u = {'vendido_sae': 0, 'enviado_sae': 0, 'estoque_sae': 0, 'vendido_socio': 0, 'vendido_tech': 0}
 
     # --- SAE ---
-    for _cod, (_serie, _seg, _, _) in PEDIDO_SAE.items():
-        _aj = AJUSTE_ANO_PASSADO.get(_cod, {}).get(_u_cod, 0)
-        _env = ESTOQUE_ENVIADO.get(_cod, {}).get(_u_cod, 0)
-        _f = (df_vendas_sae['segmento'] == _seg) & (df_vendas_sae['serie'] == _serie) & (df_vendas_sae['unidade'] == _u_cod)
-        _vend = int(df_vendas_sae.loc[_f, 'vendido'].values[0]) if _f.any() else 0
-        _est = _env - _vend + _aj
-        _liq = _vend - _aj
+    for _r in cubo.sae_unidade(_u_cod).itertuples():
+        _serie = _r.serie
+        _aj, _env, _vend, _est = int(_r.ajuste), int(_r.enviado), int(_r.vendido), int(_r.estoque)
         _totais_u['vendido_sae'] += _vend
         _totais_u['enviado_sae'] += _env
         _totais_u['estoque_sae'] += _est
@@ -926,12 +457,15 @@ for _u_cod, _u_nome in [("BV", "Boa Viagem"), ("CD", "Candeias"), ("JG", "Janga"
         if _aj > 0 and _aj >= _vend:
             _alertas_sae.append(f"**{_serie}**: Ajuste 2025 ({_aj}) >= Vendido ({_vend}) — venda liquida zero ou negativa, checar contratos")
 
+    _prev_u = df_previsao[(df_previsao['unidade_cod'] == _u_cod) & df_previsao['antecipar']]
+    for _p in _prev_u.sort_values('dias_restantes').itertuples():
+        _alertas_sae.append(f"**{_p.serie}**: ruptura prevista em {_p.data_ruptura:%d/%m} "
+                            f"({_p.dias_restantes:.0f} dias, {_p.velocidade:.1f}/dia, {_p.estoque} restantes) — programar reposicao")
+
     # --- Socioemocional ---
     for _seg_s, _serie_s in ORDEM_SERIES_SOCIO:
-        _f_s = (df_vendas_socio['segmento'] == _seg_s) & (df_vendas_socio['serie'] == _serie_s) & (df_vendas_socio['unidade'] == _u_cod)
-        _vend_s = int(df_vendas_socio.loc[_f_s, 'vendido'].sum()) if _f_s.any() else 0
+        _vend_s = cubo.vendido('Socioemocional', _seg_s, _serie_s, _u_cod)
         _aj_s = AJUSTE_SOCIO_2025.get(_serie_s, {}).get(_u_cod, 0)
-        _liq_s = _vend_s - _aj_s
         _totais_u['vendido_socio'] += _vend_s
         if _aj_s > 0 and _aj_s >= _vend_s:
             _alertas_socio.append(f"**{_serie_s}**: Ajuste ({_aj_s}) >= Vendido ({_vend_s}) — conferir contratos novos")
@@ -941,20 +475,11 @@ for _u_cod, _u_nome in [("BV", "Boa Viagem"), ("CD", "Candeias"), ("JG", "Janga"
     # --- Elo Tech ---
     if _u_cod != 'CDR':
         for _seg_e, _serie_e in ORDEM_SERIES_ELOTECH:
-            _f_e = (df_vendas_elotech['segmento'] == _seg_e) & (df_vendas_elotech['serie'] == _serie_e) & (df_vendas_elotech['unidade'] == _u_cod)
-            _vend_e = int(df_vendas_elotech.loc[_f_e, 'vendido'].sum()) if _f_e.any() else 0
-            _totais_u['vendido_tech'] += _vend_e
+            _totais_u['vendido_tech'] += cubo.vendido('Elo Tech', _seg_e, _serie_e, _u_cod)
         # Alunos sem serie identificada
-        _tech_detail = df_vendas_raw[(df_vendas_raw['tipo'] == 'Elo Tech') & (df_vendas_raw['unidade'] == _u_cod)]
-        _tech_unicos = _tech_detail.drop_duplicates(subset=['matricula'])
-        _sem_serie = _tech_unicos[~_tech_unicos['matricula'].isin(
-            [k[0] for k in ELOTECH_SERIE_PDF if k[1] == _u_cod]
-        )]
-        _sem_serie_sae = _sem_serie[~_sem_serie['matricula'].isin(
-            df_vendas_raw[df_vendas_raw['tipo'].isin(['SAE', 'Socioemocional'])]['matricula'].unique()
-        )]
-        if len(_sem_serie_sae) > 0:
-            _alertas_tech.append(f"{len(_sem_serie_sae)} aluno(s) Elo Tech sem serie identificada (sem SAE/Socio e fora do PDF)")
+        _n_sem_serie = cubo.sem_serie_elotech.get(_u_cod, 0)
+        if _n_sem_serie > 0:
+            _alertas_tech.append(f"{_n_sem_serie} aluno(s) Elo Tech sem serie identificada (sem SAE/Socio e fora do PDF)")
 
     _total_alertas = len(_alertas_sae) + len(_alertas_socio) + len(_alertas_tech)
 
@@ -1032,9 +557,8 @@ st.divider()
 # ===========================================
 
 # Indicador de frescor dos dados
-_json_check = OUTPUT_DIR / "recebimento_final.json"
-if _json_check.exists():
-    _mtime = datetime.fromtimestamp(_json_check.stat().st_mtime)
+_mtime = vendas_store.data_modificacao()
+if _mtime is not None:
     _horas_atraso = (datetime.now() - _mtime).total_seconds() / 3600
 
     if _horas_atraso < 6:
@@ -1066,18 +590,13 @@ with st.expander("Conferencia de Dados — Auditoria de Vendas", expanded=False)
     st.markdown("##### Registros Brutos vs Alunos Unicos")
     _resumo = []
     for _tipo in ['SAE', 'Socioemocional', 'Elo Tech']:
-        _df_t = df_vendas_raw[df_vendas_raw['tipo'] == _tipo]
-        _regs = len(_df_t)
-        _uni = _df_t['matricula'].nunique()
+        _regs, _uni = cubo.contagem(_tipo)
         _resumo.append({
             'Tipo': _tipo,
             'Registros SIGA': _regs,
             'Alunos Unicos': _uni,
             'Parc./Aluno': round(_regs / _uni, 1) if _uni else 0,
-            'BV': _df_t[_df_t['unidade'] == 'BV']['matricula'].nunique(),
-            'CD': _df_t[_df_t['unidade'] == 'CD']['matricula'].nunique(),
-            'JG': _df_t[_df_t['unidade'] == 'JG']['matricula'].nunique(),
-            'CDR': _df_t[_df_t['unidade'] == 'CDR']['matricula'].nunique(),
+            **{u: cubo.contagem(_tipo, u)[1] for u in ['BV', 'CD', 'JG', 'CDR']},
         })
     _resumo.append({
         'Tipo': 'TOTAL',
@@ -1097,14 +616,8 @@ with st.expander("Conferencia de Dados — Auditoria de Vendas", expanded=False)
     _det = []
     for cod, (serie, segmento, _, _) in PEDIDO_SAE.items():
         _row = {'Cod': cod, 'Serie': f"{segmento} - {serie}"}
-        _df_cod = df_vendas_raw[
-            (df_vendas_raw['tipo'] == 'SAE') &
-            (df_vendas_raw['segmento'] == segmento) &
-            (df_vendas_raw['serie'] == serie)
-        ]
         for u in ['BV', 'CD', 'JG', 'CDR']:
-            _sub = _df_cod[_df_cod['unidade'] == u]
-            _row[u] = _sub['matricula'].nunique()
+            _row[u] = cubo.vendido('SAE', segmento, serie, u)
         _row['Total'] = sum(_row[u] for u in ['BV', 'CD', 'JG', 'CDR'])
         _det.append(_row)
     _df_det_audit = pd.DataFrame(_det)
@@ -1117,36 +630,29 @@ with st.expander("Conferencia de Dados — Auditoria de Vendas", expanded=False)
     # 3. Confronto Vendido vs Ajuste — divergencias
     st.markdown("##### Divergencias: Vendido vs Ajuste 2025 vs Estoque")
     _problemas = []
-    for cod, (serie, segmento, _, _) in PEDIDO_SAE.items():
-        for u_cod in ['BV', 'CD', 'JG', 'CDR']:
-            _aj = AJUSTE_ANO_PASSADO.get(cod, {}).get(u_cod, 0)
-            _f = (
-                (df_vendas_sae['segmento'] == segmento) &
-                (df_vendas_sae['serie'] == serie) &
-                (df_vendas_sae['unidade'] == u_cod)
-            )
-            _vend = int(df_vendas_sae.loc[_f, 'vendido'].values[0]) if _f.any() else 0
-            _liq = _vend - _aj
-            _env = ESTOQUE_ENVIADO.get(cod, {}).get(u_cod, 0)
-            _est = _env - _vend + _aj
-            if _liq < 0 or _est < 0 or (_aj > 0 and _aj >= _vend):
-                _alerta = []
-                if _aj >= _vend and _aj > 0:
-                    _alerta.append('Ajuste >= Vendido')
-                if _est < 0:
-                    _alerta.append('Estoque negativo')
-                if _liq < 0:
-                    _alerta.append('Venda liq. negativa')
-                _problemas.append({
-                    'Serie': f"{segmento} - {serie}",
-                    'Unidade': u_cod,
-                    'Enviado': _env,
-                    'Vendido': _vend,
-                    'Ajuste 2025': _aj,
-                    'Venda Liq.': _liq,
-                    'Estoque': _est,
-                    'Alerta': ' | '.join(_alerta),
-                })
+    _sae = cubo.sae
+    _liq_sae = _sae['vendido'] - _sae['ajuste']
+    _div = (_liq_sae < 0) | (_sae['estoque'] < 0) | ((_sae['ajuste'] > 0) & (_sae['ajuste'] >= _sae['vendido']))
+    for _r in _sae[_div].itertuples():
+        _aj, _vend, _env, _est = int(_r.ajuste), int(_r.vendido), int(_r.enviado), int(_r.estoque)
+        _liq = _vend - _aj
+        _alerta = []
+        if _aj >= _vend and _aj > 0:
+            _alerta.append('Ajuste >= Vendido')
+        if _est < 0:
+            _alerta.append('Estoque negativo')
+        if _liq < 0:
+            _alerta.append('Venda liq. negativa')
+        _problemas.append({
+            'Serie': f"{_r.segmento} - {_r.serie}",
+            'Unidade': _r.unidade_cod,
+            'Enviado': _env,
+            'Vendido': _vend,
+            'Ajuste 2025': _aj,
+            'Venda Liq.': _liq,
+            'Estoque': _est,
+            'Alerta': ' | '.join(_alerta),
+        })
     if _problemas:
         st.warning(f"{len(_problemas)} divergencia(s) encontrada(s):")
         st.dataframe(pd.DataFrame(_problemas), use_container_width=True, hide_index=True)
@@ -1156,7 +662,7 @@ with st.expander("Conferencia de Dados — Auditoria de Vendas", expanded=False)
     # 4. Qualidade dos dados
     st.markdown("##### Qualidade dos Dados")
     _sem_mat = len(df_vendas_raw[df_vendas_raw['matricula'].str.strip() == ''])
-    _sem_dt = len(df_vendas_raw[df_vendas_raw['dt_baixa'].str.strip() == ''])
+    _sem_dt = int(df_vendas_raw['dt_baixa'].isna().sum())
     _injetados = len(df_vendas_raw[df_vendas_raw['parcela'] == 'TAXA'])
 
     col_q1, col_q2, col_q3 = st.columns(3)
@@ -1204,20 +710,11 @@ if filtro_unidade and filtro_unidade != "Todas":
 else:
     unidades_socio = list(UNIDADES.values())
 
-registros_socio = []
-for segmento, serie in ORDEM_SERIES_SOCIO:
-    registro = {'Descrição': f"{segmento} - {serie}"}
-    for unidade_nome in unidades_socio:
-        unidade_cod = UNIDADES_INV.get(unidade_nome, "")
-        filtro = (
-            (df_vendas_socio['segmento'] == segmento) &
-            (df_vendas_socio['serie'] == serie) &
-            (df_vendas_socio['unidade'] == unidade_cod)
-        )
-        registro[unidade_nome] = int(df_vendas_socio.loc[filtro, 'vendido'].sum()) if filtro.any() else 0
-    registros_socio.append(registro)
-
-df_socio = pd.DataFrame(registros_socio)
+_m_socio = cubo.matriz('Socioemocional', ORDEM_SERIES_SOCIO,
+                       [UNIDADES_INV.get(u, "") for u in unidades_socio])
+df_socio = pd.DataFrame({'Descrição': [f"{seg} - {serie}" for seg, serie in ORDEM_SERIES_SOCIO]})
+for unidade_nome in unidades_socio:
+    df_socio[unidade_nome] = _m_socio[UNIDADES_INV.get(unidade_nome, "")].to_numpy()
 colunas_socio = [c for c in df_socio.columns if c != 'Descrição']
 df_socio['TOTAL'] = df_socio[colunas_socio].sum(axis=1)
 
@@ -1235,26 +732,18 @@ if filtro_unidade and filtro_unidade != "Todas":
 else:
     unidades_robo = list(UNIDADES.values())
 
-registros_robo = []
-for segmento, serie in ORDEM_SERIES_ELOTECH:
-    registro = {'Descrição': f"{segmento} - {serie}"}
-    for unidade_nome in unidades_robo:
-        unidade_cod = UNIDADES_INV.get(unidade_nome, "")
-        filtro = (
-            (df_vendas_elotech['segmento'] == segmento) &
-            (df_vendas_elotech['serie'] == serie) &
-            (df_vendas_elotech['unidade'] == unidade_cod)
-        )
-        registro[unidade_nome] = int(df_vendas_elotech.loc[filtro, 'vendido'].sum()) if filtro.any() else 0
-    registros_robo.append(registro)
+_m_robo = cubo.matriz('Elo Tech', ORDEM_SERIES_ELOTECH,
+                      [UNIDADES_INV.get(u, "") for u in unidades_robo])
+registros_robo = [
+    {'Descrição': f"{seg} - {serie}",
+     **{u: int(_m_robo.loc[(seg, serie), UNIDADES_INV.get(u, "")]) for u in unidades_robo}}
+    for seg, serie in ORDEM_SERIES_ELOTECH
+]
 
 # Linha "Outros" (Sem serie + series fora do 2o-5o Ano)
 series_elotech = {s for _, s in ORDEM_SERIES_ELOTECH}
-reg_outros = {'Descrição': 'Outros'}
-for unidade_nome in unidades_robo:
-    unidade_cod = UNIDADES_INV.get(unidade_nome, "")
-    filtro = (~df_vendas_elotech['serie'].isin(series_elotech)) & (df_vendas_elotech['unidade'] == unidade_cod)
-    reg_outros[unidade_nome] = int(df_vendas_elotech.loc[filtro, 'vendido'].sum()) if filtro.any() else 0
+_fora = cubo.vendido_fora('Elo Tech', series_elotech, [UNIDADES_INV.get(u, "") for u in unidades_robo])
+reg_outros = {'Descrição': 'Outros', **{u: _fora[UNIDADES_INV.get(u, "")] for u in unidades_robo}}
 if any(v for k, v in reg_outros.items() if k != 'Descrição'):
     registros_robo.append(reg_outros)
 
@@ -1270,42 +759,8 @@ df_robo = pd.concat([df_robo, pd.DataFrame([totais_robo])], ignore_index=True)
 
 total_robo_vendido = int(totais_robo['TOTAL'])
 
-# --- Balanco Fisico ---
-registros_balanco = []
-for cod, (serie, segmento, _, _) in PEDIDO_SAE.items():
-    balanco = BALANCO_FISICO.get(cod, {})
-    estoque_env = ESTOQUE_ENVIADO.get(cod, {})
-
-    for unidade_cod, unidade_nome in UNIDADES.items():
-        fisico_datas = balanco.get(unidade_cod, {})
-        fisico = list(fisico_datas.values())[-1] if fisico_datas else None
-
-        enviado = estoque_env.get(unidade_cod, 0)
-
-        # Vendido SAE
-        vendido = 0
-        filtro = (
-            (df_vendas_sae['segmento'] == segmento) &
-            (df_vendas_sae['serie'] == serie) &
-            (df_vendas_sae['unidade'] == unidade_cod)
-        )
-        if filtro.any():
-            vendido = int(df_vendas_sae.loc[filtro, 'vendido'].values[0])
-
-        teorico = enviado - vendido
-        diferenca = (fisico - teorico) if fisico is not None else None
-
-        registros_balanco.append({
-            'Descrição': f"{segmento} - {serie}",
-            'Unidade': unidade_nome,
-            'Enviado': enviado,
-            'Vendido': vendido,
-            'Teórico': teorico,
-            'Físico': fisico if fisico is not None else "-",
-            'Diferença': diferenca if diferenca is not None else "-",
-        })
-
-df_balanco = pd.DataFrame(registros_balanco)
+# --- Balanco Fisico (ultima contagem x vendido ate a data dela) ---
+df_balanco = tabela_balanco(base.balanco, cubo.sae)
 if filtro_unidade != "Todas":
     df_balanco = df_balanco[df_balanco['Unidade'] == filtro_unidade]
 df_balanco_valido = df_balanco[df_balanco['Físico'] != "-"].copy()
@@ -1321,6 +776,8 @@ df_baixo = df_baixo.rename(columns={
     'segmento': 'Segmento', 'serie': 'Serie', 'unidade': 'Unidade',
     'enviado': 'Enviado', 'vendido': 'Vendido', 'estoque': 'Restante'
 })
+# previsao compartilha o index de df_estoque_completo
+df_reposicao = tabela_reposicao(df_previsao.loc[df_estoque.index])
 
 # --- Elo Tech detail (Outros e Em Aberto) ---
 _series_ok = {s for _, s in ORDEM_SERIES_ELOTECH}
@@ -1343,16 +800,8 @@ df_ata_tech = df_vendas_elotech_detail.drop_duplicates(subset=['matricula', 'uni
     .sort_values(['unidade', 'serie_real', 'nome'])
 df_ata_tech = _filtrar_unidade_ata(df_ata_tech, filtro_unidade)
 
-# --- Excel por secao ---
-xlsx_estoque = _to_excel_bytes(df_estoque_export, "Estoque SAE")
-xlsx_socio = _to_excel_bytes(df_socio, "Socioemocional")
-xlsx_robo = _to_excel_bytes(df_robo, "Elo Tech")
-xlsx_tudo = _to_excel_multi_sheets({
-    "Estoque SAE": df_estoque_export,
-    "Vendas Socioemocional": df_socio,
-    "Vendas Elo Tech": df_robo,
-    "Estoque Detalhado": df_estoque_completo,
-})
+# --- Excel por secao (gerado sob demanda, cache por versao + filtros) ---
+_chave_excel = (_versao, filtro_unidade, segmento_filtro, serie_filtro)
 
 # --- Grafico dados ---
 df_seg = df_estoque.groupby('segmento').agg({
@@ -1568,19 +1017,20 @@ with col_alert2:
     else:
         st.success("Nenhum estoque baixo!")
 
+st.markdown(f"**Reposicao Prevista (ruptura em ate {PRAZO_REPOSICAO_DIAS} dias)**")
+st.caption(f"Velocidade = vendas dos ultimos {JANELA_DIAS} dias ate a ultima baixa "
+           f"({df_previsao.attrs['referencia']:%d/%m/%Y}); so itens ainda acima do estoque baixo")
+if not df_reposicao.empty:
+    st.dataframe(df_reposicao, use_container_width=True, hide_index=True)
+else:
+    st.success("Nenhuma ruptura prevista no prazo de reposicao!")
+
 # --- Barra de acoes SAE ---
 st.markdown("---")
 col_dl_sae, col_ata_sae, col_print_sae = st.columns(3)
 
 with col_dl_sae:
-    st.download_button(
-        label="Baixar Estoque SAE (Excel)",
-        data=xlsx_estoque,
-        file_name=f"estoque_sae_{datetime.now().strftime('%Y%m%d')}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        key="dl_estoque_xlsx",
-        use_container_width=True,
-    )
+    _botao_excel("Baixar Estoque SAE (Excel)", "estoque_sae", "dl_estoque_xlsx", _chave_excel, {"Estoque SAE": df_estoque_export})
 
 with col_ata_sae:
     if st.button(f"Ata SAE ({len(df_ata_sae)})", use_container_width=True, key="btn_ata_sae"):
@@ -1599,7 +1049,7 @@ if st.session_state.get('print_secao') == 'sae':
     # Preparar HTML de impressao SAE
     df_est_print = criar_tabela_completa(df_estoque_completo, 'estoque', "Todas")
     df_est_print.columns = [c.replace('ã', 'a').replace('í', 'i').replace('ó', 'o').replace('ç', 'c') for c in df_est_print.columns]
-    tbl_sae = df_to_html_colorido(df_est_print, "Estoque Restante SAE (Enviado - Vendido)")
+    tbl_sae = tabela_html(df_est_print, "Estoque Restante SAE (Enviado - Vendido)")
     kpis_sae = [
         ("Pedido Total", f"{pedido_total:,}"),
         ("Enviado Total", f"{enviado_total:,}"),
@@ -1630,14 +1080,7 @@ regs_socio_vg = []
 for segmento, serie in ORDEM_SERIES_SOCIO:
     pedido = PEDIDO_SOCIO.get(serie, 0)
     aj_uni = AJUSTE_SOCIO_2025.get(serie, {})
-    vend_uni = {}
-    for u_cod in ["BV", "CD", "JG", "CDR"]:
-        filtro = (
-            (df_vendas_socio['segmento'] == segmento) &
-            (df_vendas_socio['serie'] == serie) &
-            (df_vendas_socio['unidade'] == u_cod)
-        )
-        vend_uni[u_cod] = int(df_vendas_socio.loc[filtro, 'vendido'].sum()) if filtro.any() else 0
+    vend_uni = {u_cod: cubo.vendido('Socioemocional', segmento, serie, u_cod) for u_cod in ["BV", "CD", "JG", "CDR"]}
     vendido_total = sum(vend_uni.values())
     ajuste_total = sum(aj_uni.values())
     vend_real = vendido_total - ajuste_total
@@ -1709,12 +1152,7 @@ for u_cod_sc, u_nome_sc in [("BV", "Boa Viagem"), ("CD", "Candeias"), ("JG", "Ja
         for segmento, serie in ORDEM_SERIES_SOCIO:
             pedido = PEDIDO_SOCIO.get(serie, 0)
             aj = AJUSTE_SOCIO_2025.get(serie, {}).get(u_cod_sc, 0)
-            filtro = (
-                (df_vendas_socio['segmento'] == segmento) &
-                (df_vendas_socio['serie'] == serie) &
-                (df_vendas_socio['unidade'] == u_cod_sc)
-            )
-            vendido = int(df_vendas_socio.loc[filtro, 'vendido'].sum()) if filtro.any() else 0
+            vendido = cubo.vendido('Socioemocional', segmento, serie, u_cod_sc)
             venda_liq = vendido - aj
             regs_conf_sc.append({
                 'Descricao': f"{segmento} - {serie}",
@@ -1749,14 +1187,7 @@ st.markdown("---")
 col_dl_socio, col_ata_socio, col_print_socio = st.columns(3)
 
 with col_dl_socio:
-    st.download_button(
-        label="Baixar Vendas Socioemocional (Excel)",
-        data=xlsx_socio,
-        file_name=f"vendas_socioemocional_{datetime.now().strftime('%Y%m%d')}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        key="dl_socio_xlsx",
-        use_container_width=True,
-    )
+    _botao_excel("Baixar Vendas Socioemocional (Excel)", "vendas_socioemocional", "dl_socio_xlsx", _chave_excel, {"Socioemocional": df_socio})
 
 with col_ata_socio:
     if st.button(f"Ata Socioemocional ({len(df_ata_socio)})", use_container_width=True, key="btn_ata_socio"):
@@ -1774,7 +1205,7 @@ if st.session_state.get('ata_tipo') == 'socio':
 if st.session_state.get('print_secao') == 'socio':
     df_socio_print = df_socio.copy()
     df_socio_print.columns = [c.replace('ã', 'a').replace('í', 'i').replace('ó', 'o').replace('ç', 'c') for c in df_socio_print.columns]
-    tbl_socio = df_to_html_colorido(df_socio_print, "Vendas Socioemocional (Alunos Unicos)")
+    tbl_socio = tabela_html(df_socio_print, "Vendas Socioemocional (Alunos Unicos)")
     kpis_socio = [
         ("Total Vendido Socio.", f"{total_socio_vendido}"),
     ]
@@ -1797,14 +1228,7 @@ PEDIDO_ELOTECH = {"2º Ano": 150, "3º Ano": 155, "4º Ano": 135, "5º Ano": 150
 regs_tech_vg = []
 for segmento, serie in ORDEM_SERIES_ELOTECH:
     pedido = PEDIDO_ELOTECH.get(serie, 0)
-    vend_uni = {}
-    for u_cod in ["BV", "CD", "JG", "CDR"]:
-        filtro = (
-            (df_vendas_elotech['segmento'] == segmento) &
-            (df_vendas_elotech['serie'] == serie) &
-            (df_vendas_elotech['unidade'] == u_cod)
-        )
-        vend_uni[u_cod] = int(df_vendas_elotech.loc[filtro, 'vendido'].sum()) if filtro.any() else 0
+    vend_uni = {u_cod: cubo.vendido('Elo Tech', segmento, serie, u_cod) for u_cod in ["BV", "CD", "JG", "CDR"]}
     vendido_total = sum(vend_uni.values())
     saldo = pedido - vendido_total
     regs_tech_vg.append({
@@ -1860,12 +1284,7 @@ for u_cod_et, u_nome_et in [("BV", "Boa Viagem"), ("CD", "Candeias"), ("JG", "Ja
         regs_conf_et = []
         for segmento, serie in ORDEM_SERIES_ELOTECH:
             pedido = PEDIDO_ELOTECH.get(serie, 0)
-            filtro = (
-                (df_vendas_elotech['segmento'] == segmento) &
-                (df_vendas_elotech['serie'] == serie) &
-                (df_vendas_elotech['unidade'] == u_cod_et)
-            )
-            vendido = int(df_vendas_elotech.loc[filtro, 'vendido'].sum()) if filtro.any() else 0
+            vendido = cubo.vendido('Elo Tech', segmento, serie, u_cod_et)
             regs_conf_et.append({
                 'Descricao': f"Fund1 - {serie}",
                 'Pedido Geral': pedido,
@@ -1937,14 +1356,7 @@ st.markdown("---")
 col_dl_tech, col_ata_tech, col_print_tech = st.columns(3)
 
 with col_dl_tech:
-    st.download_button(
-        label="Baixar Vendas Elo Tech (Excel)",
-        data=xlsx_robo,
-        file_name=f"vendas_elotech_{datetime.now().strftime('%Y%m%d')}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        key="dl_robo_xlsx",
-        use_container_width=True,
-    )
+    _botao_excel("Baixar Vendas Elo Tech (Excel)", "vendas_elotech", "dl_robo_xlsx", _chave_excel, {"Elo Tech": df_robo})
 
 with col_ata_tech:
     if st.button(f"Ata Elo Tech ({len(df_ata_tech)})", use_container_width=True, key="btn_ata_tech"):
@@ -1962,7 +1374,7 @@ if st.session_state.get('ata_tipo') == 'tech':
 if st.session_state.get('print_secao') == 'tech':
     df_robo_print = df_robo.copy()
     df_robo_print.columns = [c.replace('ã', 'a').replace('í', 'i').replace('ó', 'o').replace('ç', 'c') for c in df_robo_print.columns]
-    tbl_tech = df_to_html_colorido(df_robo_print, "Vendas Elo Tech por Serie (Alunos Unicos) - CDR excluido")
+    tbl_tech = tabela_html(df_robo_print, "Vendas Elo Tech por Serie (Alunos Unicos) - CDR excluido")
     kpis_tech = [
         ("Total Vendido Elo Tech", f"{total_robo_vendido}"),
     ]
@@ -1971,6 +1383,74 @@ if st.session_state.get('print_secao') == 'tech':
     st.session_state['print_secao'] = None
 
 
+# ###########################################################
+# SECAO RECEITA
+# ###########################################################
+
+st.markdown("---")
+st.markdown("### 💰 Receita - Recebimentos")
+st.caption("Valores recebidos (com data de baixa) por tipo. Respeita o filtro de unidade.")
+
+receita = base.receita
+_u_receita = UNIDADES_INV.get(filtro_unidade) if filtro_unidade != "Todas" else None
+df_ticket = receita.ticket_medio(_u_receita)
+
+col_r1, col_r2, col_r3, col_r4 = st.columns(4)
+with col_r1:
+    st.metric("Receita Total", formatar_reais(receita.total(_u_receita)))
+for _col_r, _tipo_r in zip([col_r2, col_r3, col_r4], TIPOS_RECEITA):
+    with _col_r:
+        st.metric(f"Ticket Medio {_tipo_r}", formatar_reais(df_ticket.loc[_tipo_r, 'ticket_medio']),
+                  help=f"{df_ticket.loc[_tipo_r, 'alunos']} alunos pagantes")
+
+tab_r1, tab_r2, tab_r3 = st.tabs(["Curva Acumulada", "Por Semana", "Por Unidade"])
+_cores_receita = {'SAE': '#667eea', 'Socioemocional': '#a855f7', 'Elo Tech': '#22c55e', 'Total': '#1e293b'}
+
+with tab_r1:
+    df_acum = receita.acumulado(_u_receita)
+    fig_acum = go.Figure()
+    for _serie_r in df_acum.columns:
+        fig_acum.add_trace(go.Scatter(x=df_acum.index, y=df_acum[_serie_r], name=_serie_r, mode='lines',
+                                      line=dict(color=_cores_receita[_serie_r], width=3 if _serie_r == 'Total' else 2)))
+    fig_acum.update_layout(
+        paper_bgcolor='#ffffff', plot_bgcolor='#f8fafc',
+        font=dict(color='#1e293b'),
+        legend=dict(orientation='h', y=1.1),
+        xaxis=dict(gridcolor='#e2e8f0'),
+        yaxis=dict(gridcolor='#e2e8f0', title='R$ acumulado'),
+        margin=dict(t=60, b=20)
+    )
+    st.plotly_chart(fig_acum, use_container_width=True)
+
+with tab_r2:
+    df_semana = receita.por_semana(_u_receita)
+    fig_sem = go.Figure()
+    for _tipo_r in TIPOS_RECEITA:
+        fig_sem.add_trace(go.Bar(name=_tipo_r, x=df_semana.index, y=df_semana[_tipo_r],
+                                 marker_color=_cores_receita[_tipo_r]))
+    fig_sem.update_layout(
+        barmode='stack',
+        paper_bgcolor='#ffffff', plot_bgcolor='#f8fafc',
+        font=dict(color='#1e293b'),
+        legend=dict(orientation='h', y=1.1),
+        xaxis=dict(gridcolor='#e2e8f0', title='Semana (inicio)'),
+        yaxis=dict(gridcolor='#e2e8f0', title='R$'),
+        margin=dict(t=60, b=20)
+    )
+    st.plotly_chart(fig_sem, use_container_width=True)
+
+with tab_r3:
+    df_rec_un = receita.por_unidade_tipo()
+    df_rec_un.index = [UNIDADES.get(u, u) for u in df_rec_un.index]
+    st.dataframe(df_rec_un.style.format(formatar_reais), use_container_width=True)
+    st.dataframe(
+        df_ticket.rename(columns={'receita': 'Receita', 'titulos': 'Titulos Pagos',
+                                  'alunos': 'Alunos Pagantes', 'ticket_medio': 'Ticket Medio'})
+        .style.format({'Receita': formatar_reais, 'Ticket Medio': formatar_reais}),
+        use_container_width=True,
+    )
+
+
 # ###########################################################
 # VISAO GERAL
 # ###########################################################
@@ -2002,14 +1482,12 @@ st.markdown("---")
 col_dl_tudo, col_print_completo = st.columns(2)
 
 with col_dl_tudo:
-    st.download_button(
-        label="Baixar Tudo (Excel)",
-        data=xlsx_tudo,
-        file_name=f"controle_estoque_completo_{datetime.now().strftime('%Y%m%d')}.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        key="dl_tudo_xlsx",
-        use_container_width=True,
-    )
+    _botao_excel("Baixar Tudo (Excel)", "controle_estoque_completo", "dl_tudo_xlsx", _chave_excel, lambda: {
+        "Estoque SAE": df_estoque_export,
+        "Vendas Socioemocional": df_socio,
+        "Vendas Elo Tech": df_robo,
+        "Estoque Detalhado": df_estoque_completo,
+    })
 
 with col_print_completo:
     if st.button("Imprimir Completo", use_container_width=True, key="btn_print_completo"):
@@ -2020,15 +1498,15 @@ if st.session_state.get('print_secao') == 'completo':
     # Tabela estoque restante (todas unidades, sem filtro)
     df_est_print = criar_tabela_completa(df_estoque_completo, 'estoque', "Todas")
     df_est_print.columns = [c.replace('ã', 'a').replace('í', 'i').replace('ó', 'o').replace('ç', 'c') for c in df_est_print.columns]
-    tbl_estoque_full = df_to_html_colorido(df_est_print, "Estoque Restante SAE (Enviado - Vendido)")
+    tbl_estoque_full = tabela_html(df_est_print, "Estoque Restante SAE (Enviado - Vendido)")
 
     df_socio_print = df_socio.copy()
     df_socio_print.columns = [c.replace('ã', 'a').replace('í', 'i').replace('ó', 'o').replace('ç', 'c') for c in df_socio_print.columns]
-    tbl_socio_full = df_to_html_colorido(df_socio_print, "Vendas Socioemocional (Alunos Unicos)")
+    tbl_socio_full = tabela_html(df_socio_print, "Vendas Socioemocional (Alunos Unicos)")
 
     df_robo_print = df_robo.copy()
     df_robo_print.columns = [c.replace('ã', 'a').replace('í', 'i').replace('ó', 'o').replace('ç', 'c') for c in df_robo_print.columns]
-    tbl_robo_full = df_to_html_colorido(df_robo_print, "Vendas Elo Tech por Serie (Alunos Unicos) - CDR excluido")
+    tbl_robo_full = tabela_html(df_robo_print, "Vendas Elo Tech por Serie (Alunos Unicos) - CDR excluido")
 
     kpis_all = [
         ("Pedido Total", f"{pedido_total:,}"),
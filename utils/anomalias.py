@@ -0,0 +1,157 @@
+"""Deteccao de anomalias de matriculados a partir do historico de snapshots.
+
+As faixas fixas de auditor.RANGES_MATRICULADOS so pegam valores absurdos: uma
+queda real de 80 alunos dentro da faixa passa despercebida. Aqui cada serie
+(unidade, unidade x segmento e unidade x segmento x turma) aprende, nas
+ultimas JANELA variacoes entre snapshots consecutivos, uma variacao tipica
+(mediana) e uma dispersao (MAD escalado, ou desvio padrao no metodo "z").
+O salto de um snapshot para o seguinte e anomalo quando
+
+    |salto - tipico| / dispersao > LIMIAR   e   |salto| >= SALTO_MINIMO[nivel]
+
+A janela so olha para tras (o proprio salto nao entra na sua linha de base) e
+exige MIN_HISTORICO variacoes. Tudo vetorizado: as series viram colunas de uma
+matriz snapshot x serie e as janelas sao views deslizantes dessa matriz.
+
+Incremental: detectar_anomalias(db, desde=id) le so os snapshots com id > desde
+mais as JANELA + 1 extracoes anteriores (contexto da linha de base) e devolve
+apenas os saltos das extracoes novas; o auditor persiste o resultado em
+auditoria.db como a regra "anomalia".
+"""
+
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .snapshots import colunas_vagas, conectar, fonte_vagas
+
+JANELA = 10
+MIN_HISTORICO = 5
+# 3.5 e o corte usual do z robusto (Iglewicz-Hoaglin); 1.4826 torna o MAD comparavel ao desvio padrao
+LIMIAR = 3.5
+FATOR_MAD = 1.4826
+# Dispersao minima (alunos): series paradas nao disparam com qualquer +1
+DISPERSAO_MINIMA = 1.0
+
+# Nivel da serie -> colunas que a identificam
+NIVEIS = {
+    "unidade": ["unidade_codigo"],
+    "segmento": ["unidade_codigo", "segmento"],
+    "turma": ["unidade_codigo", "segmento", "turma"],
+}
+# Saltos menores que isso nao sao reportados, mesmo fora do padrao
+SALTO_MINIMO = {"unidade": 15, "segmento": 10, "turma": 5}
+
+COLUNAS = ["extracao_id", "nivel", "unidade_codigo", "segmento", "turma",
+           "antes", "depois", "salto", "tipico", "dispersao", "score"]
+
+
+def _carregar(db_path, desde, janela):
+    """Matriculados por extracao x turma das extracoes > desde, com `janela` + 1 de contexto.
+
+    Returns:
+        (ids em ordem, DataFrame [extracao_id, unidade_codigo, segmento, turma, matriculados])
+    """
+    conn = conectar(db_path)
+    try:
+        colunas = colunas_vagas(conn)
+        # integral.db guarda o segmento na coluna tipo
+        segmento = "segmento" if "segmento" in colunas else "tipo"
+        contexto = [row[0] for row in conn.execute(
+            "SELECT id FROM extrações WHERE id <= ? ORDER BY id DESC LIMIT ?", (desde, janela + 1))]
+        novos = [row[0] for row in conn.execute(
+            "SELECT id FROM extrações WHERE id > ? ORDER BY id", (desde,))]
+        ids = contexto[::-1] + novos
+        if not novos:
+            return ids, pd.DataFrame(columns=["extracao_id", "unidade_codigo", "segmento", "turma", "matriculados"])
+        df = pd.read_sql_query(f"""
+            SELECT extracao_id, unidade_codigo, {segmento} AS segmento, turma, matriculados
+            FROM {fonte_vagas(conn)} WHERE extracao_id >= ?
+        """, conn, params=(ids[0],))
+    finally:
+        conn.close()
+    return ids, df
+
+
+def _janelas(saltos, janela):
+    """Para cada linha t de `saltos` (T x S), as `janela` linhas anteriores: (T, S, janela)."""
+    preenchido = np.vstack([np.full((janela, saltos.shape[1]), np.nan), saltos])
+    return sliding_window_view(preenchido, janela, axis=0)[:-1]
+
+
+def _pontuar(serie, janela, metodo):
+    """Saltos, variacao tipica, dispersao e score de uma matriz snapshot x serie."""
+    valores = serie.to_numpy(dtype=float)
+    saltos = np.diff(valores, axis=0)
+    anteriores = _janelas(saltos, janela)
+    with warnings.catch_warnings():
+        # janelas so com NaN (serie nova) ficam NaN e caem no MIN_HISTORICO
+        warnings.simplefilter("ignore", RuntimeWarning)
+        n = np.sum(~np.isnan(anteriores), axis=2)
+        if metodo == "z":
+            tipico = np.nanmean(anteriores, axis=2)
+            dispersao = np.nanstd(anteriores, axis=2, ddof=1)
+        else:
+            tipico = np.nanmedian(anteriores, axis=2)
+            dispersao = FATOR_MAD * np.nanmedian(np.abs(anteriores - tipico[..., None]), axis=2)
+    dispersao = np.fmax(dispersao, DISPERSAO_MINIMA)
+    score = np.abs(saltos - tipico) / dispersao
+    return valores, saltos, tipico, dispersao, np.where(n >= MIN_HISTORICO, score, np.nan)
+
+
+def detectar_anomalias(db_path: Path, desde=0, janela=JANELA, limiar=LIMIAR, metodo="mad"):
+    """Saltos anomalos de matriculados nas extracoes com id > desde.
+
+    Args:
+        db_path: banco de vagas (vagas.db, integral.db, ...)
+        desde: ultima extracao ja avaliada (0 = todas)
+        janela: variacoes anteriores usadas na linha de base
+        limiar: score minimo para reportar
+        metodo: "mad" (mediana/MAD, robusto) ou "z" (media/desvio padrao)
+
+    Returns:
+        DataFrame [extracao_id, nivel, unidade_codigo, segmento, turma, antes,
+        depois, salto, tipico, dispersao, score], maior score primeiro em cada extracao
+    """
+    ids, df = _carregar(db_path, desde, janela)
+    if df.empty:
+        return pd.DataFrame(columns=COLUNAS)
+
+    achados = []
+    for nivel, chave in NIVEIS.items():
+        serie = df.groupby(["extracao_id"] + chave)["matriculados"].sum()\
+            .unstack(chave).reindex(ids)
+        valores, saltos, tipico, dispersao, score = _pontuar(serie, janela, metodo)
+        # linha t de saltos = salto que chega na extracao ids[t + 1]
+        t, s = np.nonzero((score > limiar) & (np.abs(saltos) >= SALTO_MINIMO[nivel]))
+        extracoes = np.asarray(ids[1:])[t]
+        novos = extracoes > desde
+        t, s = t[novos], s[novos]
+        if not len(t):
+            continue
+        rotulos = serie.columns.to_frame(index=False).iloc[s].reset_index(drop=True)
+        achados.append(rotulos.assign(
+            extracao_id=extracoes[novos],
+            nivel=nivel,
+            antes=valores[t, s].astype("int64"),
+            depois=valores[t + 1, s].astype("int64"),
+            salto=saltos[t, s].astype("int64"),
+            tipico=tipico[t, s],
+            dispersao=dispersao[t, s],
+            score=score[t, s],
+        ))
+
+    if not achados:
+        return pd.DataFrame(columns=COLUNAS)
+    resultado = pd.concat(achados, ignore_index=True).reindex(columns=COLUNAS)
+    return resultado.sort_values(["extracao_id", "score"], ascending=[True, False], ignore_index=True)
+
+
+def descrever(anomalia):
+    """Mensagem de auditoria de uma linha de detectar_anomalias."""
+    rotulo = " / ".join(str(anomalia[c]) for c in NIVEIS[anomalia["nivel"]])
+    return (f"ANOMALIA {rotulo}: {anomalia['antes']} -> {anomalia['depois']} matriculados "
+            f"({anomalia['salto']:+d}; tipico {anomalia['tipico']:+.0f} +- {anomalia['dispersao']:.0f})")
@@ -2,17 +2,26 @@
 
 Roda apos cada atualizacao para validar integridade dos dados.
 Pode ser chamado standalone ou importado por outros scripts.
+Os resultados por extracao dos bancos SQLite ficam em output/auditoria.db
+(db, extracao_id, regra), entao cada execucao so audita extracoes novas.
+Alem das faixas fixas, saltos fora do padrao do historico de snapshots viram
+avisos da regra "anomalia" (utils.anomalias).
 
 Uso standalone:
     python -m utils.auditor          # audita tudo
     python -m utils.auditor --fix    # audita e corrige o que puder
+    python -m utils.auditor --publicar  # audita e promove as extracoes aprovadas
 """
 
 import json
+import re
 import sqlite3
 from datetime import datetime
 from pathlib import Path
 
+from .anomalias import detectar_anomalias, descrever
+from .snapshots import conectar, dados_de, fonte_vagas, impressao_conteudo
+
 OUTPUT_DIR = Path(__file__).parent.parent / "output"
 
 # Localidades esperadas por unidade
@@ -23,7 +32,8 @@ LOCALIDADE_ESPERADA = {
     "04-CDR": ["Cordeiro"],
 }
 
-# Ranges razoaveis de matriculados por unidade (para detectar anomalias)
+# Ranges razoaveis de matriculados por unidade (limites grosseiros; saltos
+# dentro da faixa ficam com utils.anomalias)
 RANGES_MATRICULADOS = {
     "01-BV": (800, 1500),
     "02-CD": (800, 1500),
@@ -79,78 +89,101 @@ class AuditoriaResultado:
         return "\n".join(linhas)
 
 
-def auditar_json(json_path: Path) -> AuditoriaResultado:
-    """Audita um arquivo JSON de extracao."""
-    resultado = AuditoriaResultado()
-
-    if not json_path.exists():
-        resultado.critico(f"Arquivo nao encontrado: {json_path}")
-        return resultado
+# Uma alternancia com todas as localidades; o trecho casado indica a unidade dona
+_LOCALIDADE_UNIDADE = {loc.lower(): cod for cod, locs in LOCALIDADE_ESPERADA.items() for loc in locs}
+_RE_LOCALIDADE = re.compile("|".join(re.escape(loc) for loc in _LOCALIDADE_UNIDADE), re.IGNORECASE)
+# Por unidade, so as localidades das OUTRAS unidades (busca unica sobre todos os nomes)
+_RE_OUTRAS_LOCALIDADES = {
+    cod: re.compile("|".join(re.escape(l) for outro, ls in LOCALIDADE_ESPERADA.items() if outro != cod for l in ls),
+                    re.IGNORECASE)
+    for cod in LOCALIDADE_ESPERADA
+}
 
-    with open(json_path, "r", encoding="utf-8") as f:
-        dados = json.load(f)
+MAX_ERROS_LOCALIDADE = 5
+
+
+def _localidade_errada(cod, nomes):
+    """[(turma, unidade dona)] das turmas de `cod` com localidade de outra unidade."""
+    outras = _RE_OUTRAS_LOCALIDADES.get(cod)
+    if outras is None or not outras.search("\n".join(nomes)):
+        return []
+    fora = []
+    for nome in nomes:
+        if nome and outras.search(nome):
+            donos = {_LOCALIDADE_UNIDADE[m.group(0).lower()] for m in _RE_LOCALIDADE.finditer(nome)}
+            fora.extend((nome, outro) for outro in sorted(donos) if outro != cod)
+    return fora
+
+
+def _resumir_unidade(unidade):
+    """Tudo que as regras do JSON precisam de uma unidade, numa passada pelas turmas.
+
+    A impressao digital e o sha1 do conjunto (turma, vagas, matriculados)
+    (snapshots.impressao_conteudo, estavel entre processos): unidades com o
+    mesmo conteudo caem na mesma chave de um dict, sem comparar pares, e as
+    turmas nao precisam ficar em memoria depois do resumo.
+    """
+    turmas = unidade.get("turmas", [])
+    linhas = [(t.get("turma", ""), t.get("vagas", 0), t.get("matriculados", 0)) for t in turmas]
+    cod = unidade.get("codigo", "?")
+    return {
+        "codigo": cod,
+        "turmas": len(linhas),
+        "total": sum(m for _, _, m in linhas),
+        "impressao": impressao_conteudo(set(linhas)) if linhas else None,
+        "fantasmas": sum(1 for _, v, m in linhas if v == 0 and m == 0),
+        "localidade_errada": _localidade_errada(cod, [n for n, _, _ in linhas]),
+        "erro": unidade.get("erro"),
+    }
 
-    unidades = dados.get("unidades", [])
 
-    # 1. Verificar numero de unidades
-    if len(unidades) != 4:
-        resultado.critico(f"Esperava 4 unidades, encontrou {len(unidades)}")
+def _regra_quantidade(resumos, resultado):
+    if len(resumos) != 4:
+        resultado.critico(f"Esperava 4 unidades, encontrou {len(resumos)}")
     else:
-        resultado.ok(f"4 unidades presentes")
-
-    # 2. Verificar duplicacao entre unidades
-    turmas_por_unidade = {}
-    totais_por_unidade = {}
-    for unidade in unidades:
-        cod = unidade.get("codigo", "?")
-        turmas = unidade.get("turmas", [])
-        turmas_hash = frozenset(t.get("turma", "") for t in turmas)
-        turmas_por_unidade[cod] = turmas_hash
-        totais_por_unidade[cod] = sum(t.get("matriculados", 0) for t in turmas)
-
-    codigos = list(turmas_por_unidade.keys())
-    for i, cod1 in enumerate(codigos):
-        for cod2 in codigos[i + 1:]:
-            if turmas_por_unidade[cod1] == turmas_por_unidade[cod2] and len(turmas_por_unidade[cod1]) > 0:
-                resultado.critico(
-                    f"DUPLICACAO: {cod1} e {cod2} tem turmas identicas "
-                    f"({totais_por_unidade[cod1]} matriculados cada)"
-                )
-            elif totais_por_unidade.get(cod1) == totais_por_unidade.get(cod2) and totais_por_unidade.get(cod1, 0) > 0:
-                resultado.aviso(f"{cod1} e {cod2} tem o mesmo total de matriculados ({totais_por_unidade[cod1]})")
-
-    if not any("DUPLICACAO" in e for e in resultado.erros_criticos):
+        resultado.ok(f"{len(resumos)} unidades presentes")
+
+
+def _regra_duplicacao(resumos, resultado):
+    """Unidades com a mesma impressao digital (critico) ou so o mesmo total (aviso)."""
+    por_impressao, por_total = {}, {}
+    for r in resumos:
+        if r["impressao"] is not None:
+            por_impressao.setdefault(r["impressao"], []).append(r)
+        if r["total"] > 0:
+            por_total.setdefault(r["total"], []).append(r)
+
+    duplicadas = set()
+    for grupo in por_impressao.values():
+        if len(grupo) > 1:
+            codigos = [r["codigo"] for r in grupo]
+            duplicadas.update(codigos)
+            resultado.critico(
+                f"DUPLICACAO: {', '.join(codigos[:-1])} e {codigos[-1]} tem turmas identicas "
+                f"({grupo[0]['total']} matriculados cada)"
+            )
+    for total, grupo in por_total.items():
+        codigos = [r["codigo"] for r in grupo if r["codigo"] not in duplicadas]
+        if len(codigos) > 1:
+            resultado.aviso(f"{', '.join(codigos[:-1])} e {codigos[-1]} tem o mesmo total de matriculados ({total})")
+
+    if not duplicadas:
         resultado.ok("Nenhuma duplicacao entre unidades")
 
-    # 3. Verificar localidade nos nomes das turmas
-    erros_loc = 0
-    for unidade in unidades:
-        cod = unidade.get("codigo", "")
-        locs = LOCALIDADE_ESPERADA.get(cod, [])
-        if not locs:
-            continue
-        for turma in unidade.get("turmas", []):
-            nome = turma.get("turma", "")
-            if not nome:
-                continue
-            # Verifica se contem localidade de OUTRA unidade
-            for outro_cod, outras_locs in LOCALIDADE_ESPERADA.items():
-                if outro_cod != cod and any(ol.lower() in nome.lower() for ol in outras_locs):
-                    resultado.critico(
-                        f"LOCALIDADE ERRADA: {cod} contem turma '{nome}' que pertence a {outro_cod}"
-                    )
-                    erros_loc += 1
-                    if erros_loc >= 5:
-                        break
-            if erros_loc >= 5:
-                resultado.critico(f"... e mais turmas com localidade errada (mostrando apenas 5)")
-                break
 
-    if erros_loc == 0:
+def _regra_localidade(resumos, resultado):
+    erros = [(r["codigo"], nome, outro) for r in resumos for nome, outro in r["localidade_errada"]]
+    for cod, nome, outro in erros[:MAX_ERROS_LOCALIDADE]:
+        resultado.critico(f"LOCALIDADE ERRADA: {cod} contem turma '{nome}' que pertence a {outro}")
+    if len(erros) > MAX_ERROS_LOCALIDADE:
+        resultado.critico(f"... e mais turmas com localidade errada (mostrando apenas {MAX_ERROS_LOCALIDADE})")
+    if not erros:
         resultado.ok("Localidades das turmas consistentes")
 
-    # 4. Verificar ranges de matriculados
-    for cod, total in totais_por_unidade.items():
+
+def _regra_faixas(resumos, resultado):
+    for r in resumos:
+        cod, total = r["codigo"], r["total"]
         range_esperado = RANGES_MATRICULADOS.get(cod)
         if range_esperado:
             min_val, max_val = range_esperado
@@ -161,116 +194,479 @@ def auditar_json(json_path: Path) -> AuditoriaResultado:
             else:
                 resultado.ok(f"{cod}: {total} matriculados (dentro do range)")
 
-    # 5. Verificar unidades vazias
-    for unidade in unidades:
-        cod = unidade.get("codigo", "?")
-        turmas = unidade.get("turmas", [])
-        if len(turmas) == 0:
-            if unidade.get("erro"):
-                resultado.critico(f"{cod}: 0 turmas (erro: {unidade['erro']})")
+
+def _regra_vazias(resumos, resultado):
+    for r in resumos:
+        if r["turmas"] == 0:
+            if r["erro"]:
+                resultado.critico(f"{r['codigo']}: 0 turmas (erro: {r['erro']})")
             else:
-                resultado.critico(f"{cod}: 0 turmas extraidas")
+                resultado.critico(f"{r['codigo']}: 0 turmas extraidas")
 
-    # 6. Verificar turmas fantasma
-    fantasmas = 0
-    for unidade in unidades:
-        for turma in unidade.get("turmas", []):
-            if turma.get("vagas", 0) == 0 and turma.get("matriculados", 0) == 0:
-                fantasmas += 1
 
+def _regra_fantasmas(resumos, resultado):
+    fantasmas = sum(r["fantasmas"] for r in resumos)
     if fantasmas > 0:
         resultado.aviso(f"{fantasmas} turmas fantasma (vagas=0, matriculados=0)")
 
+
+# Regras do JSON, na ordem do relatorio; cada uma recebe os resumos por unidade
+REGRAS_JSON = [
+    _regra_quantidade, _regra_duplicacao, _regra_localidade,
+    _regra_faixas, _regra_vazias, _regra_fantasmas,
+]
+
+
+# Abertura da lista de unidades no JSON de extracao
+_RE_INICIO_UNIDADES = re.compile(r'"unidades"\s*:\s*\[')
+BLOCO_LEITURA = 1 << 16
+
+
+def _iterar_unidades(json_path: Path, bloco=BLOCO_LEITURA):
+    """Unidades do JSON de extracao, uma de cada vez, lendo o arquivo em blocos.
+
+    Cada unidade e decodificada (raw_decode) assim que chega inteira no buffer
+    e descartada pelo chamador; o documento inteiro nunca fica em memoria.
+    """
+    decoder = json.JSONDecoder()
+    with open(json_path, "r", encoding="utf-8") as f:
+        buffer = ""
+        while True:
+            m = _RE_INICIO_UNIDADES.search(buffer)
+            if m:
+                break
+            pedaco = f.read(bloco)
+            if not pedaco:
+                return
+            # guarda o fim do bloco anterior: a chave pode ter sido cortada ao meio
+            buffer = buffer[-64:] + pedaco
+
+        buffer, pos = buffer[m.end():], 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                if pos == len(buffer):
+                    raise json.JSONDecodeError("fim do buffer", buffer, pos)
+                unidade, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # unidade incompleta: le mais (o bloco cresce com a unidade)
+                pedaco = f.read(max(bloco, len(buffer) - pos))
+                if not pedaco:
+                    raise
+                buffer, pos = buffer[pos:] + pedaco, 0
+                continue
+            yield unidade
+
+
+def resumir_json(json_path: Path):
+    """Resumos por unidade (_resumir_unidade) do JSON de extracao, em uma passada."""
+    return [_resumir_unidade(u) for u in _iterar_unidades(json_path)]
+
+
+def auditar_json(json_path: Path, resumos=None) -> AuditoriaResultado:
+    """Audita um arquivo JSON de extracao (`resumos` de resumir_json evita reler o arquivo)."""
+    resultado = AuditoriaResultado()
+
+    if resumos is None:
+        if not json_path.exists():
+            resultado.critico(f"Arquivo nao encontrado: {json_path}")
+            return resultado
+        resumos = resumir_json(json_path)
+
+    for regra in REGRAS_JSON:
+        regra(resumos, resultado)
     return resultado
 
 
-def auditar_sqlite(db_path: Path) -> AuditoriaResultado:
-    """Audita o banco SQLite."""
+# Todas as regras do banco em uma passada sobre os snapshots com id > ?:
+# - totais: turmas e matriculados por extracao x unidade
+# - unidades: quantas unidades cada extracao tem (0 se nao houver turmas)
+# - duplicadas: unidades da mesma extracao com a mesma assinatura (turmas, matriculados,
+#   vagas, novatos, veteranos e soma dos quadrados de matriculados por turma)
+# - fora: totais comparados com a faixa esperada da unidade
+_SQL_AUDITORIA = """
+    WITH totais AS (
+        SELECT extracao_id, unidade_codigo, COUNT(*) AS turmas, SUM(matriculados) AS matriculados,
+               SUM(vagas) AS vagas, SUM(novatos) AS novatos, SUM(veteranos) AS veteranos,
+               SUM(matriculados * matriculados) AS quadrados
+        FROM {vagas}
+        WHERE extracao_id > ?
+        GROUP BY extracao_id, unidade_codigo
+    ),
+    unidades AS (
+        SELECT e.id AS extracao_id, COUNT(t.unidade_codigo) AS n
+        FROM extrações e LEFT JOIN totais t ON t.extracao_id = e.id
+        WHERE e.id > ?
+        GROUP BY e.id
+    ),
+    duplicadas AS (
+        SELECT extracao_id, GROUP_CONCAT(unidade_codigo) AS codigos, turmas, matriculados
+        FROM totais
+        GROUP BY extracao_id, turmas, matriculados, vagas, novatos, veteranos, quadrados
+        HAVING COUNT(*) > 1
+    ),
+    faixas (unidade_codigo, minimo, maximo) AS ({faixas}),
+    fora AS (
+        SELECT t.extracao_id, t.unidade_codigo, t.matriculados, f.minimo, f.maximo
+        FROM totais t JOIN faixas f ON f.unidade_codigo = t.unidade_codigo
+    )
+    SELECT extracao_id, 'unidades', NULL, n, NULL, NULL FROM unidades WHERE n != 4
+    UNION ALL
+    SELECT extracao_id, 'duplicacao', codigos, turmas, matriculados, NULL FROM duplicadas
+    UNION ALL
+    SELECT extracao_id, 'faixa', unidade_codigo, matriculados, minimo, maximo FROM fora
+    ORDER BY 1
+"""
+
+
+def _sql_faixas(ranges):
+    """(SQL, params) da CTE de faixas; sem faixas vira uma CTE vazia."""
+    if not ranges:
+        return "SELECT NULL, NULL, NULL WHERE 0", []
+    sql = "VALUES " + ", ".join("(?, ?, ?)" for _ in ranges)
+    return sql, [v for cod, (lo, hi) in ranges.items() for v in (cod, lo, hi)]
+
+
+def _achados(db_path: Path, ranges=None, desde=0):
+    """Roda _SQL_AUDITORIA e detectar_anomalias nas extracoes com id > desde.
+
+    Returns:
+        (ids auditados em ordem, [(extracao_id, regra, nivel, mensagem)])
+    """
+    faixas, params = _sql_faixas(ranges)
+    conn = conectar(db_path)
+    ids = [row[0] for row in conn.execute("SELECT id FROM extrações WHERE id > ? ORDER BY id", (desde,))]
+    sql = _SQL_AUDITORIA.format(faixas=faixas, vagas=fonte_vagas(conn))
+    linhas = conn.execute(sql, [desde, desde] + params).fetchall()
+    conn.close()
+
+    achados = []
+    for ext_id, regra, cod, valor, a, b in linhas:
+        if regra == "unidades":
+            achados.append((ext_id, regra, "critico", f"Extracao {ext_id} tem {valor} unidades (esperava 4)"))
+        elif regra == "duplicacao":
+            codigos = sorted(cod.split(","))
+            achados.append((ext_id, regra, "critico",
+                            f"DUPLICACAO no banco: {', '.join(codigos[:-1])} e {codigos[-1]} identicos "
+                            f"({valor} turmas, {a} matriculados)"))
+        elif valor < a or valor > b:
+            achados.append((ext_id, regra, "aviso", f"{cod}: {valor} matriculados fora do range ({a}-{b})"))
+        else:
+            achados.append((ext_id, regra, "ok", f"{cod}: {valor} matriculados OK"))
+    for anomalia in detectar_anomalias(db_path, desde).to_dict("records"):
+        achados.append((anomalia["extracao_id"], "anomalia", "aviso", descrever(anomalia)))
+    return ids, achados
+
+
+def _registrar(resultado, nivel, msg):
+    {"critico": resultado.critico, "aviso": resultado.aviso, "ok": resultado.ok}[nivel](msg)
+
+
+def auditar_snapshots(db_path: Path, ranges=None) -> dict:
+    """Audita todas as extracoes do banco em uma unica query.
+
+    Args:
+        db_path: banco de vagas (vagas.db, integral.db, ...)
+        ranges: {unidade_codigo: (min, max)} de matriculados; None = sem checagem de faixa
+
+    Returns:
+        {extracao_id: AuditoriaResultado}, em ordem de id (vazio se nao houver banco)
+    """
+    if not db_path.exists():
+        return {}
+    ids, achados = _achados(db_path, ranges)
+    resultados = {ext_id: AuditoriaResultado() for ext_id in ids}
+    for ext_id, _, nivel, msg in achados:
+        _registrar(resultados[ext_id], nivel, msg)
+    return resultados
+
+
+def auditar_sqlite(db_path: Path, ranges=RANGES_MATRICULADOS) -> AuditoriaResultado:
+    """Audita o banco SQLite (resultado da ultima extracao; todas passam pelas mesmas regras)."""
     resultado = AuditoriaResultado()
 
     if not db_path.exists():
         resultado.critico(f"Banco nao encontrado: {db_path}")
         return resultado
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # 1. Ultima extracao
-    cursor.execute("SELECT MAX(id), data_extracao FROM extrações")
-    row = cursor.fetchone()
+    conn = conectar(db_path)
+    row = conn.execute("SELECT MAX(id), data_extracao FROM extrações").fetchone()
+    conn.close()
     if not row or not row[0]:
         resultado.critico("Nenhuma extracao no banco")
-        conn.close()
         return resultado
 
     ext_id, data_ext = row
     resultado.ok(f"Ultima extracao: id={ext_id}, data={data_ext}")
+    ultima = auditar_snapshots(db_path, ranges)[ext_id]
+    for e in ultima.erros_criticos:
+        resultado.critico(e)
+    resultado.avisos.extend(ultima.avisos)
+    resultado.info.extend(ultima.info)
+    return resultado
 
-    # 2. Totais por unidade na ultima extracao
-    cursor.execute("""
-        SELECT unidade_codigo, COUNT(*) as turmas, SUM(matriculados) as total
-        FROM vagas WHERE extracao_id = ?
-        GROUP BY unidade_codigo
-    """, (ext_id,))
 
-    totais = {}
-    for cod, turmas, total in cursor.fetchall():
-        totais[cod] = {"turmas": turmas, "matriculados": total}
+# =============================================================================
+# RESULTADOS PERSISTIDOS (auditoria incremental)
+# =============================================================================
 
-    if len(totais) != 4:
-        resultado.critico(f"Ultima extracao tem {len(totais)} unidades (esperava 4)")
+AUDITORIA_DB = OUTPUT_DIR / "auditoria.db"
 
-    # 3. Verificar duplicacao no banco
-    valores = list(totais.values())
-    for i, (cod1, v1) in enumerate(totais.items()):
-        for cod2, v2 in list(totais.items())[i + 1:]:
-            if v1["turmas"] == v2["turmas"] and v1["matriculados"] == v2["matriculados"]:
-                resultado.critico(f"DUPLICACAO no banco: {cod1} e {cod2} identicos")
+# Regras de _achados; toda extracao auditada ganha uma linha por regra
+REGRAS_DB = ("unidades", "duplicacao", "faixa", "anomalia")
+
+# Bancos auditados por auditar_tudo -> faixas de matriculados (None = sem faixa)
+BANCOS_AUDITADOS = {
+    "vagas.db": RANGES_MATRICULADOS,
+    "integral.db": None,
+}
+
+_NIVEIS = ("ok", "aviso", "critico")
+
+_SCHEMA_RESULTADOS = """
+    CREATE TABLE IF NOT EXISTS resultados (
+        db TEXT NOT NULL,
+        extracao_id INTEGER NOT NULL,
+        regra TEXT NOT NULL,
+        nivel TEXT NOT NULL,
+        mensagens TEXT NOT NULL,
+        auditado_em TEXT NOT NULL,
+        PRIMARY KEY (db, extracao_id, regra)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS publicacao (
+        db TEXT PRIMARY KEY,
+        extracao_id INTEGER NOT NULL,
+        publicado_em TEXT NOT NULL
+    );
+"""
 
-    # 4. Verificar ranges
-    for cod, vals in totais.items():
-        range_esperado = RANGES_MATRICULADOS.get(cod)
-        if range_esperado:
-            min_val, max_val = range_esperado
-            if vals["matriculados"] < min_val or vals["matriculados"] > max_val:
-                resultado.aviso(
-                    f"{cod}: {vals['matriculados']} matriculados fora do range ({min_val}-{max_val})"
-                )
-            else:
-                resultado.ok(f"{cod}: {vals['matriculados']} matriculados OK")
 
+# Arquivos de auditoria com o schema ja criado neste processo
+_schema_criado = set()
+
+
+def _conectar_resultados():
+    """Conexao com auditoria.db; o schema so e criado na primeira vez (ou se o arquivo sumiu)."""
+    if AUDITORIA_DB in _schema_criado and AUDITORIA_DB.exists():
+        return sqlite3.connect(AUDITORIA_DB)
+    AUDITORIA_DB.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(AUDITORIA_DB)
+    conn.executescript(_SCHEMA_RESULTADOS)
+    _schema_criado.add(AUDITORIA_DB)
+    return conn
+
+
+def auditar_incremental(db_path: Path, ranges=None) -> int:
+    """Audita so as extracoes de `db_path` ainda sem resultado em auditoria.db.
+
+    Os ids de extracao sao crescentes (AUTOINCREMENT), entao basta auditar
+    acima do maior id ja registrado. Faixas alteradas depois nao reauditam
+    extracoes antigas.
+
+    Returns:
+        numero de extracoes auditadas nesta chamada
+    """
+    if not db_path.exists():
+        return 0
+    conn = _conectar_resultados()
+    try:
+        desde = conn.execute("SELECT COALESCE(MAX(extracao_id), 0) FROM resultados WHERE db = ?",
+                             (db_path.name,)).fetchone()[0]
+        ids, achados = _achados(db_path, ranges, desde)
+        mensagens = {(ext_id, regra): [] for ext_id in ids for regra in REGRAS_DB}
+        niveis = dict.fromkeys(mensagens, 0)
+        for ext_id, regra, nivel, msg in achados:
+            mensagens[(ext_id, regra)].append(msg)
+            niveis[(ext_id, regra)] = max(niveis[(ext_id, regra)], _NIVEIS.index(nivel))
+        agora = datetime.now().isoformat(timespec="seconds")
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO resultados VALUES (?, ?, ?, ?, ?, ?)",
+                [(db_path.name, ext_id, regra, _NIVEIS[niveis[(ext_id, regra)]],
+                  json.dumps(msgs, ensure_ascii=False), agora)
+                 for (ext_id, regra), msgs in mensagens.items()],
+            )
+    finally:
+        conn.close()
+    return len(ids)
+
+
+def status_auditoria(db_name="vagas.db", extracao_id=None):
+    """Resultado persistido de uma extracao (a ultima auditada se extracao_id=None).
+
+    Returns:
+        {"extracao_id", "nivel", "auditado_em", "regras": {regra: (nivel, [mensagens])}}
+        ou None se a extracao ainda nao foi auditada
+    """
+    if not AUDITORIA_DB.exists():
+        return None
+    conn = _conectar_resultados()
+    if extracao_id is None:
+        extracao_id = conn.execute("SELECT MAX(extracao_id) FROM resultados WHERE db = ?",
+                                   (db_name,)).fetchone()[0]
+    linhas = conn.execute(
+        "SELECT regra, nivel, mensagens, auditado_em FROM resultados WHERE db = ? AND extracao_id = ?",
+        (db_name, extracao_id),
+    ).fetchall()
+    conn.close()
+    if not linhas:
+        return None
+    return {
+        "extracao_id": extracao_id,
+        "nivel": max((nivel for _, nivel, _, _ in linhas), key=_NIVEIS.index),
+        "auditado_em": linhas[0][3],
+        "regras": {regra: (nivel, json.loads(msgs)) for regra, nivel, msgs, _ in linhas},
+    }
+
+
+def historico_auditoria(db_name="vagas.db"):
+    """Nivel por extracao auditada: [(extracao_id, nivel)] em ordem de id."""
+    if not AUDITORIA_DB.exists():
+        return []
+    conn = _conectar_resultados()
+    linhas = conn.execute("""
+        SELECT extracao_id,
+               CASE MAX(CASE nivel WHEN 'critico' THEN 2 WHEN 'aviso' THEN 1 ELSE 0 END)
+                   WHEN 2 THEN 'critico' WHEN 1 THEN 'aviso' ELSE 'ok' END
+        FROM resultados WHERE db = ?
+        GROUP BY extracao_id ORDER BY extracao_id
+    """, (db_name,)).fetchall()
+    conn.close()
+    return linhas
+
+
+# =============================================================================
+# PUBLICACAO (gate entre extracao e dashboard)
+# =============================================================================
+# O extrator grava a extracao nova direto no banco, mas os getters de
+# utils.database leem a extracao apontada em auditoria.db (tabela publicacao),
+# nao a MAX(id): a extracao nova fica em staging ate publicar() auditar e
+# promover. A promocao e um UPDATE de uma linha numa transacao, entao o
+# dashboard ve a extracao anterior ou a nova, nunca um meio-termo.
+
+def extracao_publicada(db_name="vagas.db"):
+    """Extracao promovida de `db_name`, ou None se nada foi publicado ainda."""
+    if not AUDITORIA_DB.exists():
+        return None
+    conn = _conectar_resultados()
+    row = conn.execute("SELECT extracao_id FROM publicacao WHERE db = ?", (db_name,)).fetchone()
     conn.close()
+    return row[0] if row else None
+
+
+def extracoes_aprovadas(db_name="vagas.db"):
+    """Ids auditados sem erro critico (os que publicar() pode promover)."""
+    if not AUDITORIA_DB.exists():
+        return set()
+    conn = _conectar_resultados()
+    ids = {row[0] for row in conn.execute(
+        "SELECT extracao_id FROM resultados WHERE db = ? GROUP BY extracao_id HAVING SUM(nivel = 'critico') = 0",
+        (db_name,),
+    )}
+    conn.close()
+    return ids
+
+
+def publicar(db_name="vagas.db") -> dict:
+    """Audita as extracoes novas de `db_name` e promove a mais recente sem erro critico.
+
+    Extracoes reprovadas continuam no banco (e no historico de auditoria), mas
+    o ponteiro fica na ultima aprovada. Avisos nao bloqueiam a publicacao.
+
+    Returns:
+        {"candidata", "nivel" (da candidata), "anterior", "publicada",
+        "promovida" (a candidata e a publicada)} ou None se o banco nao existir
+        ou nao tiver extracoes
+    """
+    db_path = OUTPUT_DIR / db_name
+    if not db_path.exists():
+        return None
+    auditar_incremental(db_path, BANCOS_AUDITADOS.get(db_name))
+    conn = conectar(db_path)
+    candidata = conn.execute("SELECT MAX(id) FROM extrações").fetchone()[0]
+    conn.close()
+    if candidata is None:
+        return None
+
+    conn = _conectar_resultados()
+    try:
+        with conn:
+            # BEGIN IMMEDIATE: dois publicar() simultaneos nao promovem fora de ordem
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT extracao_id FROM publicacao WHERE db = ?", (db_name,)).fetchone()
+            anterior = row[0] if row else None
+            aprovada = conn.execute("""
+                SELECT MAX(extracao_id) FROM (
+                    SELECT extracao_id FROM resultados
+                    WHERE db = ? AND extracao_id > ? AND extracao_id <= ?
+                    GROUP BY extracao_id HAVING SUM(nivel = 'critico') = 0
+                )
+            """, (db_name, anterior or 0, candidata)).fetchone()[0]
+            if aprovada is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO publicacao VALUES (?, ?, ?)",
+                    (db_name, aprovada, datetime.now().isoformat(timespec="seconds")),
+                )
+    finally:
+        conn.close()
+
+    status = status_auditoria(db_name, candidata)
+    publicada = aprovada if aprovada is not None else anterior
+    return {
+        "candidata": candidata,
+        "nivel": status["nivel"] if status else "pendente",
+        "anterior": anterior,
+        "publicada": publicada,
+        "promovida": publicada == candidata,
+    }
+
+
+def _resultado_persistido(db_name) -> AuditoriaResultado:
+    """AuditoriaResultado da ultima extracao a partir de auditoria.db."""
+    resultado = AuditoriaResultado()
+    status = status_auditoria(db_name)
+    if status is None:
+        resultado.critico(f"{db_name}: nenhuma extracao auditada")
+        return resultado
+    resultado.ok(f"{db_name}: ultima extracao auditada id={status['extracao_id']}")
+    for regra in REGRAS_DB:
+        nivel, msgs = status["regras"].get(regra, ("ok", []))
+        for msg in msgs:
+            _registrar(resultado, nivel, msg)
     return resultado
 
 
-def auditar_consistencia_json_db() -> AuditoriaResultado:
-    """Compara JSON ultimo com SQLite para verificar consistencia."""
+def auditar_consistencia_json_db(resumos=None) -> AuditoriaResultado:
+    """Compara JSON ultimo com SQLite para verificar consistencia.
+
+    `resumos` (resumir_json) reaproveita os totais ja lidos por auditar_json.
+    """
     resultado = AuditoriaResultado()
 
     json_path = OUTPUT_DIR / "vagas_ultimo.json"
     db_path = OUTPUT_DIR / "vagas.db"
 
-    if not json_path.exists() or not db_path.exists():
+    if (resumos is None and not json_path.exists()) or not db_path.exists():
         resultado.aviso("Nao foi possivel comparar JSON vs SQLite (arquivos ausentes)")
         return resultado
 
     # Totais do JSON
-    with open(json_path, "r", encoding="utf-8") as f:
-        dados_json = json.load(f)
-
-    totais_json = {}
-    for unidade in dados_json.get("unidades", []):
-        cod = unidade.get("codigo", "")
-        totais_json[cod] = sum(t.get("matriculados", 0) for t in unidade.get("turmas", []))
+    if resumos is None:
+        resumos = resumir_json(json_path)
+    totais_json = {r["codigo"]: r["total"] for r in resumos}
 
     # Totais do SQLite
-    conn = sqlite3.connect(db_path)
+    conn = conectar(db_path)
     cursor = conn.cursor()
+    ultima = dados_de(conn, conn.execute("SELECT MAX(id) FROM extrações").fetchone()[0])
     cursor.execute("""
         SELECT unidade_codigo, SUM(matriculados)
-        FROM vagas WHERE extracao_id = (SELECT MAX(id) FROM extrações)
+        FROM vagas WHERE extracao_id = ?
         GROUP BY unidade_codigo
-    """)
+    """, (ultima,))
     totais_db = {row[0]: row[1] for row in cursor.fetchall()}
     conn.close()
 
@@ -290,24 +686,29 @@ def auditar_tudo(verbose=True) -> bool:
     """Roda auditoria completa. Retorna True se tudo OK."""
     resultados = []
 
-    # 1. JSON ultimo
+    # 1. JSON ultimo: lido uma vez, resumos compartilhados com a consistencia
     json_path = OUTPUT_DIR / "vagas_ultimo.json"
+    resumos = None
     if json_path.exists():
-        r = auditar_json(json_path)
+        resumos = resumir_json(json_path)
+        r = auditar_json(json_path, resumos)
         if verbose:
             print(r.resumo())
         resultados.append(r)
 
-    # 2. SQLite
-    db_path = OUTPUT_DIR / "vagas.db"
-    if db_path.exists():
-        r = auditar_sqlite(db_path)
-        if verbose:
-            print(r.resumo())
-        resultados.append(r)
+    # 2. SQLite: so as extracoes novas; resultados ficam em auditoria.db
+    for db_name, ranges in BANCOS_AUDITADOS.items():
+        db_path = OUTPUT_DIR / db_name
+        if db_path.exists():
+            novas = auditar_incremental(db_path, ranges)
+            r = _resultado_persistido(db_name)
+            r.ok(f"{db_name}: {novas} extracoes novas auditadas")
+            if verbose:
+                print(r.resumo())
+            resultados.append(r)
 
     # 3. Consistencia
-    r = auditar_consistencia_json_db()
+    r = auditar_consistencia_json_db(resumos)
     if verbose:
         print(r.resumo())
     resultados.append(r)
@@ -332,5 +733,14 @@ def auditar_tudo(verbose=True) -> bool:
 
 if __name__ == "__main__":
     import sys
+    if "--publicar" in sys.argv:
+        promovidas = True
+        for db_name in BANCOS_AUDITADOS:
+            pub = publicar(db_name)
+            if pub is None:
+                continue
+            print(f"{db_name}: candidata {pub['candidata']} ({pub['nivel']}), publicada {pub['publicada']}")
+            promovidas = promovidas and pub["promovida"]
+        sys.exit(0 if promovidas else 1)
     ok = auditar_tudo(verbose=True)
     sys.exit(0 if ok else 1)
@@ -0,0 +1,134 @@
+"""Balanco fisico do SAE como serie temporal de contagens.
+
+Cada contagem (config_estoque, tabela balanco_fisico: codigo x unidade x
+data) e comparada com o estoque teorico NA DATA da contagem: enviado menos
+os alunos cuja primeira baixa (dt_baixa) aconteceu ate aquele dia, em vez do
+vendido acumulado de hoje. Entre duas contagens da mesma unidade, a quebra do
+intervalo e o que sumiu alem das vendas do periodo:
+
+    quebra = (fisico anterior - vendas no intervalo) - fisico atual
+
+(na primeira contagem o ponto de partida e o enviado). Positivo = faltam
+livros; negativo = sobraram. Vendas sem dt_baixa nao tem data e so entram
+no vendido atual.
+
+Tudo vetorizado (merge_asof das contagens sobre as vendas acumuladas) e
+montado em estoque_engine.carregar_base, em cache por versao dos dados e da
+configuracao.
+"""
+
+import pandas as pd
+
+CHAVE = ['codigo', 'unidade_cod']
+
+
+class BalancoFisico:
+    """Historico de contagens indexado por (codigo, unidade_cod, data)."""
+
+    def __init__(self, historico):
+        # index (codigo, unidade_cod, data) ordenado; colunas em calcular_balanco
+        self.historico = historico
+
+    def ultimo(self):
+        """Contagem mais recente de cada codigo x unidade (index codigo, unidade_cod; coluna data)."""
+        return self.historico.groupby(level=CHAVE).tail(1).reset_index('data')
+
+    def da_unidade(self, codigo, unidade_cod):
+        """Contagens de um codigo em uma unidade, em ordem de data."""
+        try:
+            return self.historico.loc[(codigo, unidade_cod)]
+        except KeyError:
+            return self.historico.iloc[0:0].droplevel(CHAVE)
+
+    def quebra_por_unidade(self):
+        """Quebra acumulada (soma dos intervalos) por unidade."""
+        return self.historico.groupby('unidade')['quebra'].sum()
+
+
+def calcular_balanco(df_raw, df_estoque, contagens):
+    """Alinha cada contagem fisica com as vendas acumuladas ate a data dela.
+
+    Args:
+        df_raw: registros tipados (dt_baixa datetime)
+        df_estoque: saida de criar_tabela_estoque (codigo x unidade)
+        contagens: [codigo, unidade, data (ISO), quantidade] (config_estoque)
+
+    Returns:
+        BalancoFisico com historico [segmento, serie, unidade, enviado,
+        vendido_ate, teorico, fisico, diferenca, vendas_intervalo, quebra]
+    """
+    chave_serie = ['segmento', 'serie', 'unidade_cod']
+    itens = df_estoque[CHAVE + ['segmento', 'serie', 'unidade', 'enviado']]
+    cont = contagens.rename(columns={'unidade': 'unidade_cod', 'quantidade': 'fisico'})\
+        .merge(itens, on=CHAVE, how='inner')
+    cont[chave_serie] = cont[chave_serie].astype(object)
+    cont['data'] = pd.to_datetime(cont['data']).astype('datetime64[ns]')
+
+    sae = df_raw[(df_raw['tipo'] == 'SAE') & df_raw['dt_baixa'].notna()]
+    vendas = sae.groupby(['segmento', 'serie', 'unidade', 'matricula'], observed=True)['dt_baixa'].min()\
+        .reset_index().rename(columns={'unidade': 'unidade_cod'})
+    vendas[chave_serie] = vendas[chave_serie].astype(object)
+    # a contagem vale para o fim do dia: compara por dia
+    vendas['dia'] = vendas['dt_baixa'].dt.normalize().astype('datetime64[ns]')
+    vendas = vendas.sort_values('dia')
+    vendas['vendido_ate'] = vendas.groupby(chave_serie).cumcount() + 1
+
+    cont = pd.merge_asof(
+        cont.sort_values('data'), vendas[chave_serie + ['dia', 'vendido_ate']],
+        left_on='data', right_on='dia', by=chave_serie, direction='backward',
+    )
+    cont['vendido_ate'] = cont['vendido_ate'].fillna(0).astype('int64')
+    cont['teorico'] = cont['enviado'] - cont['vendido_ate']
+    cont['diferenca'] = cont['fisico'] - cont['teorico']
+
+    cont = cont.sort_values(CHAVE + ['data'])
+    anterior = cont.groupby(CHAVE)[['fisico', 'vendido_ate']].shift()
+    cont['vendas_intervalo'] = cont['vendido_ate'] - anterior['vendido_ate'].fillna(0).astype('int64')
+    partida = anterior['fisico'].fillna(cont['enviado']).astype('int64')
+    cont['quebra'] = partida - cont['vendas_intervalo'] - cont['fisico']
+
+    historico = cont.set_index(CHAVE + ['data'])[
+        ['segmento', 'serie', 'unidade', 'enviado', 'vendido_ate', 'teorico', 'fisico',
+         'diferenca', 'vendas_intervalo', 'quebra']
+    ].sort_index()
+    return BalancoFisico(historico)
+
+
+def tabela_balanco(balanco, df_sae):
+    """Balanco para exibicao: ultima contagem de cada item de `df_sae` (codigo x unidade).
+
+    Itens com contagem usam o vendido ate a data dela; sem contagem, o vendido
+    atual e Fisico/Diferenca = "-".
+    """
+    ultimo = df_sae[CHAVE].merge(balanco.ultimo().reset_index(), on=CHAVE, how='left')\
+        .set_axis(df_sae.index)
+    fisico = ultimo['fisico'].astype('Int64')
+    contado = fisico.notna()
+    vendido = ultimo['vendido_ate'].where(contado, df_sae['vendido']).astype('int64')
+    teorico = df_sae['enviado'] - vendido
+    return pd.DataFrame({
+        'Descrição': df_sae['segmento'] + " - " + df_sae['serie'],
+        'Unidade': df_sae['unidade'],
+        'Contagem': ultimo['data'].dt.strftime('%d/%m').where(contado, "-"),
+        'Enviado': df_sae['enviado'],
+        'Vendido': vendido,
+        'Teórico': teorico,
+        'Físico': fisico.astype(object).where(contado, "-"),
+        'Diferença': (fisico - teorico).astype(object).where(contado, "-"),
+    })
+
+
+def tabela_historico(balanco):
+    """Todas as contagens com a quebra de cada intervalo, para exibicao."""
+    h = balanco.historico.reset_index()
+    return pd.DataFrame({
+        'Data': h['data'].dt.strftime('%d/%m/%Y'),
+        'Descrição': h['segmento'] + " - " + h['serie'],
+        'Unidade': h['unidade'],
+        'Físico': h['fisico'],
+        'Vendido até': h['vendido_ate'],
+        'Teórico': h['teorico'],
+        'Diferença': h['diferenca'],
+        'Vendas no intervalo': h['vendas_intervalo'],
+        'Quebra': h['quebra'],
+    })
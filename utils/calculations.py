@@ -219,3 +219,19 @@ def calcular_evasao(df_2025, df_2026):
         })
 
     return pd.DataFrame(resultados)
+
+
+def tabela_mudancas(diff):
+    """Turmas que mudaram entre duas extrações (get_diff_extracoes), para exibição."""
+    df = diff[diff["situacao"] != "igual"]
+    return pd.DataFrame({
+        "Unidade": df["unidade_codigo"].map(nome_unidade),
+        "Turma": df["turma"],
+        "Situação": df["situacao"].map({"nova": "Nova", "removida": "Removida", "alterada": "Alterada"}),
+        "Antes": df["matriculados_antes"],
+        "Depois": df["matriculados_depois"],
+        "Δ Matriculados": df["delta_matriculados"],
+        "Δ Novatos": df["delta_novatos"],
+        "Δ Veteranos": df["delta_veteranos"],
+        "Δ Vagas": df["delta_vagas"],
+    })
@@ -0,0 +1,364 @@
+"""Tabelas de configuracao do Estoque, versionadas em SQLite.
+
+Pedido SAE, estoque enviado, ajuste do ano passado, balanco fisico e o mapa
+Elo Tech (matricula, unidade) -> serie saem de literais Python para
+output/config_estoque.db:
+- tabela `versoes`: uma linha por importacao (tabela, data, origem, sha256)
+- uma tabela por configuracao com colunas `versao` e `ordem` (linha do
+  arquivo); a versao ativa e a ultima importada, as anteriores ficam como
+  historico
+- os CSVs de dados/estoque/ sao a semente: cada arquivo cujo conteudo ainda
+  nao esta no historico vira uma versao nova na primeira leitura
+
+carregar_config() le as versoes ativas uma vez por versao do banco
+(versao_config(), mtime) e devolve um ConfigEstoque com DataFrames longos e
+dicts somente leitura indexados por codigo/unidade. Uma importacao nova muda
+o mtime, entao vale na proxima leitura, sem redeploy.
+
+Uso standalone:
+    python -m utils.config_estoque --versoes [TABELA]
+    python -m utils.config_estoque --importar TABELA ARQUIVO   # .csv ou .xlsx
+    python -m utils.config_estoque --exportar TABELA ARQUIVO   # versao ativa em CSV
+    python -m utils.config_estoque --reverter VERSAO           # reativa uma versao antiga
+"""
+
+import hashlib
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+
+import pandas as pd
+
+from .dados_estoque import UNIDADES
+
+BASE_DIR = Path(__file__).parent.parent
+DB_PATH = BASE_DIR / "output" / "config_estoque.db"
+SEMENTES_DIR = BASE_DIR / "dados" / "estoque"
+
+# nome -> ([(coluna, tipo SQL)], chave)
+TABELAS = {
+    "pedido_sae": (
+        [("codigo", "INTEGER"), ("serie", "TEXT"), ("segmento", "TEXT"),
+         ("pedido_inicial", "INTEGER"), ("pedido_complementar", "INTEGER")],
+        ("codigo",),
+    ),
+    "estoque_enviado": (
+        [("codigo", "INTEGER"), ("unidade", "TEXT"), ("quantidade", "INTEGER")],
+        ("codigo", "unidade"),
+    ),
+    "ajuste_ano_passado": (
+        [("codigo", "INTEGER"), ("unidade", "TEXT"), ("quantidade", "INTEGER")],
+        ("codigo", "unidade"),
+    ),
+    "balanco_fisico": (
+        [("codigo", "INTEGER"), ("unidade", "TEXT"), ("data", "TEXT"), ("quantidade", "INTEGER")],
+        ("codigo", "unidade", "data"),
+    ),
+    "elotech_serie_pdf": (
+        [("matricula", "TEXT"), ("unidade", "TEXT"), ("serie", "TEXT")],
+        ("matricula", "unidade"),
+    ),
+}
+
+_SCHEMA_VERSOES = """
+    CREATE TABLE IF NOT EXISTS versoes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tabela TEXT NOT NULL,
+        criada_em TEXT NOT NULL,
+        origem TEXT NOT NULL,
+        sha256 TEXT NOT NULL,
+        linhas INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_versoes_tabela ON versoes(tabela, id);
+"""
+
+
+def _schema_tabela(nome):
+    colunas, chave = TABELAS[nome]
+    defs = ", ".join(f"{c} {t} NOT NULL" for c, t in colunas)
+    return (f"CREATE TABLE IF NOT EXISTS {nome} (versao INTEGER NOT NULL, ordem INTEGER NOT NULL, {defs}, "
+            f"PRIMARY KEY (versao, {', '.join(chave)})) WITHOUT ROWID;")
+
+
+# Bancos ja semeados nesta sessao
+_semeados = set()
+# versao_config() -> ConfigEstoque (so a mais recente)
+_cache = {}
+
+
+# =============================================================================
+# VALIDACAO / IMPORTACAO
+# =============================================================================
+
+def _data_iso(valor):
+    """'2026-01-29', '29/01/2026' ou '29/01' (ano corrente) -> '2026-01-29'."""
+    valor = str(valor).strip()
+    if "/" in valor:
+        partes = valor.split("/")
+        ano = partes[2] if len(partes) > 2 else str(datetime.now().year)
+        valor = f"{ano}-{partes[1]}-{partes[0]}"
+    return datetime.strptime(valor[:10], "%Y-%m-%d").strftime("%Y-%m-%d")
+
+
+def normalizar(nome, df):
+    """Valida um DataFrame no formato da tabela `nome` (ordem das linhas preservada).
+
+    Raises:
+        ValueError: tabela desconhecida, coluna faltando, numero invalido,
+            unidade fora de UNIDADES, data invalida ou chave duplicada
+    """
+    if nome not in TABELAS:
+        raise ValueError(f"Tabela desconhecida: {nome} (use {', '.join(TABELAS)})")
+    colunas, chave = TABELAS[nome]
+    nomes = [c for c, _ in colunas]
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    faltando = [c for c in nomes if c not in df.columns]
+    if faltando:
+        raise ValueError(f"{nome}: colunas faltando: {', '.join(faltando)}")
+
+    df = df[nomes].fillna("").astype(str).apply(lambda s: s.str.strip())
+    df = df[(df != "").any(axis=1)].reset_index(drop=True)
+    for coluna, tipo in colunas:
+        if tipo == "INTEGER":
+            numeros = pd.to_numeric(df[coluna], errors="coerce")
+            invalidos = numeros.isna() | (numeros != numeros.round())
+            if invalidos.any():
+                linhas = (df.index[invalidos] + 2).tolist()[:5]
+                raise ValueError(f"{nome}: '{coluna}' nao inteiro nas linhas {linhas}")
+            df[coluna] = numeros.astype("int64")
+    if "unidade" in df:
+        fora = sorted(set(df["unidade"]) - set(UNIDADES))
+        if fora:
+            raise ValueError(f"{nome}: unidades desconhecidas: {', '.join(fora)}")
+    if "data" in df:
+        try:
+            df["data"] = df["data"].map(_data_iso)
+        except (ValueError, IndexError) as e:
+            raise ValueError(f"{nome}: data invalida ({e})") from None
+    duplicadas = df.duplicated(subset=list(chave), keep=False)
+    if duplicadas.any():
+        raise ValueError(f"{nome}: chave {chave} duplicada: "
+                         f"{df.loc[duplicadas, list(chave)].drop_duplicates().head(5).values.tolist()}")
+    return df
+
+
+def _hash(df):
+    return hashlib.sha256(df.to_csv(index=False).encode("utf-8")).hexdigest()
+
+
+def ler_arquivo(caminho):
+    """CSV (utf-8) ou XLSX (primeira aba) como DataFrame de texto."""
+    caminho = Path(caminho)
+    if caminho.suffix.lower() in (".xlsx", ".xlsm"):
+        return pd.read_excel(caminho, dtype=str)  # requer openpyxl
+    return pd.read_csv(caminho, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+
+
+def _versao_ativa(con, nome):
+    linha = con.execute("SELECT MAX(id) FROM versoes WHERE tabela = ?", (nome,)).fetchone()
+    return linha[0]
+
+
+def _gravar(con, nome, df, origem):
+    """Grava `df` (ja normalizado) como versao nova; devolve o id.
+
+    Conteudo igual ao da versao ativa nao gera versao nova.
+    """
+    sha = _hash(df)
+    ativa = _versao_ativa(con, nome)
+    if ativa is not None:
+        sha_ativa = con.execute("SELECT sha256 FROM versoes WHERE id = ?", (ativa,)).fetchone()[0]
+        if sha_ativa == sha:
+            return ativa
+    cur = con.execute(
+        "INSERT INTO versoes (tabela, criada_em, origem, sha256, linhas) VALUES (?, ?, ?, ?, ?)",
+        (nome, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), origem, sha, len(df)),
+    )
+    versao = cur.lastrowid
+    colunas = [c for c, _ in TABELAS[nome][0]]
+    con.executemany(
+        f"INSERT INTO {nome} (versao, ordem, {', '.join(colunas)}) VALUES ({', '.join('?' * (len(colunas) + 2))})",
+        ((versao, i, *linha) for i, linha in enumerate(df.itertuples(index=False, name=None))),
+    )
+    return versao
+
+
+def _conectar():
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(DB_PATH)
+    con.executescript(_SCHEMA_VERSOES + "\n".join(_schema_tabela(n) for n in TABELAS))
+    return con
+
+
+def _semear(con):
+    """Importa os CSVs de dados/estoque/ cujo conteudo ainda nao esta no historico."""
+    for nome in TABELAS:
+        semente = SEMENTES_DIR / f"{nome}.csv"
+        if not semente.exists():
+            continue
+        df = normalizar(nome, ler_arquivo(semente))
+        ja_visto = con.execute("SELECT 1 FROM versoes WHERE tabela = ? AND sha256 = ?",
+                               (nome, _hash(df))).fetchone()
+        if not ja_visto:
+            _gravar(con, nome, df, f"semente:{semente.name}")
+
+
+def _garantir_db():
+    chave = str(DB_PATH)
+    if chave in _semeados and DB_PATH.exists():
+        return
+    con = _conectar()
+    try:
+        with con:
+            _semear(con)
+    finally:
+        con.close()
+    _semeados.add(chave)
+
+
+def importar(nome, dados, origem=None):
+    """Importa uma versao nova de `nome` a partir de um arquivo ou DataFrame.
+
+    Returns:
+        id da versao ativa apos a importacao (a mesma, se o conteudo nao mudou)
+    """
+    if not isinstance(dados, pd.DataFrame):
+        origem = origem or Path(dados).name
+        dados = ler_arquivo(dados)
+    df = normalizar(nome, dados)
+    _garantir_db()
+    con = _conectar()
+    try:
+        with con:
+            return _gravar(con, nome, df, origem or "dataframe")
+    finally:
+        con.close()
+
+
+def reverter(versao):
+    """Reativa uma versao antiga copiando suas linhas como versao nova."""
+    _garantir_db()
+    con = _conectar()
+    try:
+        linha = con.execute("SELECT tabela FROM versoes WHERE id = ?", (versao,)).fetchone()
+        if linha is None:
+            raise ValueError(f"Versao {versao} nao existe")
+        df = _ler_versao(con, linha[0], versao)
+        with con:
+            return _gravar(con, linha[0], df, f"reversao:{versao}")
+    finally:
+        con.close()
+
+
+def historico(nome=None):
+    """Versoes importadas (mais recente primeiro)."""
+    _garantir_db()
+    con = _conectar()
+    try:
+        sql = "SELECT id, tabela, criada_em, origem, linhas FROM versoes"
+        params = ()
+        if nome:
+            sql += " WHERE tabela = ?"
+            params = (nome,)
+        return pd.read_sql_query(sql + " ORDER BY id DESC", con, params=params)
+    finally:
+        con.close()
+
+
+# =============================================================================
+# LEITURA
+# =============================================================================
+
+def _ler_versao(con, nome, versao):
+    colunas = [c for c, _ in TABELAS[nome][0]]
+    return pd.read_sql_query(
+        f"SELECT {', '.join(colunas)} FROM {nome} WHERE versao = ? ORDER BY ordem",
+        con, params=(versao,),
+    )
+
+
+class ConfigEstoque:
+    """Versao ativa das tabelas de configuracao (somente leitura)."""
+
+    def __init__(self, tabelas, versoes):
+        # nome -> DataFrame longo (colunas de TABELAS)
+        self.tabelas = tabelas
+        # nome -> id da versao ativa
+        self.versoes = MappingProxyType(versoes)
+
+        pedido = tabelas["pedido_sae"]
+        # codigo -> (serie, segmento, pedido_inicial, pedido_complementar)
+        self.pedido_sae = MappingProxyType({
+            cod: (serie, seg, ini, comp)
+            for cod, serie, seg, ini, comp in pedido.itertuples(index=False, name=None)
+        })
+        # codigo -> {unidade: quantidade}
+        self.estoque_enviado = self._por_codigo(tabelas["estoque_enviado"])
+        self.ajuste_ano_passado = self._por_codigo(tabelas["ajuste_ano_passado"])
+        # codigo -> {unidade: {'dd/mm': quantidade}} em ordem de data
+        balanco = {}
+        for cod, u, data, qtd in tabelas["balanco_fisico"].sort_values("data").itertuples(index=False, name=None):
+            balanco.setdefault(cod, {}).setdefault(u, {})[f"{data[8:10]}/{data[5:7]}"] = qtd
+        self.balanco_fisico = MappingProxyType({
+            cod: MappingProxyType({u: MappingProxyType(d) for u, d in por_un.items()})
+            for cod, por_un in balanco.items()
+        })
+        # (matricula, unidade) -> serie
+        tech = tabelas["elotech_serie_pdf"]
+        self.elotech_serie_pdf = MappingProxyType(
+            dict(zip(zip(tech["matricula"], tech["unidade"]), tech["serie"])))
+
+    @staticmethod
+    def _por_codigo(df):
+        por_codigo = {}
+        for cod, u, qtd in df.itertuples(index=False, name=None):
+            por_codigo.setdefault(cod, {})[u] = qtd
+        return MappingProxyType({cod: MappingProxyType(d) for cod, d in por_codigo.items()})
+
+
+def versao_config():
+    """Identificador da configuracao atual (muda a cada importacao) para chaves de cache."""
+    _garantir_db()
+    return DB_PATH.stat().st_mtime_ns
+
+
+def carregar_config():
+    """ConfigEstoque das versoes ativas, lido uma vez por versao_config()."""
+    versao = versao_config()
+    config = _cache.get(versao)
+    if config is None:
+        con = _conectar()
+        try:
+            versoes, tabelas = {}, {}
+            for nome in TABELAS:
+                versoes[nome] = _versao_ativa(con, nome)
+                tabelas[nome] = _ler_versao(con, nome, versoes[nome])
+        finally:
+            con.close()
+        config = ConfigEstoque(tabelas, versoes)
+        _cache.clear()
+        _cache[versao] = config
+    return config
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    try:
+        if args[:1] == ["--importar"] and len(args) == 3:
+            v = importar(args[1], args[2])
+            print(f"{args[1]}: versao ativa {v}")
+        elif args[:1] == ["--exportar"] and len(args) == 3:
+            carregar_config().tabelas[args[1]].to_csv(args[2], index=False)
+            print(f"{args[1]} -> {args[2]}")
+        elif args[:1] == ["--reverter"] and len(args) == 2:
+            print(f"versao ativa {reverter(int(args[1]))}")
+        elif args[:1] == ["--versoes"]:
+            print(historico(args[1] if len(args) > 1 else None).to_string(index=False))
+        else:
+            print(__doc__)
+            sys.exit(2)
+    except (ValueError, KeyError, FileNotFoundError) as e:
+        print(f"Erro: {e}")
+        sys.exit(1)
@@ -1,181 +1,254 @@
 """Queries SQLite com cache para o dashboard."""
 
-import sqlite3
 import pandas as pd
 import streamlit as st
 from pathlib import Path
 from datetime import datetime
 
+from .auditor import extracao_publicada, extracoes_aprovadas, status_auditoria
+from .snapshots import colunas_vagas, conectar, dados_de, fonte_vagas
+
 OUTPUT_DIR = Path(__file__).parent.parent / "output"
 
 
 def _get_connection(db_name):
-    """Cria conexão SQLite read-only."""
+    """Cria conexão SQLite read-only (busy timeout de snapshots.conectar)."""
     db_path = OUTPUT_DIR / db_name
     if not db_path.exists():
         return None
-    return sqlite3.connect(db_path, check_same_thread=False)
+    return conectar(db_path, check_same_thread=False)
 
 
-@st.cache_data(ttl=300)
-def get_matriculas_2026():
-    """Retorna dados de matrículas 2026 agrupados por unidade e segmento."""
-    conn = _get_connection("vagas.db")
+def _extracao_exibida(conn, db_name):
+    """Extracao que o dashboard mostra: a promovida por auditor.publicar.
+
+    Bancos sem publicacao registrada (historicos, ou antes do primeiro
+    publicar) usam a ultima extracao.
+    """
+    publicada = extracao_publicada(db_name)
+    if publicada is not None:
+        return publicada
+    return conn.execute("SELECT MAX(id) FROM extrações").fetchone()[0]
+
+
+def _dados_exibidos(conn, db_name):
+    """Extracao cujas linhas em vagas valem para a exibida (resolve referencias)."""
+    return dados_de(conn, _extracao_exibida(conn, db_name))
+
+
+@st.cache_data(ttl=30)
+def versao_dados(db_name):
+    """Versao dos dados exibidos de `db_name`: a extracao dona das linhas.
+
+    Uma extracao nova com o mesmo conteudo (referencia, utils.snapshots) nao
+    muda a versao, entao os caches de _ler_versao continuam valendo. Em cache
+    curto: um render chama varios getters e nao reabre vagas.db e auditoria.db
+    para cada um; o botao de atualizar limpa na hora.
+    """
+    conn = _get_connection(db_name)
+    if conn is None:
+        return None
+    versao = _dados_exibidos(conn, db_name)
+    conn.close()
+    return versao
+
+
+@st.cache_data(max_entries=32)
+def _ler_versao(db_name, sql, versao):
+    """Consulta de uma extracao (`sql` com WHERE extracao_id = ?), em cache por versao dos dados."""
+    conn = _get_connection(db_name)
     if conn is None:
         return pd.DataFrame()
-    df = pd.read_sql_query("""
+    df = pd.read_sql_query(sql, conn, params=(versao,))
+    conn.close()
+    return df
+
+
+def get_matriculas_2026():
+    """Retorna dados de matrículas 2026 agrupados por unidade e segmento."""
+    return _ler_versao("vagas.db", """
         SELECT unidade_codigo, segmento, SUM(matriculados) as matriculados
         FROM vagas
-        WHERE extracao_id = (SELECT MAX(id) FROM extrações)
+        WHERE extracao_id = ?
         GROUP BY unidade_codigo, segmento
-    """, conn)
-    conn.close()
-    return df
+    """, versao_dados("vagas.db"))
 
 
-@st.cache_data(ttl=300)
 def get_matriculas_2025():
     """Retorna dados de matrículas 2025 agrupados por unidade e segmento."""
-    conn = _get_connection("vagas_2025.db")
-    if conn is None:
-        return pd.DataFrame()
-    df = pd.read_sql_query("""
+    return _ler_versao("vagas_2025.db", """
         SELECT unidade_codigo, segmento, SUM(matriculados) as matriculados
         FROM vagas
-        WHERE extracao_id = (SELECT MAX(id) FROM extrações)
+        WHERE extracao_id = ?
         GROUP BY unidade_codigo, segmento
-    """, conn)
-    conn.close()
-    return df
+    """, versao_dados("vagas_2025.db"))
 
 
-@st.cache_data(ttl=300)
 def get_integral_2026():
     """Retorna dados do integral 2026 agrupados por unidade."""
-    conn = _get_connection("integral.db")
-    if conn is None:
-        return pd.DataFrame()
-    df = pd.read_sql_query("""
+    return _ler_versao("integral.db", """
         SELECT unidade_codigo, SUM(matriculados) as matriculados
         FROM vagas
-        WHERE extracao_id = (SELECT MAX(id) FROM extrações)
+        WHERE extracao_id = ?
         GROUP BY unidade_codigo
-    """, conn)
-    conn.close()
-    return df
+    """, versao_dados("integral.db"))
 
 
-@st.cache_data(ttl=300)
 def get_integral_2025():
     """Retorna dados do integral 2025 agrupados por unidade."""
-    conn = _get_connection("integral_2025.db")
-    if conn is None:
-        return pd.DataFrame()
-    df = pd.read_sql_query("""
+    return _ler_versao("integral_2025.db", """
         SELECT unidade_codigo, SUM(matriculados) as matriculados
         FROM vagas
-        WHERE extracao_id = (SELECT MAX(id) FROM extrações)
+        WHERE extracao_id = ?
         GROUP BY unidade_codigo
-    """, conn)
-    conn.close()
-    return df
+    """, versao_dados("integral_2025.db"))
 
 
-@st.cache_data(ttl=300)
 def get_turmas_detalhadas_2026():
     """Retorna dados detalhados por turma 2026 (para ensalamento)."""
-    conn = _get_connection("vagas.db")
-    if conn is None:
-        return pd.DataFrame()
-    df = pd.read_sql_query("""
+    return _ler_versao("vagas.db", """
         SELECT unidade_codigo, unidade_nome, segmento, turma,
                vagas, novatos, veteranos, matriculados,
                pre_matriculados, disponiveis
         FROM vagas
-        WHERE extracao_id = (SELECT MAX(id) FROM extrações)
-    """, conn)
-    conn.close()
-    return df
+        WHERE extracao_id = ?
+    """, versao_dados("vagas.db"))
 
 
-@st.cache_data(ttl=300)
 def get_evasao_2025():
     """Retorna dados por turma 2025 para cálculo de evasão."""
-    conn = _get_connection("vagas_2025.db")
-    if conn is None:
-        return pd.DataFrame()
-    df = pd.read_sql_query("""
+    return _ler_versao("vagas_2025.db", """
         SELECT unidade_codigo, turma,
                SUM(matriculados) as total_2025,
                SUM(veteranos) as veteranos_2025,
                SUM(novatos) as novatos_2025
         FROM vagas
-        WHERE extracao_id = (SELECT MAX(id) FROM extrações)
+        WHERE extracao_id = ?
         GROUP BY unidade_codigo, turma
-    """, conn)
-    conn.close()
-    return df
+    """, versao_dados("vagas_2025.db"))
 
 
-@st.cache_data(ttl=300)
 def get_evasao_2026():
     """Retorna dados por turma 2026 para cálculo de evasão."""
-    conn = _get_connection("vagas.db")
-    if conn is None:
-        return pd.DataFrame()
-    df = pd.read_sql_query("""
+    return _ler_versao("vagas.db", """
         SELECT unidade_codigo, turma,
                SUM(matriculados) as total_2026,
                SUM(veteranos) as veteranos_2026,
                SUM(novatos) as novatos_2026
         FROM vagas
-        WHERE extracao_id = (SELECT MAX(id) FROM extrações)
+        WHERE extracao_id = ?
         GROUP BY unidade_codigo, turma
-    """, conn)
-    conn.close()
-    return df
+    """, versao_dados("vagas.db"))
 
 
-@st.cache_data(ttl=300)
 def get_matriculas_por_turma_2026():
     """Retorna dados por turma 2026 (para tabela por série)."""
-    conn = _get_connection("vagas.db")
-    if conn is None:
-        return pd.DataFrame()
-    df = pd.read_sql_query("""
+    return _ler_versao("vagas.db", """
         SELECT unidade_codigo, segmento, turma,
                novatos, veteranos, matriculados
         FROM vagas
-        WHERE extracao_id = (SELECT MAX(id) FROM extrações)
-    """, conn)
-    conn.close()
-    return df
+        WHERE extracao_id = ?
+    """, versao_dados("vagas.db"))
 
 
-@st.cache_data(ttl=300)
 def get_matriculas_por_turma_2025():
     """Retorna dados por turma 2025 (para comparativo novatos/veteranos)."""
-    conn = _get_connection("vagas_2025.db")
-    if conn is None:
-        return pd.DataFrame()
-    df = pd.read_sql_query("""
+    return _ler_versao("vagas_2025.db", """
         SELECT unidade_codigo, segmento, turma,
                novatos, veteranos, matriculados
         FROM vagas
-        WHERE extracao_id = (SELECT MAX(id) FROM extrações)
-    """, conn)
+        WHERE extracao_id = ?
+    """, versao_dados("vagas_2025.db"))
+
+
+# Duas extracoes numa passada (equivalente a um FULL OUTER JOIN em
+# unidade_codigo x turma): turma so em :a foi removida, so em :b e nova.
+# Deltas somam o lado :b menos o lado :a, com o lado ausente valendo 0.
+_SQL_DIFF = """
+    SELECT unidade_codigo, MAX({segmento}) AS segmento, turma,
+           COUNT(CASE WHEN extracao_id = :a THEN 1 END) AS em_a,
+           COUNT(CASE WHEN extracao_id = :b THEN 1 END) AS em_b,
+           SUM(CASE WHEN extracao_id = :a THEN matriculados END) AS matriculados_antes,
+           SUM(CASE WHEN extracao_id = :b THEN matriculados END) AS matriculados_depois,
+           SUM(CASE WHEN extracao_id = :b THEN matriculados ELSE -matriculados END) AS delta_matriculados,
+           SUM(CASE WHEN extracao_id = :b THEN novatos ELSE -novatos END) AS delta_novatos,
+           SUM(CASE WHEN extracao_id = :b THEN veteranos ELSE -veteranos END) AS delta_veteranos,
+           SUM(CASE WHEN extracao_id = :b THEN vagas ELSE -vagas END) AS delta_vagas
+    FROM {vagas}
+    WHERE extracao_id IN (:a, :b)
+    GROUP BY unidade_codigo, turma
+"""
+
+
+@st.cache_data(max_entries=32)
+def get_diff_extracoes(extracao_a, extracao_b, db_name="vagas.db"):
+    """Diferencas por turma entre duas extracoes (snapshots nao mudam: cache sem ttl).
+
+    Returns:
+        DataFrame [unidade_codigo, segmento, turma, situacao (nova, removida,
+        alterada, igual), matriculados_antes, matriculados_depois,
+        delta_matriculados, delta_novatos, delta_veteranos, delta_vagas],
+        por unidade e maior variacao primeiro
+    """
+    conn = _get_connection(db_name)
+    if conn is None:
+        return pd.DataFrame()
+    colunas = colunas_vagas(conn)
+    # integral.db guarda o segmento na coluna tipo
+    segmento = "segmento" if "segmento" in colunas else "tipo"
+    df = pd.read_sql_query(_SQL_DIFF.format(segmento=segmento, vagas=fonte_vagas(conn)), conn,
+                           params={"a": extracao_a, "b": extracao_b})
     conn.close()
-    return df
+
+    deltas = ["delta_matriculados", "delta_novatos", "delta_veteranos", "delta_vagas"]
+    df["situacao"] = "alterada"
+    df.loc[(df[deltas] == 0).all(axis=1), "situacao"] = "igual"
+    df.loc[df["em_a"] == 0, "situacao"] = "nova"
+    df.loc[df["em_b"] == 0, "situacao"] = "removida"
+    df[["matriculados_antes", "matriculados_depois"]] = df[["matriculados_antes", "matriculados_depois"]].astype("Int64")
+    df["_ordem"] = df["delta_matriculados"].abs()
+    df = df.sort_values(["unidade_codigo", "_ordem", "turma"], ascending=[True, False, True])
+    return df[["unidade_codigo", "segmento", "turma", "situacao",
+               "matriculados_antes", "matriculados_depois"] + deltas].reset_index(drop=True)
+
+
+@st.cache_data(ttl=300)
+def get_mudancas_ultima_extracao(db_name="vagas.db"):
+    """Diff da extracao exibida contra a anterior que o dashboard poderia ter mostrado.
+
+    Com publicacao, a anterior e a ultima extracao aprovada na auditoria antes
+    da exibida (reprovadas nunca foram mostradas); bancos sem publicacao usam
+    a extracao imediatamente anterior.
+
+    Returns:
+        (extracao_anterior, extracao_exibida, DataFrame de get_diff_extracoes);
+        (None, None, DataFrame vazio) sem duas extracoes
+    """
+    conn = _get_connection(db_name)
+    if conn is None:
+        return None, None, pd.DataFrame()
+    atual = _extracao_exibida(conn, db_name)
+    if extracao_publicada(db_name) is None:
+        anterior = conn.execute("SELECT MAX(id) FROM extrações WHERE id < ?", (atual,)).fetchone()[0]
+    else:
+        aprovadas = extracoes_aprovadas(db_name)
+        # a aprovada mais recente que ainda esta no banco (a retencao pode ter podado outras)
+        anterior = next((row[0] for row in conn.execute(
+            "SELECT id FROM extrações WHERE id < ? ORDER BY id DESC", (atual,)) if row[0] in aprovadas), None)
+    conn.close()
+    if atual is None or anterior is None:
+        return None, None, pd.DataFrame()
+    return anterior, atual, get_diff_extracoes(anterior, atual, db_name)
 
 
 @st.cache_data(ttl=300)
 def get_ultima_extracao():
-    """Retorna a data da última extração."""
+    """Retorna a data da última extração publicada."""
     conn = _get_connection("vagas.db")
     if conn is None:
         return "N/A"
     cursor = conn.cursor()
-    cursor.execute("SELECT data_extracao FROM extrações ORDER BY id DESC LIMIT 1")
+    cursor.execute("SELECT data_extracao FROM extrações WHERE id = ?", (_extracao_exibida(conn, "vagas.db"),))
     row = cursor.fetchone()
     conn.close()
     if row and row[0]:
@@ -185,3 +258,26 @@ def get_ultima_extracao():
         except (ValueError, TypeError):
             return row[0]
     return "N/A"
+
+
+@st.cache_data(ttl=300)
+def get_status_auditoria(db_name="vagas.db"):
+    """Status persistido da auditoria da ultima extracao (utils.auditor), sem reauditar.
+
+    Returns:
+        dict de status_auditoria, com nivel "pendente" se a extracao ainda nao
+        foi auditada e "publicada" (extracao exibida no dashboard); None se o
+        banco nao existir
+    """
+    conn = _get_connection(db_name)
+    if conn is None:
+        return None
+    row = conn.execute("SELECT MAX(id) FROM extrações").fetchone()
+    publicada = _extracao_exibida(conn, db_name)
+    conn.close()
+    if not row or row[0] is None:
+        return None
+    status = status_auditoria(db_name, row[0]) or {
+        "extracao_id": row[0], "nivel": "pendente", "auditado_em": None, "regras": {},
+    }
+    return {**status, "publicada": publicada}
@@ -0,0 +1,111 @@
+"""Cubo de estoque das paginas de Estoque (tipo x codigo/serie x unidade).
+
+Montado uma vez por versao dos dados, a partir dos agregados de vendas e da
+tabela de estoque SAE. As secoes da pagina (Briefing, Conferencia,
+divergencias, tabelas Socio/Elo Tech, Balanco Fisico) leem daqui em vez de
+refiltrar os DataFrames de vendas celula a celula.
+"""
+
+import pandas as pd
+
+from .balanco_fisico import CHAVE
+
+
+class EstoqueCube:
+    """Vendido, enviado, ajuste, estoque e fisico por tipo x serie x unidade."""
+
+    def __init__(self, vendas, sae, contagens, sem_serie_elotech):
+        # [tipo, segmento, serie, unidade, vendido] - alunos unicos
+        self.vendas = vendas
+        # codigo x unidade na ordem PEDIDO_SAE x UNIDADES (+ coluna fisico)
+        self.sae = sae
+        # [tipo, unidade, registros, alunos] - unidade '' = total do tipo
+        self.contagens = contagens
+        # {unidade: n} alunos Elo Tech fora do PDF e sem SAE/Socio
+        self.sem_serie_elotech = sem_serie_elotech
+        self._vendido = dict(zip(
+            zip(vendas['tipo'], vendas['segmento'], vendas['serie'], vendas['unidade']),
+            vendas['vendido'].astype(int),
+        ))
+
+    def vendido(self, tipo, segmento, serie, unidade):
+        """Alunos unicos de um tipo em uma serie/unidade (0 se nao houver)."""
+        return self._vendido.get((tipo, segmento, serie, unidade), 0)
+
+    def matriz(self, tipo, series, unidades):
+        """Vendido em linhas (segmento, serie) x colunas unidade (codigos).
+
+        Returns:
+            DataFrame com index = series (na ordem pedida) e colunas = unidades
+        """
+        v = self.vendas[self.vendas['tipo'] == tipo]
+        if v.empty:
+            return pd.DataFrame(0, index=pd.MultiIndex.from_tuples(series, names=['segmento', 'serie']),
+                                columns=list(unidades))
+        tabela = v.pivot_table(index=['segmento', 'serie'], columns='unidade',
+                               values='vendido', aggfunc='sum')
+        tabela = tabela.reindex(index=pd.MultiIndex.from_tuples(series, names=['segmento', 'serie']),
+                                columns=list(unidades))
+        return tabela.fillna(0).astype(int)
+
+    def vendido_fora(self, tipo, series, unidades):
+        """Vendido por unidade nas series que NAO estao em `series`."""
+        v = self.vendas[(self.vendas['tipo'] == tipo) & ~self.vendas['serie'].isin(set(series))]
+        por_unidade = v.groupby('unidade')['vendido'].sum()
+        return {u: int(por_unidade.get(u, 0)) for u in unidades}
+
+    def sae_unidade(self, unidade_cod):
+        """Linhas SAE (ordem PEDIDO_SAE) de uma unidade."""
+        return self.sae[self.sae['unidade_cod'] == unidade_cod]
+
+    def contagem(self, tipo, unidade=''):
+        """(registros, alunos unicos) de um tipo, no total ou em uma unidade."""
+        linha = self.contagens[(self.contagens['tipo'] == tipo) & (self.contagens['unidade'] == unidade)]
+        if linha.empty:
+            return 0, 0
+        return int(linha['registros'].iloc[0]), int(linha['alunos'].iloc[0])
+
+
+def _fisico_mais_recente(df_sae, balanco):
+    """Ultima contagem de BalancoFisico.ultimo() por codigo x unidade, <NA> se nao houver."""
+    fisico = df_sae[CHAVE].merge(balanco.ultimo()['fisico'].reset_index(), on=CHAVE, how='left')
+    return fisico['fisico'].astype('Int64').array
+
+
+def construir_cubo(df_raw, df_estoque, vendas_por_tipo, serie_pdf, balanco):
+    """Monta o EstoqueCube.
+
+    Args:
+        df_raw: registros de vendas (com os Elo Tech em aberto injetados)
+        df_estoque: saida de criar_tabela_estoque (SAE por codigo x unidade)
+        vendas_por_tipo: {tipo: DataFrame [segmento, serie, unidade, vendido]}
+        serie_pdf: {(matricula, unidade): serie} (ELOTECH_SERIE_PDF)
+        balanco: BalancoFisico de calcular_balanco (mesmo historico da secao
+            Balanco Fisico)
+    """
+    vendas = pd.concat(
+        [df.assign(tipo=tipo) for tipo, df in vendas_por_tipo.items()],
+        ignore_index=True,
+    )[['tipo', 'segmento', 'serie', 'unidade', 'vendido']]
+
+    # criar_tabela_estoque ordena por segmento/serie; o index original
+    # preserva a ordem PEDIDO_SAE x UNIDADES usada nos loops de alerta
+    sae = df_estoque.sort_index().reset_index(drop=True)
+    sae['fisico'] = _fisico_mais_recente(sae, balanco)
+
+    por_tipo = df_raw.groupby('tipo', observed=True).agg(
+        registros=('matricula', 'size'), alunos=('matricula', 'nunique'))
+    por_unidade = df_raw.groupby(['tipo', 'unidade'], observed=True).agg(
+        registros=('matricula', 'size'), alunos=('matricula', 'nunique'))
+    contagens = pd.concat([
+        por_tipo.reset_index().assign(unidade=''),
+        por_unidade.reset_index(),
+    ], ignore_index=True)[['tipo', 'unidade', 'registros', 'alunos']]
+
+    tech = df_raw[df_raw['tipo'] == 'Elo Tech'].drop_duplicates(subset=['unidade', 'matricula'])
+    no_pdf = pd.MultiIndex.from_arrays([tech['matricula'], tech['unidade']]).isin(list(serie_pdf))
+    mats_ref = df_raw.loc[df_raw['tipo'].isin(['SAE', 'Socioemocional']), 'matricula'].unique()
+    sem_serie = tech[~no_pdf & ~tech['matricula'].isin(mats_ref)]
+    sem_serie_elotech = sem_serie['unidade'].value_counts().to_dict()
+
+    return EstoqueCube(vendas, sae, contagens, sem_serie_elotech)
@@ -0,0 +1,354 @@
+"""Nucleo compartilhado das paginas de Estoque (4_Estoque e 5_Estoque_SAE).
+
+Mapeamento de servicos do SIGA, parser de TSV e o pipeline de dados
+(vendas por serie, tabela de estoque SAE, resolucao Elo Tech, cubo, receita,
+previsao de ruptura, balanco fisico). O pipeline fica em cache por versao dos
+dados (versao_base(): snapshot de vendas + configuracao de
+utils.config_estoque), um objeto por processo (st.cache_resource)
+compartilhado pelas duas paginas.
+"""
+
+import re
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from . import vendas_store
+from .balanco_fisico import calcular_balanco
+from .config_estoque import carregar_config, versao_config
+from .dados_estoque import UNIDADES, ORDEM_SEGMENTOS, ELOTECH_EM_ABERTO
+from .estoque_cube import construir_cubo
+from .previsao_estoque import calcular_previsao
+from .receita import calcular_receita
+
+# =============================================================================
+# SERVICOS SIGA
+# =============================================================================
+
+CODIGOS_SERVICOS = {
+    "901", "902", "903", "904",
+    "913", "914", "915", "920", "921",
+    "916", "917", "918", "919",
+    "912", "991", "992",
+    "933", "934", "941", "942", "943", "944", "945", "946",
+    "995",
+}
+
+# Cordeiro NAO tem Elo Tech
+CODIGOS_EXCLUIR_POR_UNIDADE = {
+    "CDR": {"995"},
+}
+
+SERVICOS_MAP = {
+    "901": ("Infantil", "Infantil II", "SAE"),
+    "902": ("Infantil", "Infantil III", "SAE"),
+    "903": ("Infantil", "Infantil IV", "SAE"),
+    "904": ("Infantil", "Infantil V", "SAE"),
+    "913": ("Fund1", "3º Ano", "SAE"),
+    "914": ("Fund1", "4º Ano", "SAE"),
+    "915": ("Fund1", "5º Ano", "SAE"),
+    "920": ("Fund1", "2º Ano", "SAE"),
+    "921": ("Fund1", "1º Ano", "SAE"),
+    "916": ("Fund2", "6º Ano", "SAE"),
+    "917": ("Fund2", "7º Ano", "SAE"),
+    "918": ("Fund2", "8º Ano", "SAE"),
+    "919": ("Fund2", "9º Ano", "SAE"),
+    "912": ("Médio", "1º Ano", "SAE"),
+    "991": ("Médio", "2º Ano", "SAE"),
+    "992": ("Médio", "3º Ano", "SAE"),
+    "933": ("Infantil", "Infantil IV", "Socioemocional"),
+    "934": ("Infantil", "Infantil V", "Socioemocional"),
+    "941": ("Fund1", "1º Ano", "Socioemocional"),
+    "942": ("Fund1", "2º Ano", "Socioemocional"),
+    "943": ("Fund1", "3º Ano", "Socioemocional"),
+    "944": ("Fund1", "4º Ano", "Socioemocional"),
+    "945": ("Fund1", "5º Ano", "Socioemocional"),
+    "946": ("Fund2", "6º Ano", "Socioemocional"),
+    "995": ("Geral", "Todas", "Elo Tech"),
+}
+
+RE_SERVICO = re.compile(r'^(\d{3})\s*-\s*(.+?)(?:\s*\(|$)')
+RE_TURMA = re.compile(r'Turma\s+(\w+)')
+
+ORDEM_SERIES_COMPLETA = [
+    ('Infantil', 'Infantil II'), ('Infantil', 'Infantil III'),
+    ('Infantil', 'Infantil IV'), ('Infantil', 'Infantil V'),
+    ('Fund1', '1º Ano'), ('Fund1', '2º Ano'), ('Fund1', '3º Ano'),
+    ('Fund1', '4º Ano'), ('Fund1', '5º Ano'),
+    ('Fund2', '6º Ano'), ('Fund2', '7º Ano'),
+    ('Fund2', '8º Ano'), ('Fund2', '9º Ano'),
+    ('Médio', '1º Ano'), ('Médio', '2º Ano'), ('Médio', '3º Ano'),
+]
+
+ORDEM_SERIES_SOCIO = [
+    ('Infantil', 'Infantil IV'), ('Infantil', 'Infantil V'),
+    ('Fund1', '1º Ano'), ('Fund1', '2º Ano'), ('Fund1', '3º Ano'),
+    ('Fund1', '4º Ano'), ('Fund1', '5º Ano'),
+    ('Fund2', '6º Ano'),
+]
+
+ORDEM_SERIES_ELOTECH = [
+    ('Fund1', '2º Ano'), ('Fund1', '3º Ano'),
+    ('Fund1', '4º Ano'), ('Fund1', '5º Ano'),
+]
+
+TURNO_MAP = {'A': 'Manha', 'B': 'Tarde', 'C': 'Integral'}
+
+# Mapa inverso para converter nome -> codigo
+UNIDADES_INV = {v: k for k, v in UNIDADES.items()}
+
+
+# =============================================================================
+# PARSER TSV
+# =============================================================================
+
+def iterar_tsv(linhas, unidade_codigo):
+    """Gera os registros de um TSV de recebimentos do SIGA (uma unidade), linha a linha.
+
+    Args:
+        linhas: iteravel de linhas (arquivo aberto, lista, ...)
+        unidade_codigo: 'BV', 'CD', 'JG' ou 'CDR'
+    """
+    servico_codigo = ""
+    turma_atual = ""
+    excluir = CODIGOS_EXCLUIR_POR_UNIDADE.get(unidade_codigo, set())
+
+    for linha in linhas:
+        linha = linha.strip()
+        if not linha or linha.startswith('Subtotal') or linha.startswith('Matrícula'):
+            continue
+
+        if ' - ' in linha and '(' in linha:
+            match = RE_SERVICO.match(linha)
+            if match:
+                servico_codigo = match.group(1)
+                if servico_codigo not in CODIGOS_SERVICOS or servico_codigo in excluir:
+                    servico_codigo = ""
+                    continue
+                turma_match = RE_TURMA.search(linha)
+                turma_atual = turma_match.group(1) if turma_match else ""
+            continue
+
+        if not servico_codigo:
+            continue
+
+        campos = linha.split('\t')
+        if len(campos) >= 6:
+            matricula = campos[0].strip()
+            if matricula and (matricula[0].isdigit() or '-' in matricula):
+                info = SERVICOS_MAP.get(servico_codigo, ("", "", ""))
+                yield {
+                    "unidade": unidade_codigo,
+                    "servico_codigo": servico_codigo,
+                    "turma": turma_atual,
+                    "matricula": matricula,
+                    "nome": campos[1].strip(),
+                    "titulo": campos[2].strip(),
+                    "parcela": campos[3].strip(),
+                    "dt_baixa": campos[4].strip(),
+                    "valor": campos[5].strip(),
+                    "recebido": campos[-1].strip() if len(campos) > 6 else "",
+                    "segmento": info[0],
+                    "serie": info[1],
+                    "tipo": info[2],
+                }
+
+
+def parse_tsv(tsv_content, unidade_codigo):
+    """Parser de um TSV ja lido em memoria (lista de registros)."""
+    return list(iterar_tsv(tsv_content.split('\n'), unidade_codigo))
+
+
+def unidade_do_arquivo(path):
+    """Codigo da unidade pelo nome do arquivo: dados_BV.tsv, dados_BV_20250901.tsv -> 'BV'."""
+    return Path(path).stem.split("_")[1].upper()
+
+
+def ler_tsv(path):
+    """Registros de um dados_<UNIDADE>*.tsv, lidos em streaming (sem carregar o arquivo)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from iterar_tsv(f, unidade_do_arquivo(path))
+
+
+def ingerir_tsvs(pasta, metadados):
+    """Ingestao incremental dos dados_*.tsv de uma pasta (vendas_store.ingerir_arquivos).
+
+    Returns:
+        (total_registros, arquivos_ingeridos) ou None se o total cairia abaixo
+        de 80% do atual (banco nao alterado)
+    """
+    return vendas_store.ingerir_arquivos(sorted(Path(pasta).glob("dados_*.tsv")), ler_tsv, metadados)
+
+
+# =============================================================================
+# PIPELINE
+# =============================================================================
+
+class BaseEstoque:
+    """Dados derivados de um snapshot de vendas, comuns as duas paginas."""
+
+    def __init__(self, df_raw, ultima_atualizacao, vendas_sae, vendas_socio,
+                 vendas_elotech, estoque, elotech_detail, cubo, receita, previsao, balanco):
+        # registros do snapshot + Elo Tech em aberto, tipados (vendas_store.tipar_registros)
+        self.df_raw = df_raw
+        self.ultima_atualizacao = ultima_atualizacao
+        # [segmento, serie, unidade, vendido] - alunos unicos por tipo
+        self.vendas_sae = vendas_sae
+        self.vendas_socio = vendas_socio
+        self.vendas_elotech = vendas_elotech
+        # SAE por codigo x unidade (criar_tabela_estoque)
+        self.estoque = estoque
+        # linhas Elo Tech com serie_real/segmento_real/turma_real/turno
+        self.elotech_detail = elotech_detail
+        self.cubo = cubo
+        # recebimentos por dia x unidade x tipo (utils.receita)
+        self.receita = receita
+        # velocidade e data de ruptura SAE por codigo x unidade (utils.previsao_estoque)
+        self.previsao = previsao
+        # contagens fisicas x vendas ate a data de cada uma (utils.balanco_fisico)
+        self.balanco = balanco
+
+
+def _injetar_em_aberto(df_raw):
+    """Acrescenta os alunos Elo Tech com pagamento "Em aberto" (faturados, nao pagos)."""
+    if not ELOTECH_EM_ABERTO:
+        return df_raw
+    mats_existentes = set(df_raw[df_raw['tipo'] == 'Elo Tech']['matricula'].unique())
+    novos = []
+    for mat, nome, un, serie_pdf in ELOTECH_EM_ABERTO:
+        if mat not in mats_existentes:
+            novos.append({
+                'unidade': un, 'servico_codigo': '995', 'turma': '',
+                'matricula': mat, 'nome': nome, 'titulo': '', 'parcela': 'TAXA',
+                'dt_baixa': '', 'valor': '299,00', 'recebido': '0,00',
+                'segmento': 'Geral', 'serie': serie_pdf, 'tipo': 'Elo Tech',
+            })
+    if not novos:
+        return df_raw
+    return pd.concat([df_raw, pd.DataFrame(novos)], ignore_index=True)
+
+
+def resolver_elotech(df_raw, config=None):
+    """Resolve serie, segmento, turma e turno dos alunos Elo Tech em uma passada.
+
+    Prioridade da serie: PDF (ELOTECH_SERIE_PDF) -> 1a linha SAE/Socio da mesma
+    matricula/unidade -> serie da propria linha.
+    """
+    config = config or carregar_config()
+    chave = ['matricula', 'unidade']
+    df_tech = df_raw[df_raw['tipo'] == 'Elo Tech'].copy()
+    df_ref = df_raw[df_raw['tipo'].isin(['SAE', 'Socioemocional'])]
+
+    serie_pdf = config.tabelas['elotech_serie_pdf'].rename(columns={'serie': 'serie_pdf'})
+    serie_ref = df_ref.drop_duplicates(subset=chave)[chave + ['serie']]\
+        .rename(columns={'serie': 'serie_ref'})
+    turma_ref = df_ref[df_ref['turma'].str.strip() != ''].drop_duplicates(subset=chave)[chave + ['turma']]\
+        .rename(columns={'turma': 'turma_ref'})
+    ref = df_tech[chave].merge(serie_pdf, on=chave, how='left')\
+        .merge(serie_ref, on=chave, how='left')\
+        .merge(turma_ref, on=chave, how='left')\
+        .set_axis(df_tech.index)
+
+    serie_propria = df_tech['serie'].astype(object).where(df_tech['serie'] != 'Todas', 'Sem serie')
+    df_tech['serie_real'] = ref['serie_pdf'].combine_first(ref['serie_ref']).combine_first(serie_propria)
+    df_tech['segmento_real'] = df_tech['serie_real'].map(
+        {**{s: 'Fund1' for s in vendas_store.SERIES_FUND1}, **{s: 'Fund2' for s in vendas_store.SERIES_FUND2}}
+    ).fillna('Outros')
+    df_tech['turma_real'] = ref['turma_ref'].combine_first(df_tech['turma'].str.strip())
+    df_tech['turno'] = df_tech['turma_real'].str.strip().str.upper().map(TURNO_MAP).fillna('')
+    return df_tech
+
+
+def criar_tabela_estoque(df_vendas, config=None):
+    """Tabela SAE por codigo x unidade: pedido, enviado, ajuste, vendido e estoque."""
+    config = config or carregar_config()
+    base = config.tabelas['pedido_sae'].rename(columns={'pedido_complementar': 'pedido_compl'})\
+        [['codigo', 'segmento', 'serie', 'pedido_inicial', 'pedido_compl']]
+    unidades = pd.DataFrame(list(UNIDADES.items()), columns=['unidade_cod', 'unidade'])
+    df = base.merge(unidades, how='cross')
+    df['pedido_total'] = df['pedido_inicial'] + df['pedido_compl']
+
+    for coluna, tabela in (('enviado', 'estoque_enviado'), ('ajuste', 'ajuste_ano_passado')):
+        longo = config.tabelas[tabela].rename(columns={'unidade': 'unidade_cod', 'quantidade': coluna})
+        df = df.merge(longo, on=['codigo', 'unidade_cod'], how='left')
+
+    if df_vendas is not None:
+        vendas = df_vendas[['segmento', 'serie', 'unidade', 'vendido']]\
+            .drop_duplicates(subset=['segmento', 'serie', 'unidade'])\
+            .rename(columns={'unidade': 'unidade_cod'})
+        df = df.merge(vendas, on=['segmento', 'serie', 'unidade_cod'], how='left')
+    else:
+        df['vendido'] = 0
+    df[['enviado', 'ajuste', 'vendido']] = df[['enviado', 'ajuste', 'vendido']].fillna(0).astype('int64')
+    df['estoque'] = df['enviado'] - df['vendido'] + df['ajuste']
+
+    df['segmento_ordem'] = df['segmento'].map({s: i for i, s in enumerate(ORDEM_SEGMENTOS)})
+    df = df.sort_values(['segmento_ordem', 'serie', 'unidade_cod'])
+    df = df[['codigo', 'segmento', 'serie', 'unidade_cod', 'unidade', 'pedido_inicial', 'pedido_compl',
+             'pedido_total', 'enviado', 'ajuste', 'vendido', 'estoque']]
+    return df
+
+
+def versao_base():
+    """Chave de cache do pipeline: (versao dos dados de vendas, versao da configuracao)."""
+    return vendas_store.versao_dados(), versao_config()
+
+
+@st.cache_resource(max_entries=2)
+def carregar_base(versao):
+    """Pipeline completo de um snapshot, em cache por `versao` (versao_base()).
+
+    cache_resource: um objeto por processo, sem pickle a cada rerun; as paginas
+    so leem a base (nao alteram os frames). Sem ttl: versao nova = chave nova.
+
+    Returns:
+        BaseEstoque, ou None se ainda nao houver dados de vendas
+    """
+    df_raw = vendas_store.carregar_registros()
+    if df_raw is None:
+        return None
+    df_raw = vendas_store.tipar_registros(_injetar_em_aberto(df_raw))
+    ultima = vendas_store.carregar_metadados().get('ultima_atualizacao', 'N/A')
+    config = carregar_config()
+
+    vendas_sae = vendas_store.vendas_por_serie_unidade("SAE")
+    vendas_socio = vendas_store.vendas_por_serie_unidade("Socioemocional")
+    vendas_elotech = vendas_store.vendas_elotech_por_serie(config.elotech_serie_pdf, ELOTECH_EM_ABERTO)
+    estoque = criar_tabela_estoque(vendas_sae, config)
+    balanco = calcular_balanco(df_raw, estoque, config.tabelas['balanco_fisico'])
+    cubo = construir_cubo(df_raw, estoque, {
+        'SAE': vendas_sae, 'Socioemocional': vendas_socio, 'Elo Tech': vendas_elotech,
+    }, config.elotech_serie_pdf, balanco)
+
+    return BaseEstoque(df_raw, ultima, vendas_sae, vendas_socio, vendas_elotech,
+                       estoque, resolver_elotech(df_raw, config), cubo, calcular_receita(df_raw),
+                       calcular_previsao(df_raw, estoque), balanco)
+
+
+# =============================================================================
+# TABELAS DE EXIBICAO
+# =============================================================================
+
+def criar_tabela_completa(df_dados, coluna_valor, unidade_selecionada=None):
+    """Tabela com TODAS as series (linhas) x unidades (colunas) + TOTAL.
+
+    Args:
+        df_dados: tabela de estoque (coluna 'unidade' com o nome da unidade)
+        coluna_valor: 'estoque', 'enviado', 'vendido', ...
+        unidade_selecionada: nome da unidade, ou "Todas"/None para as 4
+    """
+    if unidade_selecionada and unidade_selecionada != "Todas":
+        unidades_mostrar = [unidade_selecionada]
+    else:
+        unidades_mostrar = list(UNIDADES.values())
+
+    matriz = df_dados.groupby(['segmento', 'serie', 'unidade'])[coluna_valor].sum().unstack('unidade')
+    matriz = matriz.reindex(index=pd.MultiIndex.from_tuples(ORDEM_SERIES_COMPLETA), columns=unidades_mostrar)
+    df_resultado = pd.DataFrame({'Descrição': [f"{seg} - {serie}" for seg, serie in ORDEM_SERIES_COMPLETA]})
+    for unidade_nome in unidades_mostrar:
+        df_resultado[unidade_nome] = matriz[unidade_nome].fillna(0).astype('int64').to_numpy()
+    df_resultado['TOTAL'] = df_resultado[unidades_mostrar].sum(axis=1)
+
+    totais = {'Descrição': 'TOTAL', **{col: df_resultado[col].sum() for col in unidades_mostrar + ['TOTAL']}}
+    return pd.concat([df_resultado, pd.DataFrame([totais])], ignore_index=True)
@@ -0,0 +1,83 @@
+"""Exportacao Excel sob demanda para as paginas de Estoque.
+
+As planilhas so sao geradas quando alguem pede o download. O resultado fica
+em cache por chave (versao dos dados, estado dos filtros, nome do export),
+com descarte LRU limitado a MAX_EXPORTS entradas. A escrita usa o modo
+write_only do openpyxl, que grava linha a linha sem montar a planilha
+inteira em memoria.
+"""
+
+import io
+import threading
+from collections import OrderedDict
+
+MAX_EXPORTS = 16
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def obter(chave):
+    """Retorna os bytes ja gerados para a chave (ou None)."""
+    with _lock:
+        dados = _cache.get(chave)
+        if dados is not None:
+            _cache.move_to_end(chave)
+        return dados
+
+
+def gerar(chave, abas):
+    """Gera (ou reaproveita) o Excel de uma chave.
+
+    Args:
+        chave: tupla hashable (versao dos dados, filtros, nome do export)
+        abas: dict {nome_aba: DataFrame} ou callable que retorna esse dict
+
+    Returns:
+        bytes do arquivo .xlsx
+    """
+    dados = obter(chave)
+    if dados is not None:
+        return dados
+
+    if callable(abas):
+        abas = abas()
+    dados = para_xlsx(abas)
+
+    with _lock:
+        _cache[chave] = dados
+        _cache.move_to_end(chave)
+        while len(_cache) > MAX_EXPORTS:
+            _cache.popitem(last=False)
+    return dados
+
+
+def limpar():
+    """Descarta todos os exports em cache."""
+    with _lock:
+        _cache.clear()
+
+
+def para_xlsx(abas):
+    """Escreve {nome_aba: DataFrame} em um .xlsx (openpyxl write_only)."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    wb = Workbook(write_only=True)
+    negrito = Font(bold=True)
+    for nome_aba, df in abas.items():
+        ws = wb.create_sheet(title=str(nome_aba)[:31])
+        cabecalho = []
+        for col in df.columns:
+            cell = WriteOnlyCell(ws, value=str(col))
+            cell.font = negrito
+            cabecalho.append(cell)
+        ws.append(cabecalho)
+        valores = df.astype(object).where(df.notna(), None)
+        for linha in valores.itertuples(index=False, name=None):
+            ws.append(linha)
+
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
@@ -0,0 +1,226 @@
+"""Renderizacao HTML das tabelas de impressao e das atas de entrega (Estoque).
+
+As tabelas sao montadas coluna a coluna: a classificacao de cor (neg/warn/ok)
+e feita com NumPy sobre a coluna inteira e as linhas sao emitidas com
+templates + str.join, sem iterrows nem concatenacao repetida de strings.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .dados_estoque import UNIDADES
+
+# Colunas nunca coloridas quando colunas_colorir=None (tabela_html)
+COLUNAS_TEXTO = ("Descricao", "Descrição", "Unidade")
+
+# Estilos inline por classe (tabela_html_inline, versao da pagina Estoque)
+ESTILO_INLINE = {
+    "neg": "background-color: #fecaca; color: #991b1b; font-weight: bold;",
+    "warn": "background-color: #fef3c7; color: #92400e; font-weight: bold;",
+    "ok": "background-color: #dcfce7; color: #166534;",
+    "": "",
+}
+
+_CSS_ATA = """* { margin:0; padding:0; box-sizing:border-box; }
+body { font-family:'Segoe UI',Tahoma,sans-serif; font-size:11px; color:#1e293b; padding:20px;
+  -webkit-print-color-adjust:exact !important; print-color-adjust:exact !important; }
+.header { text-align:center; border-bottom:3px solid #667eea; padding-bottom:10px; margin-bottom:15px; }
+.header h1 { font-size:16px; color:#0f172a; } .header p { font-size:11px; color:#64748b; margin-top:4px; }
+h2 { font-size:14px; color:#0f172a; margin:20px 0 4px; background:#e0e7ff; padding:6px 10px; }
+h3 { font-size:12px; color:#334155; margin:12px 0 4px; border-bottom:1px solid #e2e8f0; padding-bottom:3px; }
+table { width:100%; border-collapse:collapse; margin-bottom:8px; page-break-inside:auto; }
+th { background:#667eea !important; color:#fff !important; font-weight:600; padding:5px 8px;
+  text-align:center; font-size:10px; border:1px solid #94a3b8;
+  -webkit-print-color-adjust:exact !important; print-color-adjust:exact !important; }
+td { padding:4px 8px; text-align:center; border:1px solid #cbd5e1; font-size:10px; }
+td:nth-child(2) { text-align:left; } td:last-child { min-width:120px; }
+tr:nth-child(even) { background:#f8fafc !important; }
+.assinatura { margin-top:30px; text-align:center; page-break-inside:avoid; margin-bottom:20px; }
+.assinatura .linha { border-top:1px solid #1e293b; width:300px; margin:30px auto 4px; }
+.assinatura p { font-size:10px; color:#64748b; }
+.no-print { margin-bottom:12px; }
+@media print { .no-print { display:none !important; } tr { page-break-inside:avoid; } h2 { page-break-before:auto; } }
+"""
+
+_BOTAO_IMPRIMIR = (
+    '<button class="no-print" onclick="window.print()" style="padding:8px 20px;background:#667eea;color:#fff;border:none;border-radius:6px;cursor:pointer;font-size:12px;">Imprimir</button>'
+)
+
+_LINHA_ATA = '<tr><td>{}</td><td style="text-align:left">{}</td><td>{}</td><td></td></tr>\n'
+_LINHA_ATA_ELOTECH = (
+    '<tr><td>{}</td><td style="text-align:left">{}</td><td>{}</td><td>{}</td><td>{}</td><td></td></tr>\n'
+)
+_CABECALHO_ATA = ('<table><thead><tr><th>N</th><th>Nome do Aluno</th><th>Matricula</th>'
+                  '<th>Assinatura</th></tr></thead><tbody>\n')
+_CABECALHO_ATA_ELOTECH = ('<table><thead><tr><th>N</th><th>Nome do Aluno</th><th>Matricula</th>'
+                          '<th>Turno</th><th>Turma</th><th>Assinatura</th></tr></thead><tbody>\n')
+
+
+# =====================================================
+# CLASSIFICACAO DE CELULAS
+# =====================================================
+
+def _como_float(val):
+    """float(val) para valores nao-texto; NaN marca celula sem classe."""
+    if isinstance(val, str):
+        return np.nan, False
+    try:
+        return float(val), True
+    except (ValueError, TypeError):
+        return np.nan, False
+
+
+def classificar(coluna):
+    """Classifica uma coluna inteira: 'neg' (<0), 'warn' (<=5), 'ok' ou ''.
+
+    Texto e valores nao numericos ficam sem classe (''), como nas funcoes
+    de cor celula a celula.
+    """
+    coluna = pd.Series(coluna)
+    if pd.api.types.is_numeric_dtype(coluna):
+        valores = coluna.to_numpy(dtype=float, na_value=np.nan)
+        # pd.NA (Int64/Float64 nulaveis) nao converte com float(): sem classe, como
+        # celula a celula; NaN de float64 converte e segue as faixas
+        if isinstance(coluna.dtype, pd.api.extensions.ExtensionDtype):
+            validos = ~coluna.isna().to_numpy()
+        else:
+            validos = np.ones(len(valores), dtype=bool)
+    else:
+        pares = [_como_float(v) for v in coluna.tolist()]
+        valores = np.array([p[0] for p in pares], dtype=float)
+        validos = np.array([p[1] for p in pares], dtype=bool)
+    classes = np.select([valores < 0, valores <= 5], ["neg", "warn"], "ok").astype(object)
+    classes[~validos] = ""
+    return classes
+
+
+def _textos(coluna):
+    return [f"{v}" for v in coluna.tolist()]
+
+
+# =====================================================
+# TABELAS DE IMPRESSAO
+# =====================================================
+
+def tabela_html(df, titulo, colunas_colorir=None):
+    """Tabela com classes cell-neg/cell-warn/cell-ok (pagina Estoque SAE).
+
+    colunas_colorir=None colore todas as colunas exceto COLUNAS_TEXTO.
+    """
+    if colunas_colorir is None:
+        colorir = [c not in COLUNAS_TEXTO for c in df.columns]
+    else:
+        colorir = [bool(colunas_colorir) and c in colunas_colorir for c in df.columns]
+
+    colunas = []
+    for col, cor in zip(df.columns, colorir):
+        textos = _textos(df[col])
+        if cor:
+            classes = classificar(df[col])
+            textos = [f'<td class="cell-{c}">{t}</td>' if c else f"<td>{t}</td>"
+                      for c, t in zip(classes, textos)]
+        else:
+            textos = [f"<td>{t}</td>" for t in textos]
+        colunas.append(textos)
+
+    partes = [f"<h3>{titulo}</h3>\n" if titulo else "", "<table>\n<thead><tr>"]
+    partes.extend(f"<th>{col}</th>" for col in df.columns)
+    partes.append("</tr></thead>\n<tbody>\n")
+    partes.extend(f"<tr>{''.join(celulas)}</tr>\n" for celulas in zip(*colunas))
+    partes.append("</tbody></table>\n")
+    return "".join(partes)
+
+
+def tabela_html_inline(df, titulo, colunas_colorir=None):
+    """Tabela com estilos inline e linha TOTAL destacada (pagina Estoque)."""
+    base = "padding:6px 10px; border:1px solid #e5e7eb;"
+    colunas = []
+    for col in df.columns:
+        textos = _textos(df[col])
+        if colunas_colorir and col in colunas_colorir:
+            estilos = [f"{base} {ESTILO_INLINE[c]}" for c in classificar(df[col])]
+            textos = [f'<td style="{e}">{t}</td>' for e, t in zip(estilos, textos)]
+        else:
+            textos = [f'<td style="{base}">{t}</td>' for t in textos]
+        colunas.append(textos)
+
+    if len(df.columns):
+        total = df.iloc[:, 0].astype(str).str.strip().str.upper().eq("TOTAL").to_numpy()
+    else:
+        total = np.zeros(len(df), dtype=bool)
+    estilo_linha = np.where(total, "background:#e0e7ff; font-weight:700;", "")
+
+    partes = [
+        f'<h3 style="color:#1e293b; margin-top:25px; border-bottom:2px solid #667eea; padding-bottom:6px;">{titulo}</h3>\n',
+        '<table style="width:100%; border-collapse:collapse; font-size:12px; margin-bottom:15px;">\n',
+        '<thead><tr style="background:#f0f2f6;">',
+    ]
+    partes.extend(
+        f'<th style="padding:8px 10px; text-align:left; border:1px solid #d1d5db; font-weight:600; color:#374151;">{col}</th>'
+        for col in df.columns
+    )
+    partes.append("</tr></thead>\n<tbody>\n")
+    partes.extend(f'<tr style="{e}">{"".join(celulas)}</tr>\n' for e, celulas in zip(estilo_linha, zip(*colunas)))
+    partes.append("</tbody></table>\n")
+    return "".join(partes)
+
+
+# =====================================================
+# ATAS DE ENTREGA
+# =====================================================
+
+def _inicio_ata(titulo_pagina, titulo, total_alunos):
+    data_atual = datetime.now().strftime("%d/%m/%Y")
+    return (
+        f'<!DOCTYPE html><html lang="pt-BR"><head><meta charset="UTF-8">\n'
+        f"<title>Ata de Entrega - {titulo_pagina}</title><style>\n{_CSS_ATA}</style></head><body>\n"
+        f'<div class="header"><h1>Colegio Elo - Ata de Entrega: {titulo}</h1>\n'
+        f"<p>Data: {data_atual} | Total: {total_alunos} alunos</p></div>\n"
+        f"{_BOTAO_IMPRIMIR}\n"
+    )
+
+
+def _corpo_ata(df, col_grupo, cabecalho, linha, colunas_linha):
+    """Secoes por unidade e grupo (turma/serie), alunos ordenados por nome."""
+    df = df.sort_values(["unidade", col_grupo, "nome"], kind="stable")
+    partes = []
+    for u_cod, df_u in df.groupby("unidade", sort=False, dropna=False, observed=True):
+        u_nome = UNIDADES.get(u_cod, u_cod)
+        partes.append(f"<h2>{u_nome} ({len(df_u)} alunos)</h2>\n")
+        for grupo, df_g in df_u.groupby(col_grupo, sort=False, dropna=False, observed=True):
+            partes.append(f"<h3>{grupo} ({len(df_g)} alunos)</h3>\n")
+            partes.append(cabecalho)
+            valores = [range(1, len(df_g) + 1)] + [df_g[c].tolist() for c in colunas_linha]
+            partes.extend(linha.format(*v) for v in zip(*valores))
+            partes.append("</tbody></table>\n")
+        partes.append('<div class="assinatura"><div class="linha"></div><p>Responsavel pela Entrega - '
+                      + u_nome + "</p></div>\n")
+    return partes
+
+
+def gerar_ata_html(df_ata_src, titulo, col_serie="serie"):
+    """Gera HTML de ata de entrega agrupada por unidade e turma (serie+turma)."""
+    df = df_ata_src.copy()
+    serie = df[col_serie].astype(str)
+    turma = df["turma"].astype(str)
+    # Label de turma: "2o Ano A" ou "2o Ano" se turma vazia
+    df["_turma_label"] = np.where(turma.str.strip() != "", (serie + " " + turma).str.strip(), serie)
+    partes = [_inicio_ata(titulo, titulo, len(df))]
+    partes += _corpo_ata(df, "_turma_label", _CABECALHO_ATA, _LINHA_ATA, ["nome", "matricula"])
+    partes.append("</body></html>")
+    return "".join(partes)
+
+
+def gerar_ata_elotech_html(df_ata_src):
+    """Gera HTML de ata Elo Tech por unidade e serie, com colunas turno e turma."""
+    df = df_ata_src.copy()
+    for col in ("turno", "turma_real"):
+        if col not in df.columns:
+            df[col] = ""
+    partes = [_inicio_ata("Elo Tech", "Livros Elo Tech", len(df))]
+    partes += _corpo_ata(df, "serie_real", _CABECALHO_ATA_ELOTECH, _LINHA_ATA_ELOTECH,
+                         ["nome", "matricula", "turno", "turma_real"])
+    partes.append("</body></html>")
+    return "".join(partes)
@@ -0,0 +1,80 @@
+"""Velocidade de vendas e previsao de ruptura do estoque SAE.
+
+A venda de um livro e a primeira baixa (dt_baixa) do aluno na serie/unidade,
+o mesmo criterio de "alunos unicos" do vendido. A velocidade e a media diaria
+de vendas numa janela recente, medida ate a ultima baixa registrada (data de
+referencia dos dados). Com o estoque atual de criar_tabela_estoque projeta
+em quantos dias e em que data o codigo zera em cada unidade.
+
+Tudo vetorizado sobre codigo x unidade e montado em
+estoque_engine.carregar_base (cache por versao dos dados).
+"""
+
+import numpy as np
+import pandas as pd
+
+JANELA_DIAS = 28
+PRAZO_REPOSICAO_DIAS = 21
+# Acima disso o alerta "Estoque Baixo" ainda nao disparou
+LIMITE_ESTOQUE_BAIXO = 5
+
+
+def calcular_previsao(df_raw, df_estoque, janela_dias=JANELA_DIAS, prazo_dias=PRAZO_REPOSICAO_DIAS):
+    """Previsao de ruptura por codigo x unidade.
+
+    Args:
+        df_raw: registros tipados (dt_baixa datetime)
+        df_estoque: saida de criar_tabela_estoque
+        janela_dias: janela (dias) da velocidade de vendas
+        prazo_dias: prazo de reposicao; ruptura dentro dele pede reposicao
+
+    Returns:
+        DataFrame na ordem de df_estoque com [codigo, segmento, serie,
+        unidade_cod, unidade, estoque, vendas_janela, velocidade,
+        dias_restantes, data_ruptura, repor, antecipar]
+    """
+    chave = ['segmento', 'serie', 'unidade_cod']
+    sae = df_raw[(df_raw['tipo'] == 'SAE') & df_raw['dt_baixa'].notna()]
+    vendas = sae.groupby(['segmento', 'serie', 'unidade', 'matricula'], observed=True)['dt_baixa'].min()\
+        .reset_index().rename(columns={'unidade': 'unidade_cod'})
+
+    referencia = sae['dt_baixa'].max().normalize() if not sae.empty else pd.Timestamp.now().normalize()
+    inicio = referencia - pd.Timedelta(days=janela_dias - 1)
+    recentes = vendas[vendas['dt_baixa'] >= inicio]
+    na_janela = recentes.groupby(chave, observed=True).size().rename('vendas_janela').reset_index()
+    na_janela[chave] = na_janela[chave].astype(object)
+
+    df = df_estoque[['codigo'] + chave + ['unidade', 'estoque']]\
+        .merge(na_janela, on=chave, how='left').set_axis(df_estoque.index)
+    df['vendas_janela'] = df['vendas_janela'].fillna(0).astype('int64')
+    df['velocidade'] = df['vendas_janela'] / janela_dias
+
+    estoque = df['estoque'].to_numpy(dtype=float)
+    velocidade = df['velocidade'].to_numpy()
+    dias = np.divide(estoque, velocidade, out=np.full_like(estoque, np.inf), where=velocidade > 0)
+    dias = np.where(estoque <= 0, 0.0, dias)
+    df['dias_restantes'] = dias
+    finitos = np.isfinite(dias)
+    df['data_ruptura'] = pd.NaT
+    df.loc[finitos, 'data_ruptura'] = referencia + pd.to_timedelta(np.ceil(dias[finitos]), unit='D')
+    df['data_ruptura'] = pd.to_datetime(df['data_ruptura'])
+    # Sem vendas na janela nao ha ruptura a prever (negativos ja tem alerta proprio)
+    df['repor'] = (velocidade > 0) & (dias <= prazo_dias)
+    # Reposicao antes dos alertas de estoque baixo/critico
+    df['antecipar'] = df['repor'] & (df['estoque'] > LIMITE_ESTOQUE_BAIXO)
+    df.attrs['referencia'] = referencia
+    return df
+
+
+def tabela_reposicao(previsao):
+    """Linhas `antecipar` formatadas para exibicao, da ruptura mais proxima a mais distante."""
+    df = previsao[previsao['antecipar']].sort_values('dias_restantes')
+    return pd.DataFrame({
+        'Segmento': df['segmento'],
+        'Serie': df['serie'],
+        'Unidade': df['unidade'],
+        'Estoque': df['estoque'],
+        'Vendas/dia': df['velocidade'].round(1),
+        'Dias': df['dias_restantes'].round().astype('int64'),
+        'Ruptura': df['data_ruptura'].dt.strftime('%d/%m/%Y'),
+    })
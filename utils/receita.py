@@ -0,0 +1,83 @@
+"""Receita dos recebimentos (SAE, Socioemocional, Elo Tech).
+
+Trabalha sobre o DataFrame tipado (vendas_store.tipar_registros): valores em
+centavos inteiros e dt_baixa como data. Os registros sao reduzidos uma vez a
+uma tabela longa dia x unidade x tipo; as visoes (por dia, semana, curva
+acumulada, ticket medio) saem dessa tabela pequena, sem voltar as parcelas.
+O objeto e montado dentro de estoque_engine.carregar_base, entao fica em
+cache por versao dos dados.
+"""
+
+TIPOS = ["SAE", "Socioemocional", "Elo Tech"]
+
+
+def formatar_reais(valor):
+    """1234.5 -> 'R$ 1.234,50'."""
+    return "R$ " + f"{valor:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+class Receita:
+    """Recebimentos agregados por dia x unidade x tipo."""
+
+    def __init__(self, diario, alunos):
+        # [dia, unidade, tipo, centavos, titulos] - so parcelas com baixa e recebido > 0
+        self.diario = diario
+        # [unidade, tipo, alunos] - alunos pagantes distintos
+        self.alunos = alunos
+
+    def _filtrar(self, tabela, unidade):
+        return tabela if not unidade else tabela[tabela['unidade'] == unidade]
+
+    def por_dia(self, unidade=None):
+        """Receita (R$) por dia x tipo, com os dias sem baixa zerados."""
+        d = self._filtrar(self.diario, unidade)
+        tabela = d.pivot_table(index='dia', columns='tipo', values='centavos', aggfunc='sum', observed=True)
+        tabela = tabela.reindex(columns=TIPOS).fillna(0)
+        if not tabela.empty:
+            tabela = tabela.asfreq('D', fill_value=0)
+        return tabela / 100
+
+    def por_semana(self, unidade=None):
+        """Receita (R$) por semana (segunda a domingo, rotulo = segunda) x tipo."""
+        return self.por_dia(unidade).resample('W-MON', label='left', closed='left').sum()
+
+    def acumulado(self, unidade=None):
+        """Curva acumulada (R$) por tipo + coluna Total."""
+        curva = self.por_dia(unidade).cumsum()
+        curva['Total'] = curva.sum(axis=1)
+        return curva
+
+    def por_unidade_tipo(self):
+        """Receita (R$) unidade x tipo, com TOTAL."""
+        tabela = self.diario.pivot_table(index='unidade', columns='tipo', values='centavos',
+                                         aggfunc='sum', observed=True)
+        tabela = tabela.reindex(columns=TIPOS).fillna(0) / 100
+        tabela['TOTAL'] = tabela.sum(axis=1)
+        return tabela
+
+    def ticket_medio(self, unidade=None):
+        """Receita, titulos pagos, alunos pagantes e ticket medio (R$/aluno) por tipo."""
+        d = self._filtrar(self.diario, unidade).groupby('tipo', observed=True)[['centavos', 'titulos']].sum()
+        alunos = self._filtrar(self.alunos, unidade).groupby('tipo', observed=True)['alunos'].sum()
+        tabela = d.join(alunos, how='outer').reindex(TIPOS).fillna(0)
+        tabela['receita'] = tabela['centavos'] / 100
+        tabela['ticket_medio'] = (tabela['receita'] / tabela['alunos'].where(tabela['alunos'] > 0)).fillna(0)
+        return tabela[['receita', 'titulos', 'alunos', 'ticket_medio']].astype(
+            {'titulos': 'int64', 'alunos': 'int64'})
+
+    def total(self, unidade=None):
+        """Receita total (R$)."""
+        return self._filtrar(self.diario, unidade)['centavos'].sum() / 100
+
+
+def calcular_receita(df):
+    """Monta a Receita a partir dos registros tipados (com recebido_centavos/dt_baixa)."""
+    pagos = df[df['dt_baixa'].notna() & (df['recebido_centavos'].fillna(0) > 0)]
+    diario = pagos.groupby([pagos['dt_baixa'].dt.normalize().rename('dia'), 'unidade', 'tipo'], observed=True)\
+        .agg(centavos=('recebido_centavos', 'sum'), titulos=('recebido_centavos', 'size'))\
+        .reset_index()
+    diario['centavos'] = diario['centavos'].astype('int64')
+    # Aluno conta uma vez por unidade/tipo, mesmo pagando varias parcelas
+    alunos = pagos.groupby(['unidade', 'tipo'], observed=True)['matricula'].nunique()\
+        .rename('alunos').reset_index()
+    return Receita(diario, alunos)
@@ -0,0 +1,190 @@
+"""Retencao e compactacao dos bancos de snapshots de vagas.
+
+Os bancos crescem uma extracao por execucao agendada e nada era podado.
+Politica, relativa ao momento da compactacao:
+
+- ultimos MANTER_TODAS_DIAS dias: todas as extracoes
+- ate MANTER_DIARIAS_DIAS dias: a ultima extracao de cada dia
+- mais antigas: a ultima extracao de cada semana (ISO)
+
+A extracao mais recente e a publicada (auditor.extracao_publicada) nunca
+saem. Depois da poda, extracoes com conteudo identico ao da anterior perdem
+as linhas proprias e viram referencia (utils.snapshots); no fim, ANALYZE e
+VACUUM. O agendador roda compactar_todos() uma vez por dia.
+
+Uso standalone:
+    python -m utils.retencao                    # compacta BANCOS
+    python -m utils.retencao --simular          # so mostra o que faria
+    python -m utils.retencao --db integral.db   # um banco so
+"""
+
+import hashlib
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from .auditor import extracao_publicada
+from .snapshots import abrir_escrita, colunas_vagas, conectar, fonte_vagas, garantir_referencias, tem_referencias
+
+OUTPUT_DIR = Path(__file__).parent.parent / "output"
+
+BANCOS = ("vagas.db", "integral.db")
+MANTER_TODAS_DIAS = 7
+MANTER_DIARIAS_DIAS = 60
+
+
+def selecionar_remocao(extracoes, agora, protegidas=()):
+    """Ids de extracao que a politica de retencao descarta.
+
+    Args:
+        extracoes: DataFrame [id, data_extracao (ISO)]
+        agora: referencia das idades
+        protegidas: ids que ficam de qualquer jeito
+
+    Returns:
+        set de ids a remover (extracoes sem data valida sempre ficam)
+    """
+    data = pd.to_datetime(extracoes["data_extracao"], format="ISO8601", errors="coerce")
+    idade = agora - data
+    diaria = (idade > timedelta(days=MANTER_TODAS_DIAS)) & (idade <= timedelta(days=MANTER_DIARIAS_DIAS))
+    semanal = idade > timedelta(days=MANTER_DIARIAS_DIAS)
+
+    ids = extracoes["id"]
+    # representante de cada dia/semana: a ultima extracao (maior id)
+    manter = set(ids[~(diaria | semanal)])
+    manter |= set(ids[diaria].groupby(data[diaria].dt.normalize()).max())
+    manter |= set(ids[semanal].groupby(data[semanal].dt.to_period("W")).max())
+    manter |= set(protegidas)
+    if len(ids):
+        manter.add(ids.max())
+    return set(ids) - manter
+
+
+def _impressoes(conn):
+    """{extracao_id: hash do conteudo} com referencias resolvidas.
+
+    Cada linha vira um hash das colunas de dados (sem id/extracao_id); a
+    impressao da extracao e o sha1 dos hashes ordenados, entao a ordem de
+    insercao das turmas nao importa.
+    """
+    dados = [c for c in colunas_vagas(conn) if c not in ("id", "extracao_id")]
+    df = pd.read_sql_query(f"SELECT extracao_id, {', '.join(dados)} FROM {fonte_vagas(conn)}", conn)
+    if df.empty:
+        return {}
+    df["_h"] = pd.util.hash_pandas_object(df[dados], index=False).to_numpy()
+    df = df.sort_values(["extracao_id", "_h"])
+    return {
+        ext_id: hashlib.sha1(grupo.to_numpy().tobytes()).hexdigest()
+        for ext_id, grupo in df.groupby("extracao_id")["_h"]
+    }
+
+
+def _remover(conn, remover):
+    """Apaga extracoes; dados ainda referenciados passam para a primeira referencia mantida."""
+    referencias = dict(conn.execute("SELECT extracao_id, dados_de FROM referencias").fetchall()) \
+        if tem_referencias(conn) else {}
+    for ext_id in sorted(remover):
+        herdeiras = sorted(r for r, d in referencias.items() if d == ext_id and r not in remover)
+        if ext_id in referencias or not herdeiras:
+            continue
+        nova = herdeiras[0]
+        conn.execute("UPDATE vagas SET extracao_id = ? WHERE extracao_id = ?", (nova, ext_id))
+        conn.execute("DELETE FROM referencias WHERE extracao_id = ?", (nova,))
+        conn.execute("UPDATE referencias SET dados_de = ? WHERE dados_de = ?", (nova, ext_id))
+        del referencias[nova]
+        referencias.update({r: nova for r, d in referencias.items() if d == ext_id})
+
+    params = [(ext_id,) for ext_id in remover]
+    conn.executemany("DELETE FROM vagas WHERE extracao_id = ?", params)
+    if referencias:
+        conn.executemany("DELETE FROM referencias WHERE extracao_id = ?", params)
+    conn.executemany("DELETE FROM extrações WHERE id = ?", params)
+
+
+def _iguais_a_anterior(impressoes, ids):
+    """[(extracao_id, anterior)] das extracoes com o mesmo conteudo da anterior em `ids`."""
+    return [
+        (ext_id, anterior) for anterior, ext_id in zip(ids, ids[1:])
+        if impressoes.get(ext_id) is not None and impressoes[ext_id] == impressoes.get(anterior)
+    ]
+
+
+def _deduplicar(conn):
+    """Extracoes iguais a anterior viram referencia. Returns: numero de extracoes convertidas."""
+    impressoes = _impressoes(conn)
+    garantir_referencias(conn)
+    referencias = dict(conn.execute("SELECT extracao_id, dados_de FROM referencias").fetchall())
+    ids = [row[0] for row in conn.execute("SELECT id FROM extrações ORDER BY id")]
+    convertidas = 0
+    for ext_id, anterior in _iguais_a_anterior(impressoes, ids):
+        if ext_id in referencias:
+            continue
+        dados = referencias.get(anterior, anterior)
+        conn.execute("DELETE FROM vagas WHERE extracao_id = ?", (ext_id,))
+        conn.execute("INSERT INTO referencias VALUES (?, ?)", (ext_id, dados))
+        # quem apontava para ext_id passa a apontar para os mesmos dados
+        conn.execute("UPDATE referencias SET dados_de = ? WHERE dados_de = ?", (dados, ext_id))
+        referencias = {r: dados if d == ext_id else d for r, d in referencias.items()}
+        referencias[ext_id] = dados
+        convertidas += 1
+    return convertidas
+
+
+def compactar(db_path: Path, agora=None, simular=False) -> dict:
+    """Aplica a retencao, deduplica e compacta um banco de snapshots.
+
+    Returns:
+        {"extracoes", "removidas", "referencias", "bytes_antes", "bytes_depois"}
+    """
+    agora = agora or datetime.now()
+    bytes_antes = db_path.stat().st_size
+    # a simulacao nao pode mexer no arquivo (abrir_escrita poe em WAL e cria o indice)
+    conn = conectar(db_path) if simular else abrir_escrita(db_path)
+    try:
+        extracoes = pd.read_sql_query("SELECT id, data_extracao FROM extrações ORDER BY id", conn)
+        protegidas = {extracao_publicada(db_path.name)} - {None}
+        remover = selecionar_remocao(extracoes, agora, protegidas)
+        resumo = {"extracoes": len(extracoes), "removidas": len(remover), "referencias": 0}
+        if simular:
+            ja = set(dict(conn.execute("SELECT extracao_id, dados_de FROM referencias").fetchall())) \
+                if tem_referencias(conn) else set()
+            restantes = [i for i in extracoes["id"] if i not in remover]
+            resumo["referencias"] = sum(1 for ext_id, _ in _iguais_a_anterior(_impressoes(conn), restantes)
+                                        if ext_id not in ja)
+            return {**resumo, "bytes_antes": bytes_antes, "bytes_depois": bytes_antes}
+
+        with conn:
+            _remover(conn, remover)
+            resumo["referencias"] = _deduplicar(conn)
+        conn.execute("ANALYZE")
+        conn.commit()
+        conn.execute("VACUUM")
+        # em WAL o VACUUM vai para o -wal: devolve ao arquivo principal e zera o -wal
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    return {**resumo, "bytes_antes": bytes_antes, "bytes_depois": db_path.stat().st_size}
+
+
+def compactar_todos(simular=False) -> dict:
+    """compactar() em cada banco de BANCOS que existir: {db_name: resumo}."""
+    return {
+        db_name: compactar(OUTPUT_DIR / db_name, simular=simular)
+        for db_name in BANCOS
+        if (OUTPUT_DIR / db_name).exists()
+    }
+
+
+if __name__ == "__main__":
+    simular = "--simular" in sys.argv
+    if "--db" in sys.argv:
+        db_name = sys.argv[sys.argv.index("--db") + 1]
+        resumos = {db_name: compactar(OUTPUT_DIR / db_name, simular=simular)}
+    else:
+        resumos = compactar_todos(simular=simular)
+    for db_name, r in resumos.items():
+        print(f"{db_name}: {r['extracoes']} extracoes, {r['removidas']} removidas, "
+              f"{r['referencias']} viraram referencia, {r['bytes_antes'] // 1024} KB -> {r['bytes_depois'] // 1024} KB"
+              + (" (simulacao)" if simular else ""))
@@ -0,0 +1,241 @@
+"""Agendador da extracao de recebimentos (Estoque SAE).
+
+Roda as extracoes do SIGA nos HORARIOS_ATUALIZACAO fora do Streamlit, para que
+nenhum carregamento de pagina pague a latencia da extracao das 4 unidades.
+Cada execucao grava o snapshot de forma atomica (utils.vendas_store) e
+registra metadados (inicio, fim, duracao, status, total de registros).
+Depois da ultima extracao do dia compacta os bancos de vagas (utils.retencao).
+
+Credenciais: variaveis SIGA_INSTITUICAO, SIGA_LOGIN e SIGA_SENHA ou a secao
+[siga] de .streamlit/secrets.toml.
+
+Uso standalone:
+    python -m utils.scheduler            # roda continuamente nos horarios
+    python -m utils.scheduler --agora    # executa uma extracao e sai
+    python -m utils.scheduler --status   # mostra as ultimas execucoes
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from . import retencao, vendas_store
+
+BASE_DIR = Path(__file__).parent.parent
+OUTPUT_DIR = BASE_DIR / "output"
+LOG_EXECUCOES = OUTPUT_DIR / "scheduler_execucoes.json"
+SECRETS_PATH = BASE_DIR / ".streamlit" / "secrets.toml"
+
+HORARIOS_ATUALIZACAO = [7, 9, 12, 14, 17, 19]
+DATA_INICIAL = "01/08/2025"
+MAX_EXECUCOES_LOG = 200
+
+
+def salvar_json_atomico(path, dados, **dump_kwargs):
+    """Grava JSON em arquivo temporario no mesmo diretorio e faz rename atomico.
+
+    Leitores concorrentes veem o arquivo antigo ou o novo, nunca um arquivo
+    pela metade.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, vendas_store.MODO_ARQUIVO)  # mkstemp cria 0600
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def salvar_recebimento(registros, agora=None):
+    """Grava o snapshot de recebimentos (atomico) no formato lido pelas paginas."""
+    agora = agora or datetime.now()
+    metadados = {
+        "data_extracao": agora.isoformat(),
+        "ultima_atualizacao": agora.strftime("%d/%m/%Y %H:%M:%S"),
+        "periodo": {
+            "data_inicial": DATA_INICIAL,
+            "data_final": agora.strftime("%d/%m/%Y"),
+        },
+        "total_registros": len(registros),
+    }
+    vendas_store.salvar_registros(registros, metadados)
+    return agora
+
+
+def carregar_credenciais():
+    """Retorna dict {instituicao, login, senha} ou None se nao configurado."""
+    env = {
+        "instituicao": os.environ.get("SIGA_INSTITUICAO"),
+        "login": os.environ.get("SIGA_LOGIN"),
+        "senha": os.environ.get("SIGA_SENHA"),
+    }
+    if all(env.values()):
+        return env
+
+    if SECRETS_PATH.exists():
+        import tomllib
+        with open(SECRETS_PATH, "rb") as f:
+            siga = tomllib.load(f).get("siga", {})
+        if all(siga.get(k) for k in ("instituicao", "login", "senha")):
+            return {k: siga[k] for k in ("instituicao", "login", "senha")}
+    return None
+
+
+def _ultimo_horario_passado(agora):
+    """Retorna o datetime do ultimo horario programado ja atingido hoje (ou None)."""
+    passados = [h for h in HORARIOS_ATUALIZACAO if h <= agora.hour]
+    if not passados:
+        return None
+    return agora.replace(hour=max(passados), minute=0, second=0, microsecond=0)
+
+
+def proximo_horario(agora=None):
+    """Retorna o datetime do proximo horario programado estritamente apos agora."""
+    agora = agora or datetime.now()
+    for h in sorted(HORARIOS_ATUALIZACAO):
+        candidato = agora.replace(hour=h, minute=0, second=0, microsecond=0)
+        if candidato > agora:
+            return candidato
+    amanha = agora + timedelta(days=1)
+    return amanha.replace(hour=min(HORARIOS_ATUALIZACAO), minute=0, second=0, microsecond=0)
+
+
+def precisa_atualizar(agora=None):
+    """Verifica se dados estao defasados em relacao ao horario programado."""
+    mtime = vendas_store.data_modificacao()
+    if mtime is None:
+        return True
+    agora = agora or datetime.now()
+    limite = _ultimo_horario_passado(agora)
+    if limite is None:
+        return False
+    return mtime < limite
+
+
+def _registrar_execucao(execucao):
+    """Acrescenta metadados de uma execucao ao log (mantem as ultimas N)."""
+    execucoes = ler_execucoes()
+    execucoes.append(execucao)
+    salvar_json_atomico(LOG_EXECUCOES, execucoes[-MAX_EXECUCOES_LOG:], indent=2)
+
+
+def ler_execucoes():
+    """Retorna lista de execucoes registradas (mais antiga primeiro)."""
+    if not LOG_EXECUCOES.exists():
+        return []
+    try:
+        with open(LOG_EXECUCOES, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def ultima_execucao(origem=None):
+    """Retorna metadados da ultima execucao (so de `origem`, se dada) ou None."""
+    execucoes = [e for e in ler_execucoes() if origem is None or e.get("origem") == origem]
+    return execucoes[-1] if execucoes else None
+
+
+def executar_extracao(credenciais=None, origem="scheduler", progress_cb=None):
+    """Extrai recebimentos via API SIGA, grava o snapshot e registra a execucao.
+
+    Returns:
+        dict com metadados da execucao (status: ok | erro | sem_credenciais)
+    """
+    from .siga_api import atualizar_via_api
+
+    inicio = datetime.now()
+    execucao = {
+        "inicio": inicio.isoformat(timespec="seconds"),
+        "origem": origem,
+        "status": "ok",
+        "total_registros": 0,
+        "erro": None,
+    }
+
+    credenciais = credenciais or carregar_credenciais()
+    if not credenciais:
+        execucao["status"] = "sem_credenciais"
+        execucao["erro"] = "Credenciais SIGA nao configuradas"
+    else:
+        try:
+            registros, erro = atualizar_via_api(
+                credenciais["instituicao"], credenciais["login"], credenciais["senha"],
+                progress_cb=progress_cb,
+            )
+        except Exception as e:
+            registros, erro = [], str(e)
+        if erro:
+            execucao["status"] = "erro"
+            execucao["erro"] = erro
+        else:
+            salvar_recebimento(registros, datetime.now())
+            execucao["total_registros"] = len(registros)
+
+    fim = datetime.now()
+    execucao["fim"] = fim.isoformat(timespec="seconds")
+    execucao["duracao_s"] = round((fim - inicio).total_seconds(), 1)
+    _registrar_execucao(execucao)
+    return execucao
+
+
+def _log(msg):
+    print(f"[{datetime.now().strftime('%d/%m/%Y %H:%M:%S')}] {msg}", flush=True)
+
+
+def compactar_snapshots():
+    """Retencao/compactacao diaria dos bancos de vagas (utils.retencao), apos a ultima extracao do dia."""
+    try:
+        for db_name, r in retencao.compactar_todos().items():
+            _log(f"Compactacao {db_name}: {r['removidas']} removidas, {r['referencias']} referencias, "
+                 f"{r['bytes_antes'] // 1024} KB -> {r['bytes_depois'] // 1024} KB")
+    except Exception as e:
+        _log(f"Compactacao falhou: {e}")
+
+
+def rodar_agendado():
+    """Loop principal: recupera horario perdido e depois dorme ate o proximo."""
+    _log(f"Agendador iniciado. Horarios: {HORARIOS_ATUALIZACAO}")
+    if precisa_atualizar():
+        _log("Dados defasados, executando extracao de recuperacao...")
+        ex = executar_extracao(progress_cb=_log)
+        _log(f"Extracao {ex['status']}: {ex['total_registros']} registros em {ex['duracao_s']}s")
+
+    while True:
+        alvo = proximo_horario()
+        _log(f"Proxima extracao: {alvo.strftime('%d/%m/%Y %H:%M')}")
+        while (restante := (alvo - datetime.now()).total_seconds()) > 0:
+            time.sleep(min(restante, 300))
+        ex = executar_extracao(progress_cb=_log)
+        _log(f"Extracao {ex['status']}: {ex['total_registros']} registros em {ex['duracao_s']}s"
+             + (f" ({ex['erro']})" if ex["erro"] else ""))
+        if alvo.hour == max(HORARIOS_ATUALIZACAO):
+            compactar_snapshots()
+
+
+if __name__ == "__main__":
+    if "--status" in sys.argv:
+        for ex in ler_execucoes()[-10:]:
+            print(f"{ex['inicio']}  {ex['origem']:<9} {ex['status']:<15} "
+                  f"{ex['total_registros']:>6} registros  {ex.get('duracao_s', 0):>6}s"
+                  + (f"  {ex['erro']}" if ex.get("erro") else ""))
+        sys.exit(0)
+    if "--agora" in sys.argv:
+        ex = executar_extracao(progress_cb=_log)
+        print(json.dumps(ex, ensure_ascii=False, indent=2))
+        sys.exit(0 if ex["status"] == "ok" else 1)
+    try:
+        rodar_agendado()
+    except KeyboardInterrupt:
+        _log("Agendador encerrado.")
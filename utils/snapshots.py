@@ -0,0 +1,390 @@
+"""Snapshots dos bancos de vagas (vagas.db, integral.db, ...).
+
+Cada extracao e uma linha em extrações e suas turmas ficam em vagas. Uma
+extracao pode, em vez de linhas proprias, apontar para os dados de outra de
+conteudo identico (tabela referencias: extracao_id -> dados_de, sempre uma
+extracao com linhas proprias, sem cadeias). Os leitores resolvem isso por aqui:
+
+- dados_de(conn, id): extracao cujas linhas respondem por `id` (consultas de
+  uma extracao so: WHERE extracao_id = ?)
+- fonte_vagas(conn): tabela vagas com as referencias expandidas, para
+  consultas sobre varias extracoes (FROM {fonte} WHERE extracao_id ...)
+
+Bancos sem a tabela referencias (nunca compactados) sao lidos como antes.
+
+Escrita: gravar_extracao() e o caminho que os extratores (scripts fora deste
+repositorio) devem usar para gravar um snapshot novo.
+O conteudo normalizado e comparado (impressao_conteudo) com o da ultima
+extracao; igual, a extracao nova so ganha a linha em extrações e uma
+referencia para os dados existentes, sem linhas novas em vagas. Como
+dados_de() continua devolvendo o mesmo id, os caches do dashboard, chaveados
+por ele (database.versao_dados), seguem validos.
+
+Conexoes: todo mundo abre os bancos por conectar() (busy timeout de
+BUSY_TIMEOUT s); quem escreve usa abrir_escrita(), que inicializa o banco:
+schema, indice por extracao e journal_mode=WAL. Em WAL o extrator grava o
+snapshot novo numa transacao so enquanto os leitores do dashboard continuam
+lendo o anterior, sem esperar nem "database is locked".
+
+Uso standalone:
+    python -m utils.snapshots --inicializar            # WAL + indice nos bancos de output/
+    python -m utils.snapshots --estresse [vagas.db]    # leitores x escritor, WAL vs delete
+"""
+
+import hashlib
+import multiprocessing
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+OUTPUT_DIR = Path(__file__).parent.parent / "output"
+
+BANCOS = ("vagas.db", "integral.db", "vagas_2025.db", "integral_2025.db")
+# Segundos que uma conexao espera por um lock antes de "database is locked"
+BUSY_TIMEOUT = 30.0
+
+# Schema dos bancos de vagas; integral.db guarda o segmento na coluna tipo
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS extrações (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        data_extracao TEXT,
+        periodo TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS vagas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        extracao_id INTEGER,
+        unidade_codigo TEXT,
+        unidade_nome TEXT,
+        {segmento} TEXT,
+        curso TEXT,
+        turma TEXT,
+        vagas INTEGER,
+        novatos INTEGER,
+        veteranos INTEGER,
+        matriculados INTEGER,
+        vagas_restantes INTEGER,
+        pre_matriculados INTEGER,
+        disponiveis INTEGER,
+        FOREIGN KEY (extracao_id) REFERENCES extrações(id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_vagas_extracao ON vagas (extracao_id)",
+)
+
+_SCHEMA_REFERENCIAS = """
+    CREATE TABLE IF NOT EXISTS referencias (
+        extracao_id INTEGER PRIMARY KEY,
+        dados_de INTEGER NOT NULL
+    )
+"""
+
+
+def conectar(db_path, **kwargs):
+    """Conexao com um banco de vagas, esperando ate BUSY_TIMEOUT por locks."""
+    return sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, **kwargs)
+
+
+def inicializar(conn, segmento="segmento"):
+    """Schema, indice por extracao e WAL (fora de transacao; o modo fica gravado no arquivo).
+
+    Args:
+        segmento: nome da coluna de segmento se a tabela vagas ainda nao existir
+    """
+    conn.execute("PRAGMA journal_mode = WAL")
+    # em WAL, NORMAL so arrisca a ultima transacao numa queda de energia, nunca corrompe
+    conn.execute("PRAGMA synchronous = NORMAL")
+    for ddl in _SCHEMA:
+        conn.execute(ddl.format(segmento=segmento))
+    conn.commit()
+
+
+def abrir_escrita(db_path, segmento="segmento"):
+    """Conexao de quem escreve no banco (extrator, retencao), ja inicializado."""
+    conn = conectar(db_path)
+    inicializar(conn, segmento)
+    return conn
+
+
+def tem_referencias(conn):
+    """True se o banco ja tem a tabela referencias."""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'referencias'"
+    ).fetchone() is not None
+
+
+def garantir_referencias(conn):
+    """Cria a tabela referencias (so quem escreve no banco; nao fecha a transacao aberta)."""
+    conn.execute(_SCHEMA_REFERENCIAS)
+
+
+def dados_de(conn, extracao_id):
+    """Extracao cujas linhas em vagas valem para `extracao_id`."""
+    if extracao_id is None or not tem_referencias(conn):
+        return extracao_id
+    row = conn.execute("SELECT dados_de FROM referencias WHERE extracao_id = ?", (extracao_id,)).fetchone()
+    return row[0] if row else extracao_id
+
+
+def colunas_vagas(conn):
+    """Colunas da tabela vagas, na ordem do banco."""
+    return [row[1] for row in conn.execute("PRAGMA table_info(vagas)")]
+
+
+def fonte_vagas(conn):
+    """FROM para vagas de varias extracoes: as linhas proprias mais as das referencias,
+    com extracao_id trocado pela extracao que aponta."""
+    if not tem_referencias(conn):
+        return "vagas"
+    colunas = ", ".join("r.extracao_id" if c == "extracao_id" else f"v.{c}" for c in colunas_vagas(conn))
+    return f"""(
+        SELECT * FROM vagas
+        UNION ALL
+        SELECT {colunas} FROM referencias r JOIN vagas v ON v.extracao_id = r.dados_de
+    )"""
+
+
+def _normalizar(turma, tipos):
+    """Linha de vagas na ordem de `tipos` ({coluna: tipo declarado}): INTEGER vira int, o resto str."""
+    linha = []
+    for coluna, tipo in tipos.items():
+        valor = turma.get(coluna)
+        if valor is not None:
+            valor = int(valor) if "INT" in tipo else str(valor)
+        linha.append(valor)
+    return tuple(linha)
+
+
+def impressao_conteudo(linhas):
+    """sha1 de um snapshot (tuplas normalizadas), independente da ordem das turmas."""
+    return hashlib.sha1("\n".join(sorted(map(repr, linhas))).encode()).hexdigest()
+
+
+def _gravar(conn, turmas, periodo, data_extracao):
+    """Corpo de gravar_extracao numa conexao ja aberta."""
+    tipos = {row[1]: row[2].upper() for row in conn.execute("PRAGMA table_info(vagas)")
+             if row[1] not in ("id", "extracao_id")}
+    linhas = [_normalizar(t, tipos) for t in turmas]
+    with conn:
+        # BEGIN IMMEDIATE: a ultima extracao nao muda entre a comparacao e o insert
+        conn.execute("BEGIN IMMEDIATE")
+        ultima = dados_de(conn, conn.execute("SELECT MAX(id) FROM extrações").fetchone()[0])
+        igual = ultima is not None and impressao_conteudo(linhas) == impressao_conteudo(
+            conn.execute(f"SELECT {', '.join(tipos)} FROM vagas WHERE extracao_id = ?", (ultima,)).fetchall()
+        )
+        extracao_id = conn.execute(
+            "INSERT INTO extrações (data_extracao, periodo) VALUES (?, ?)", (data_extracao, periodo)
+        ).lastrowid
+        if igual:
+            garantir_referencias(conn)
+            conn.execute("INSERT INTO referencias VALUES (?, ?)", (extracao_id, ultima))
+            return extracao_id, ultima
+        # todas as turmas num executemany, na mesma transacao do extrações
+        marcadores = ", ".join("?" * (len(tipos) + 1))
+        conn.executemany(
+            f"INSERT INTO vagas (extracao_id, {', '.join(tipos)}) VALUES ({marcadores})",
+            [(extracao_id,) + linha for linha in linhas],
+        )
+        return extracao_id, extracao_id
+
+
+def gravar_extracao(db_path, turmas, periodo, data_extracao=None, segmento="segmento"):
+    """Grava uma extracao nova em `db_path`, reaproveitando os dados se nada mudou.
+
+    Args:
+        db_path: banco de vagas (vagas.db, integral.db, ...)
+        turmas: dicts com as colunas de vagas (unidade_codigo, turma, matriculados, ...)
+        periodo: periodo letivo da extracao ("2026")
+        data_extracao: ISO; padrao agora
+        segmento: coluna de segmento num banco novo ("tipo" no integral)
+
+    Returns:
+        (extracao_id, dados): dados == extracao_id quando as linhas foram
+        gravadas; senao, a extracao cujas linhas foram reaproveitadas
+    """
+    conn = abrir_escrita(db_path, segmento)
+    try:
+        return _gravar(conn, turmas, periodo, data_extracao or datetime.now().isoformat())
+    finally:
+        conn.close()
+
+
+# ==========================================================
+# ESTRESSE: leitores do dashboard x extrator
+# ==========================================================
+
+def _ler_como_dashboard(conn):
+    """Leitura tipica do dashboard: extracao mais recente, resolvida, e todas as turmas dela.
+
+    Returns:
+        (extracao_id, linhas lidas)
+    """
+    ultima = conn.execute("SELECT MAX(id) FROM extrações").fetchone()[0]
+    linhas = conn.execute(
+        "SELECT unidade_codigo, turma, matriculados FROM vagas WHERE extracao_id = ?", (dados_de(conn, ultima),)
+    ).fetchall()
+    return ultima, len(linhas)
+
+
+def _bloqueio(erro):
+    """True se o OperationalError e lock/busy (vale refazer); o resto e erro de verdade."""
+    mensagem = str(erro).lower()
+    return "locked" in mensagem or "busy" in mensagem
+
+
+def _leitor(db_path, fim):
+    """Processo leitor: le como o dashboard ate `fim` (time.time()).
+
+    Sem busy timeout: a leitura que encontra lock e refeita na hora e conta
+    como bloqueada (no dashboard seria uma espera de ate BUSY_TIMEOUT); a
+    latencia inclui as tentativas. Bloqueada ate o fim, nao conta como leitura.
+    """
+    conn = sqlite3.connect(db_path, timeout=0)
+    latencias, bloqueadas, vistas = [], 0, {}
+    try:
+        while time.time() < fim:
+            t0 = time.perf_counter()
+            bloqueada, lida = False, None
+            while lida is None and time.time() < fim:
+                try:
+                    lida = _ler_como_dashboard(conn)
+                except sqlite3.OperationalError as e:
+                    if not _bloqueio(e):
+                        raise
+                    bloqueada = True
+            bloqueadas += bloqueada
+            if lida is not None:
+                latencias.append(time.perf_counter() - t0)
+                ultima, n = lida
+                vistas[ultima] = n
+    finally:
+        conn.close()
+    return "leitor", latencias, bloqueadas, vistas
+
+
+def _escritor(db_path, fim, turmas):
+    """Processo escritor: grava extracoes sempre diferentes ate `fim`."""
+    conn = conectar(db_path)
+    duracoes, gravadas, i = [], {}, 0
+    try:
+        while time.time() < fim:
+            i += 1
+            # conteudo diferente a cada escrita: sem deduplicacao, todas as linhas entram
+            lote = [{**t, "matriculados": (t["matriculados"] or 0) + i} for t in turmas]
+            t0 = time.perf_counter()
+            ext, _ = _gravar(conn, lote, "estresse", datetime.now().isoformat())
+            duracoes.append(time.perf_counter() - t0)
+            gravadas[ext] = len(lote)
+    finally:
+        conn.close()
+    return "escritor", duracoes, 0, gravadas
+
+
+def _processo(fila, alvo, *args):
+    """Roda `alvo` e poe o retorno na fila; um erro tambem vai para a fila, senao _cenario esperaria para sempre."""
+    try:
+        fila.put(alvo(*args))
+    except Exception as e:
+        fila.put(("erro", f"{alvo.__name__}: {e!r}", 0, {}))
+
+
+def _cenario(db_path, wal, com_escritor, segundos, leitores, turmas):
+    """Leitores em processos separados por `segundos`, com ou sem um escritor gravando sem parar."""
+    conn = conectar(db_path)
+    inicializar(conn)
+    if not wal:
+        conn.execute("PRAGMA journal_mode = DELETE")
+    conn.close()
+
+    fila = multiprocessing.Queue()
+    fim = time.time() + segundos
+    processos = [multiprocessing.Process(target=_processo, args=(fila, _leitor, db_path, fim))
+                 for _ in range(leitores)]
+    if com_escritor:
+        processos.append(multiprocessing.Process(target=_processo, args=(fila, _escritor, db_path, fim, turmas)))
+    for p in processos:
+        p.start()
+    retornos = [fila.get() for _ in processos]
+    for p in processos:
+        p.join()
+    erros = [tempos for papel, tempos, _, _ in retornos if papel == "erro"]
+    if erros:
+        raise RuntimeError("; ".join(erros))
+
+    latencias, bloqueadas, vistas, escritas, gravadas = [], 0, {}, [], {}
+    for papel, tempos, n_bloqueadas, extracoes in retornos:
+        if papel == "escritor":
+            escritas, gravadas = tempos, extracoes
+        else:
+            latencias += tempos
+            bloqueadas += n_bloqueadas
+            vistas.update(extracoes)
+    # leitura parcial = extracao vista com menos turmas do que foram gravadas nela
+    parciais = sum(1 for ext, n in vistas.items() if ext in gravadas and n != gravadas[ext])
+    ms = np.array(latencias) * 1e3
+    return {
+        "leituras": len(latencias),
+        "p50_ms": float(np.percentile(ms, 50)) if len(ms) else None,
+        "p99_ms": float(np.percentile(ms, 99)) if len(ms) else None,
+        "max_ms": float(ms.max()) if len(ms) else None,
+        "bloqueadas": bloqueadas,
+        "parciais": parciais,
+        "escritas": len(escritas),
+        "escrita_ms": float(np.mean(escritas) * 1e3) if escritas else None,
+    }
+
+
+def estressar(db_path, segundos=3.0, leitores=4):
+    """Leitores concorrentes com e sem um escritor, em WAL e em journal_mode=delete.
+
+    Roda numa copia de `db_path` (o banco original nao e tocado).
+
+    Returns:
+        {(modo, "leitores" | "leitores+escritor"): resultado de _cenario}
+    """
+    conn = conectar(db_path)
+    colunas = [c for c in colunas_vagas(conn) if c not in ("id", "extracao_id")]
+    ultima = dados_de(conn, conn.execute("SELECT MAX(id) FROM extrações").fetchone()[0])
+    turmas = [dict(zip(colunas, row)) for row in conn.execute(
+        f"SELECT {', '.join(colunas)} FROM vagas WHERE extracao_id = ?", (ultima,))]
+    conn.close()
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for modo in ("wal", "delete"):
+            for com_escritor in (False, True):
+                copia = Path(tmp) / f"{modo}_{com_escritor}.db"
+                shutil.copy(db_path, copia)
+                cenario = "leitores+escritor" if com_escritor else "leitores"
+                resultados[(modo, cenario)] = _cenario(copia, modo == "wal", com_escritor,
+                                                       segundos, leitores, turmas)
+    return resultados
+
+
+if __name__ == "__main__":
+    if "--inicializar" in sys.argv:
+        for db_name in BANCOS:
+            db_path = OUTPUT_DIR / db_name
+            if db_path.exists():
+                conn = abrir_escrita(db_path)
+                modo = conn.execute("PRAGMA journal_mode").fetchone()[0]
+                conn.close()
+                print(f"{db_name}: journal_mode={modo}")
+    elif "--estresse" in sys.argv:
+        args = sys.argv[sys.argv.index("--estresse") + 1:]
+        db_path = OUTPUT_DIR / (args[0] if args else "vagas.db")
+        for (modo, cenario), r in estressar(db_path).items():
+            print(f"{modo:6} {cenario:18} {r['leituras']:6} leituras  p50 {r['p50_ms']:.2f} ms  "
+                  f"p99 {r['p99_ms']:.2f} ms  max {r['max_ms']:.1f} ms  {r['bloqueadas']} bloqueadas  "
+                  f"{r['parciais']} parciais  {r['escritas']} escritas"
+                  + (f" ({r['escrita_ms']:.0f} ms cada)" if r["escritas"] else ""))
+    else:
+        print(__doc__)
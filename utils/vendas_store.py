@@ -0,0 +1,449 @@
+"""Armazenamento dos registros de recebimento (vendas SAE/Socio/Elo Tech).
+
+Substitui o recebimento_final.json (indent=2) por um SQLite compacto:
+- tabela `registros`: uma linha por parcela, na ordem da extracao
+- tabela `metadados`: data da extracao, periodo, total (chave -> JSON)
+- indices (tipo, unidade, serie) e (matricula, unidade) para as agregacoes
+  das paginas de Estoque, que rodam no banco sem carregar tudo no pandas
+
+Cada gravacao completa monta um banco temporario no mesmo diretorio e troca o
+arquivo com os.replace, entao leitores nunca veem um snapshot pela metade.
+O recebimento_final.json dos extratores legados e importado uma unica vez,
+por comando explicito, e so se ainda nao houver banco (migrar_legado); as
+leituras nunca tocam no JSON.
+
+Exportacoes TSV (dados_*.tsv) entram de forma incremental por
+ingerir_arquivos: cada registro guarda o arquivo de origem e a tabela
+`arquivos` guarda tamanho, mtime e sha256 de cada arquivo ja ingerido.
+
+Uso standalone:
+    python -m utils.vendas_store --migrar   # importa o JSON legado (sem banco ainda)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+OUTPUT_DIR = Path(__file__).parent.parent / "output"
+DB_PATH = OUTPUT_DIR / "recebimento.db"
+JSON_LEGADO = OUTPUT_DIR / "recebimento_final.json"
+
+# mkstemp cria com 0600 e os.replace mantem o modo: os snapshots trocados
+# recebem o modo de um open() comum (0666 menos a umask), legivel pelo
+# processo do Streamlit mesmo com outro usuario que o agendador
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+MODO_ARQUIVO = 0o666 & ~_UMASK
+
+COLUNAS = [
+    "unidade", "servico_codigo", "turma", "matricula", "nome", "titulo",
+    "parcela", "dt_baixa", "valor", "recebido", "segmento", "serie", "tipo",
+]
+
+_SCHEMA = f"""
+    CREATE TABLE registros ({", ".join(f"{c} TEXT NOT NULL DEFAULT ''" for c in COLUNAS)},
+                            arquivo TEXT NOT NULL DEFAULT '');
+    CREATE TABLE metadados (chave TEXT PRIMARY KEY, valor TEXT);
+"""
+
+_SQL_INSERIR = f"INSERT INTO registros ({', '.join(COLUNAS)}, arquivo) VALUES ({', '.join('?' * (len(COLUNAS) + 1))})"
+
+# Controle da ingestao incremental de TSVs
+_SCHEMA_ARQUIVOS = """
+    CREATE TABLE IF NOT EXISTS arquivos (
+        caminho TEXT PRIMARY KEY,
+        tamanho INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        registros INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_registros_arquivo ON registros(arquivo);
+"""
+
+ORIGEM_TSV = "tsv"
+
+_INDICES = """
+    CREATE INDEX IF NOT EXISTS idx_registros_tipo ON registros(tipo, unidade, serie);
+    CREATE INDEX IF NOT EXISTS idx_registros_matricula ON registros(matricula, unidade);
+"""
+
+# Bancos ja verificados nesta sessao (indices criados em snapshots antigos)
+_indexados = set()
+
+# (caminho, mtime_ns) -> versao lida de metadados (versao_dados)
+_versoes = {}
+
+# Colunas de baixa cardinalidade (categoricas no DataFrame tipado)
+CATEGORICAS = ["unidade", "servico_codigo", "turma", "parcela", "segmento", "serie", "tipo"]
+
+SERIES_FUND1 = ("1º Ano", "2º Ano", "3º Ano", "4º Ano", "5º Ano")
+SERIES_FUND2 = ("6º Ano", "7º Ano", "8º Ano", "9º Ano")
+
+# Alunos unicos por serie/unidade de um tipo de servico
+_SQL_VENDAS_POR_SERIE = """
+    SELECT segmento, serie, unidade, COUNT(DISTINCT matricula) AS vendido
+    FROM registros
+    WHERE tipo = ?
+    GROUP BY segmento, serie, unidade
+    ORDER BY segmento, serie, unidade
+"""
+
+# Elo Tech: serie vem do PDF, senao da 1a linha SAE/Socio da mesma matricula,
+# senao da propria linha. Alunos "em aberto" entram se a matricula nao pagou.
+_SQL_VENDAS_ELOTECH = f"""
+    WITH tech AS (
+        SELECT matricula, unidade, serie FROM registros WHERE tipo = 'Elo Tech'
+        UNION ALL
+        SELECT matricula, unidade, serie FROM temp.elotech_em_aberto
+        WHERE matricula NOT IN (SELECT matricula FROM registros WHERE tipo = 'Elo Tech')
+    ),
+    resolvido AS (
+        SELECT t.matricula, t.unidade,
+               COALESCE(
+                   (SELECT p.serie FROM temp.elotech_serie_pdf p
+                    WHERE p.matricula = t.matricula AND p.unidade = t.unidade),
+                   (SELECT r.serie FROM registros r
+                    WHERE r.matricula = t.matricula AND r.unidade = t.unidade
+                      AND r.tipo IN ('SAE', 'Socioemocional')
+                    ORDER BY r.rowid LIMIT 1),
+                   CASE WHEN t.serie != 'Todas' THEN t.serie ELSE 'Sem serie' END) AS serie
+        FROM tech t
+    )
+    SELECT CASE WHEN serie IN ({", ".join(f"'{s}'" for s in SERIES_FUND1)}) THEN 'Fund1'
+                WHEN serie IN ({", ".join(f"'{s}'" for s in SERIES_FUND2)}) THEN 'Fund2'
+                ELSE 'Outros' END AS segmento,
+           serie, unidade, COUNT(DISTINCT matricula) AS vendido
+    FROM resolvido
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+"""
+
+
+def _conectar(path=None):
+    """Abre conexao com o banco de registros (None se nao existir)."""
+    path = Path(path or DB_PATH)
+    if not path.exists():
+        return None
+    conn = sqlite3.connect(path, check_same_thread=False)
+    if path not in _indexados:
+        conn.executescript(_INDICES)
+        _indexados.add(path)
+    return conn
+
+
+def salvar_registros(registros, metadados):
+    """Grava um snapshot completo de registros + metadados de forma atomica.
+
+    Args:
+        registros: lista de dicts com as chaves de COLUNAS
+        metadados: dict serializavel (data_extracao, ultima_atualizacao, ...)
+    """
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=OUTPUT_DIR, prefix=f".{DB_PATH.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp)
+        conn.executescript(_SCHEMA)
+        conn.executemany(_SQL_INSERIR, (_linha(r) for r in registros))
+        conn.executemany(
+            "INSERT INTO metadados VALUES (?, ?)",
+            [(k, json.dumps(v, ensure_ascii=False)) for k, v in {**metadados, "versao": time.time_ns()}.items()],
+        )
+        conn.executescript(_INDICES + "ANALYZE;")
+        conn.commit()
+        conn.close()
+        os.chmod(tmp, MODO_ARQUIVO)
+        os.replace(tmp, DB_PATH)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _linha(registro, arquivo=""):
+    """Valores de um registro (dict) na ordem de _SQL_INSERIR."""
+    return [str(registro.get(c, "") or "") for c in COLUNAS] + [arquivo]
+
+
+def _sha256(path):
+    """sha256 do conteudo de um arquivo, lido em blocos."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def ingerir_arquivos(arquivos, ler_registros, metadados, limite_reducao=0.8):
+    """Sincroniza o banco com um conjunto de exportacoes, sem reprocessar as ja vistas.
+
+    Arquivo com mesmo tamanho e mtime de uma ingestao anterior e pulado sem
+    ser lido; se so o mtime mudou, o sha256 decide (conteudo igual so atualiza
+    o mtime em `arquivos`, sem mudar versao_dados()). Arquivos novos ou
+    alterados tem suas linhas (coluna `arquivo`) substituidas e arquivos que
+    sairam da lista tem suas linhas removidas. Um snapshot que nao veio de
+    TSV (scheduler/API, JSON legado) e substituido por inteiro, como antes.
+
+    Tudo roda em uma transacao; se nenhum arquivo mudou nao ha reparse nem
+    regravacao de metadados.
+
+    Args:
+        arquivos: caminhos dos TSVs (ordem de ingestao)
+        ler_registros: callable(Path) -> iteravel de dicts com as chaves de COLUNAS
+        metadados: dict gravado em `metadados` quando ha mudanca
+        limite_reducao: aborta sem gravar se o total cair abaixo dessa fracao do atual
+
+    Returns:
+        (total_registros, arquivos_ingeridos) ou None se abortado pelo limite
+    """
+    if not DB_PATH.exists():
+        salvar_registros([], {})
+    conn = _conectar()
+    try:
+        colunas = {r[1] for r in conn.execute("PRAGMA table_info(registros)")}
+        if "arquivo" not in colunas:
+            conn.execute("ALTER TABLE registros ADD COLUMN arquivo TEXT NOT NULL DEFAULT ''")
+        conn.executescript(_SCHEMA_ARQUIVOS)
+
+        total_antes = conn.execute("SELECT COUNT(*) FROM registros").fetchone()[0]
+        origem = conn.execute("SELECT valor FROM metadados WHERE chave = 'origem'").fetchone()
+        reconstruir = origem is None or json.loads(origem[0]) != ORIGEM_TSV
+        with conn:
+            if reconstruir:
+                conn.execute("DELETE FROM registros")
+                conn.execute("DELETE FROM arquivos")
+            vistos = {
+                caminho: (tamanho, mtime_ns, sha)
+                for caminho, tamanho, mtime_ns, sha in
+                conn.execute("SELECT caminho, tamanho, mtime_ns, sha256 FROM arquivos")
+            }
+
+            caminhos = []
+            ingeridos = 0
+            for path in arquivos:
+                path = Path(path)
+                caminho = str(path.resolve())
+                caminhos.append(caminho)
+                st = path.stat()
+                anterior = vistos.get(caminho)
+                if anterior and anterior[:2] == (st.st_size, st.st_mtime_ns):
+                    continue
+                sha = _sha256(path)
+                if anterior and anterior[2] == sha:
+                    # mesmo conteudo: so o controle e atualizado (nao rele/rehash no proximo
+                    # clique); versao_dados() nao muda porque nenhuma linha mudou
+                    conn.execute("UPDATE arquivos SET tamanho = ?, mtime_ns = ? WHERE caminho = ?",
+                                 (st.st_size, st.st_mtime_ns, caminho))
+                    continue
+                conn.execute("DELETE FROM registros WHERE arquivo = ?", (caminho,))
+                cur = conn.executemany(_SQL_INSERIR, (_linha(r, caminho) for r in ler_registros(path)))
+                conn.execute("INSERT OR REPLACE INTO arquivos VALUES (?, ?, ?, ?, ?)",
+                             (caminho, st.st_size, st.st_mtime_ns, sha, cur.rowcount))
+                ingeridos += 1
+
+            removidos = [c for c in vistos if c not in set(caminhos)]
+            conn.executemany("DELETE FROM registros WHERE arquivo = ?", [(c,) for c in removidos])
+            conn.executemany("DELETE FROM arquivos WHERE caminho = ?", [(c,) for c in removidos])
+
+            total = conn.execute("SELECT COUNT(*) FROM registros").fetchone()[0]
+            if not (ingeridos or removidos or reconstruir):
+                return total, 0
+            if total < total_antes * limite_reducao:
+                conn.rollback()
+                return None
+            conn.executemany(
+                "INSERT OR REPLACE INTO metadados VALUES (?, ?)",
+                [(k, json.dumps(v, ensure_ascii=False))
+                 for k, v in {**metadados, "total_registros": total, "origem": ORIGEM_TSV,
+                              "versao": time.time_ns()}.items()],
+            )
+        conn.execute("ANALYZE")
+        return total, ingeridos
+    finally:
+        conn.close()
+
+
+def migrar_json(json_path):
+    """Importa um recebimento_final.json (formato antigo) para o banco."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        dados = json.load(f)
+    registros = dados.pop("registros", [])
+    salvar_registros(registros, dados)
+    # Preserva a data do JSON para nao parecer mais novo do que e
+    mtime = Path(json_path).stat().st_mtime
+    os.utime(DB_PATH, (mtime, mtime))
+    return len(registros)
+
+
+def migrar_legado():
+    """Importa JSON_LEGADO uma unica vez: so se ainda nao houver banco.
+
+    Depois o JSON vira recebimento_final.json.importado, entao nunca mais e
+    lido nem sobrescreve um snapshot mais novo (agendador ou TSVs).
+
+    Returns:
+        registros importados, ou None se nao havia o que migrar
+    """
+    if DB_PATH.exists() or not JSON_LEGADO.exists():
+        return None
+    n = migrar_json(JSON_LEGADO)
+    JSON_LEGADO.rename(JSON_LEGADO.with_name(JSON_LEGADO.name + ".importado"))
+    return n
+
+
+def carregar_registros(tipado=False):
+    """Retorna DataFrame com todos os registros (ordem da extracao) ou None.
+
+    Com tipado=True aplica tipar_registros (categoricas, centavos, datas).
+    """
+    conn = _conectar()
+    if conn is None:
+        return None
+    df = pd.read_sql_query(f"SELECT {', '.join(COLUNAS)} FROM registros ORDER BY rowid", conn)
+    conn.close()
+    return tipar_registros(df) if tipado else df
+
+
+def _por_valor_unico(serie, converter):
+    """Aplica `converter` (vetorizado) so aos valores distintos e espalha pelos codigos."""
+    cat = pd.Categorical(serie)
+    convertidos = converter(pd.Series(cat.categories, dtype=object))
+    # codigo -1 (nulo) cai na posicao extra, nula, do fim
+    convertidos = pd.concat([convertidos, pd.Series([None], dtype=convertidos.dtype)], ignore_index=True)
+    return pd.Series(convertidos.take(cat.codes).array, index=serie.index)
+
+
+def _centavos(textos):
+    """'1.765,00' -> 176500 (Int64); vazio ou invalido -> <NA>."""
+    numeros = pd.to_numeric(textos.str.replace(".", "", regex=False).str.replace(",", ".", regex=False),
+                            errors="coerce")
+    return (numeros * 100).round().astype("Int64")
+
+
+def _datas(textos):
+    """'31/08/2025' -> Timestamp; vazio ou invalido -> NaT."""
+    return pd.to_datetime(textos, format="%d/%m/%Y", errors="coerce")
+
+
+def tipar_registros(df):
+    """Converte o DataFrame de registros (tudo texto) para tipos compactos.
+
+    - CATEGORICAS viram category (categorias em ordem lexica, entao
+      ordenacoes continuam iguais as de texto)
+    - valor/recebido viram valor_centavos/recebido_centavos (Int64)
+    - dt_baixa vira datetime64 (NaT quando vazia)
+    """
+    df = df.copy()
+    for col in CATEGORICAS:
+        df[col] = df[col].astype("category")
+    for col in ("valor", "recebido"):
+        df[col] = _por_valor_unico(df[col], _centavos)
+    df["dt_baixa"] = _por_valor_unico(df["dt_baixa"], _datas)
+    return df.rename(columns={"valor": "valor_centavos", "recebido": "recebido_centavos"})
+
+
+def carregar_metadados():
+    """Retorna dict de metadados do snapshot atual (vazio se nao houver)."""
+    conn = _conectar()
+    if conn is None:
+        return {}
+    rows = conn.execute("SELECT chave, valor FROM metadados").fetchall()
+    conn.close()
+    return {k: json.loads(v) for k, v in rows}
+
+
+def contar_registros():
+    """Retorna o numero de registros do snapshot atual (0 se nao houver)."""
+    conn = _conectar()
+    if conn is None:
+        return 0
+    n = conn.execute("SELECT COUNT(*) FROM registros").fetchone()[0]
+    conn.close()
+    return n
+
+
+def data_modificacao():
+    """Retorna datetime da ultima gravacao do snapshot ou None."""
+    if not DB_PATH.exists():
+        return None
+    return datetime.fromtimestamp(DB_PATH.stat().st_mtime)
+
+
+def versao_dados():
+    """Versao do conteudo do snapshot atual, para chaves de cache.
+
+    E a chave `versao` de metadados, renovada so quando linhas sao gravadas:
+    escritas de controle (mtime de um TSV tocado em `arquivos`) mudam o mtime
+    do arquivo, nao a versao. O valor lido fica guardado por mtime, entao sem
+    gravacao nova custa so um stat. Bancos sem a chave usam o mtime.
+    """
+    if not DB_PATH.exists():
+        return None
+    chave = (DB_PATH, DB_PATH.stat().st_mtime_ns)
+    if chave not in _versoes:
+        conn = sqlite3.connect(DB_PATH)
+        row = conn.execute("SELECT valor FROM metadados WHERE chave = 'versao'").fetchone()
+        conn.close()
+        _versoes.clear()
+        _versoes[chave] = json.loads(row[0]) if row else chave[1]
+    return _versoes[chave]
+
+
+def vendas_por_serie_unidade(tipo="SAE"):
+    """Alunos unicos (matriculas distintas) por segmento/serie/unidade de um tipo.
+
+    Returns:
+        DataFrame [segmento, serie, unidade, vendido] (vazio se nao houver banco)
+    """
+    conn = _conectar()
+    if conn is None:
+        return pd.DataFrame(columns=["segmento", "serie", "unidade", "vendido"])
+    df = pd.read_sql_query(_SQL_VENDAS_POR_SERIE, conn, params=(tipo,))
+    conn.close()
+    return df
+
+
+def vendas_elotech_por_serie(serie_pdf, em_aberto=()):
+    """Cruza matriculas Elo Tech com SAE/Socioemocional para descobrir a serie.
+
+    Args:
+        serie_pdf: dict {(matricula, unidade): serie} (ELOTECH_SERIE_PDF)
+        em_aberto: lista de (matricula, nome, unidade, serie) faturados nao pagos
+
+    Returns:
+        DataFrame [segmento, serie, unidade, vendido]
+    """
+    conn = _conectar()
+    if conn is None:
+        return pd.DataFrame(columns=["segmento", "serie", "unidade", "vendido"])
+    conn.executescript("""
+        CREATE TEMP TABLE elotech_serie_pdf (matricula TEXT, unidade TEXT, serie TEXT,
+                                             PRIMARY KEY (matricula, unidade));
+        CREATE TEMP TABLE elotech_em_aberto (matricula TEXT, unidade TEXT, serie TEXT);
+    """)
+    conn.executemany("INSERT OR IGNORE INTO temp.elotech_serie_pdf VALUES (?, ?, ?)",
+                     [(m, u, s) for (m, u), s in serie_pdf.items()])
+    conn.executemany("INSERT INTO temp.elotech_em_aberto VALUES (?, ?, ?)",
+                     [(m, u, s) for m, _, u, s in em_aberto])
+    df = pd.read_sql_query(_SQL_VENDAS_ELOTECH, conn)
+    conn.close()
+    return df
+
+
+if __name__ == "__main__":
+    if "--migrar" in sys.argv:
+        n = migrar_legado()
+        if n is None:
+            print(f"Nada a migrar ({DB_PATH.name} ja existe ou {JSON_LEGADO.name} nao encontrado)")
+        else:
+            print(f"{n} registros importados para {DB_PATH.name}")
+    else:
+        print(__doc__)